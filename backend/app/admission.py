@@ -0,0 +1,248 @@
+"""
+Per-client rate limiting and admission control.
+
+Every request falls into a route class: write (POST, PUT, DELETE), expensive
+(dashboard employee list, reports, exports and imports) or read (other GETs).
+Each client has a token bucket per class refilled at RATE_LIMIT_<CLASS> requests
+per second and holding RATE_LIMIT_BURST_SECONDS worth of them; an empty bucket
+answers 429 with Retry-After. A client is who sent the Authorization header, or
+else the X-Client-Id the frontend sends, or else the address. Clients sharing an
+address (an office behind NAT) each get their own buckets, and together at most
+RATE_LIMIT_CLIENTS_PER_ADDRESS times one client's rates, so rotating IDs does not
+lift the limits.
+
+Expensive requests also need one of EXPENSIVE_CONCURRENCY slots. Waiting for a
+slot is bounded by ADMISSION_LATENCY_BUDGET_MS: a request whose expected wait,
+from the queue length and recent service times, is over the budget is answered
+503 with Retry-After at once, as is one still queued when the budget runs out.
+Exports and imports stream for as long as the data takes, so they have their own
+TRANSFER_CONCURRENCY slots and service times instead of holding up, and skewing
+the expected wait of, dashboard and report requests. Writes and cheap reads never
+queue behind expensive ones.
+
+State is kept in memory per worker process, so with several workers a client
+may get up to that many times the configured rates.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import time
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+
+# Requests per second per client and route class (0 disables the limit)
+RATE_LIMITS = {
+    "write": float(os.getenv("RATE_LIMIT_WRITE", "10")),
+    "read": float(os.getenv("RATE_LIMIT_READ", "20")),
+    "expensive": float(os.getenv("RATE_LIMIT_EXPENSIVE", "2"))
+}
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "5"))
+
+# How many clients' worth of requests one address may make in total
+RATE_LIMIT_CLIENTS_PER_ADDRESS = float(os.getenv("RATE_LIMIT_CLIENTS_PER_ADDRESS", "20"))
+
+# Client identity sent by the frontend, longer values are ignored
+CLIENT_ID_HEADER = b"x-client-id"
+MAX_CLIENT_ID_LENGTH = 64
+
+# Expensive requests served at once by each process, and how long one may wait for a slot
+EXPENSIVE_CONCURRENCY = int(os.getenv("EXPENSIVE_CONCURRENCY", "4"))
+ADMISSION_LATENCY_BUDGET_MS = float(os.getenv("ADMISSION_LATENCY_BUDGET_MS", "2000"))
+
+# Exports and imports streamed at once by each process
+TRANSFER_CONCURRENCY = int(os.getenv("TRANSFER_CONCURRENCY", "2"))
+
+# Buckets kept before idle ones are dropped
+MAX_TRACKED_CLIENTS = 50000
+
+# Served without limits: health checks, monitoring and long-lived event streams
+EXEMPT_PATHS = {"/", "/health", "/debug/metrics", "/debug/db-status", "/dashboard/stream"}
+
+EXPENSIVE_GETS = ("/dashboard/employees", "/reports/", "/employees/export", "/attendance/export")
+EXPENSIVE_WRITES = ("/employees/import", "/attendance/import")
+TRANSFER_PATHS = ("/employees/export", "/attendance/export") + EXPENSIVE_WRITES
+
+def route_class(method: str, path: str) -> str | None:
+    """Class of a request, None when it is exempt"""
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if method in ("GET", "HEAD"):
+        return "expensive" if path.startswith(EXPENSIVE_GETS) else "read"
+    return "expensive" if path.startswith(EXPENSIVE_WRITES) else "write"
+
+def client_identity(scope) -> str | None:
+    """Who sent a request by its headers, None when only the address is known"""
+    client_id = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            # Hashed so credentials are not kept in memory
+            return "auth:" + hashlib.sha256(value).hexdigest()[:32]
+        if name == CLIENT_ID_HEADER and 0 < len(value) <= MAX_CLIENT_ID_LENGTH:
+            client_id = "id:" + value.decode("latin-1")
+    return client_id
+
+class TokenBuckets:
+    """Token bucket per (client, route class), refilled lazily when the client next shows up"""
+
+    def __init__(self, rates: dict, burst_seconds: float, max_clients: int):
+        self.rates = rates
+        self.capacity = {name: max(1.0, rate * burst_seconds) for name, rate in rates.items()}
+        self.max_clients = max_clients
+        self._buckets = {}
+        self._next_sweep = max_clients
+
+    def take(self, client: str, name: str) -> float:
+        """Take a token, returning 0 or else the seconds until one is available"""
+        rate = self.rates.get(name)
+        if not rate:
+            return 0.0
+        now = time.monotonic()
+        key = (client, name)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._next_sweep:
+                self._sweep(now)
+            bucket = self._buckets[key] = [self.capacity[name], now]
+        else:
+            bucket[0] = min(self.capacity[name], bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def _sweep(self, now: float):
+        # A bucket idle long enough to refill holds nothing a new one would not
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rates[key[1]] < self.capacity[key[1]]
+        }
+        self._next_sweep = max(self.max_clients, 2 * len(self._buckets))
+
+    def __len__(self):
+        return len(self._buckets)
+
+class Shed(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+class ConcurrencyLimit:
+    """Slots for one route class, shedding requests that would wait past the latency budget"""
+
+    def __init__(self, limit: int, budget_seconds: float):
+        self.limit = limit
+        self.budget = budget_seconds
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        # Moving average of how long a request holds its slot
+        self.service_seconds = 0.0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def expected_wait(self) -> float:
+        if self.active < self.limit and not self.waiting:
+            return 0.0
+        return math.ceil((self.waiting + 1) / self.limit) * self.service_seconds
+
+    async def acquire(self):
+        expected = self.expected_wait()
+        if expected > self.budget:
+            self.shed += 1
+            raise Shed(expected)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.budget)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Shed(max(self.budget, self.expected_wait()))
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self, seconds: float):
+        self.active -= 1
+        self.service_seconds = seconds if not self.service_seconds else 0.8 * self.service_seconds + 0.2 * seconds
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "service_ms": round(self.service_seconds * 1000, 1),
+            "latency_budget_ms": round(self.budget * 1000)
+        }
+
+buckets = TokenBuckets(RATE_LIMITS, RATE_LIMIT_BURST_SECONDS, MAX_TRACKED_CLIENTS)
+address_buckets = TokenBuckets(
+    {name: rate * RATE_LIMIT_CLIENTS_PER_ADDRESS for name, rate in RATE_LIMITS.items()},
+    RATE_LIMIT_BURST_SECONDS, MAX_TRACKED_CLIENTS
+)
+expensive_slots = ConcurrencyLimit(max(1, EXPENSIVE_CONCURRENCY), ADMISSION_LATENCY_BUDGET_MS / 1000)
+transfer_slots = ConcurrencyLimit(max(1, TRANSFER_CONCURRENCY), ADMISSION_LATENCY_BUDGET_MS / 1000)
+rate_limited = {name: 0 for name in RATE_LIMITS}
+
+def snapshot() -> dict:
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "rate_limits": RATE_LIMITS,
+        "rate_limited": dict(rate_limited),
+        "tracked_clients": len(buckets),
+        "tracked_addresses": len(address_buckets),
+        "expensive": expensive_slots.snapshot(),
+        "transfer": transfer_slots.snapshot()
+    }
+
+async def reject(send, status: int, retry_after: float, detail: str):
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+    ]})
+    await send({"type": "http.response.body", "body": f'{{"detail":"{detail}"}}'.encode()})
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the rate limits and the expensive request slots"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The proxy's X-Forwarded-For address when behind one, see start_server.py
+        address = scope["client"][0] if scope.get("client") else ""
+        identity = client_identity(scope)
+        if identity is None:
+            wait = buckets.take(address, name)
+        else:
+            wait = buckets.take(identity, name) or address_buckets.take(address, name)
+        if wait:
+            rate_limited[name] += 1
+            await reject(send, 429, wait, "Too many requests, please retry later.")
+            return
+
+        if name != "expensive":
+            await self.app(scope, receive, send)
+            return
+        slots = transfer_slots if scope["path"].startswith(TRANSFER_PATHS) else expensive_slots
+        try:
+            await slots.acquire()
+        except Shed as e:
+            await reject(send, 503, e.retry_after, "Server busy, please retry later.")
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slots.release(time.perf_counter() - started)
@@ -0,0 +1,155 @@
+"""
+Compact monthly attendance: one document per employee and month holding bitmaps,
+where bit d-1 stands for day d of the month.
+
+    _id          <YYYY-MM>:<employee_id>
+    present      days marked Present
+    absent       days marked Absent
+    marked       days with any record
+
+An employee-month takes about 120 bytes here against ~22 attendance documents of
+~100 bytes plus their index entries. Keyed by month first, so a month-wide report
+is one range scan of the _id index. Kept in sync by the attendance write endpoints
+next to the rollups; rebuild with `python -m app.manage rebuild-bitmaps`, which
+pauses attendance writes like a rollup rebuild.
+"""
+import os
+from app.database import get_database
+from app.rollups import staging_name, writes_paused_for_rebuild
+from app.dates import DAY_EXPRESSION
+
+BITMAP_COLLECTION = "attendance_bitmaps"
+
+# Set to false to skip maintaining the store, /reports then answers 404
+BITMAPS_ENABLED = os.getenv("ATTENDANCE_BITMAPS", "true").lower() == "true"
+
+STATUS_BITMAPS = {"Present": "present", "Absent": "absent"}
+
+def get_bitmap_collection():
+    """Return the bitmap collection, or None without a database"""
+    db = get_database()
+    return db[BITMAP_COLLECTION] if db is not None else None
+
+def bitmap_id(employee_id: str, month: str) -> str:
+    return f"{month}:{employee_id}"
+
+def month_range(month: str) -> dict:
+    """Filter on _id selecting every employee's document for one month"""
+    # ";" sorts right after ":", so this bounds exactly the "<month>:" prefix
+    return {"_id": {"$gte": f"{month}:", "$lt": f"{month};"}}
+
+def add_change(changes: dict, employee_id: str, department: str, date: str, status: str,
+               previous_status: str | None = None):
+    """Accumulate one day's bit being set for `status`, and cleared from `previous_status`"""
+    month = date[:7]
+    bit = 1 << (int(date[8:10]) - 1)
+    entry = changes.setdefault(bitmap_id(employee_id, month), {
+        "fields": {"employee_id": employee_id, "month": month, "department": department or "Unknown"},
+        "set": {},
+        "clear": {}
+    })
+    for field in (STATUS_BITMAPS[status], "marked"):
+        entry["set"][field] = entry["set"].get(field, 0) | bit
+    if previous_status in STATUS_BITMAPS and previous_status != status:
+        field = STATUS_BITMAPS[previous_status]
+        entry["clear"][field] = entry["clear"].get(field, 0) | bit
+
+async def apply_changes(changes: dict):
+    """Write accumulated bitmap changes in one bulk round trip, logging failures like the rollups"""
+    bitmap_collection = get_bitmap_collection()
+    if not BITMAPS_ENABLED or bitmap_collection is None or not changes:
+        return
+
+    from pymongo import UpdateOne
+    operations = []
+    for document_id, entry in changes.items():
+        bits = {}
+        # Clear before set, a missing field counts as 0
+        for field, mask in entry["clear"].items():
+            bits[field] = {"and": ~mask}
+        for field, mask in entry["set"].items():
+            bits.setdefault(field, {})["or"] = mask
+        operations.append(
+            UpdateOne({"_id": document_id}, {"$bit": bits, "$setOnInsert": entry["fields"]}, upsert=True)
+        )
+    try:
+        await bitmap_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"✗ Failed to update attendance bitmaps: {e}")
+
+async def record_attendance(employee_id: str, department: str, date: str, status: str):
+    """Set the bit of a newly marked attendance record"""
+    changes = {}
+    add_change(changes, employee_id, department, date, status)
+    await apply_changes(changes)
+
+async def record_status_change(employee_id: str, department: str, date: str, old_status: str, new_status: str):
+    """Move one day's bit from its old status bitmap to the new one"""
+    if old_status == new_status:
+        return
+    changes = {}
+    add_change(changes, employee_id, department, date, new_status, old_status)
+    await apply_changes(changes)
+
+def bitmap_pipeline() -> list:
+    """Aggregation over raw attendance that produces every bitmap document"""
+    def bits_where(status):
+        return {"$sum": {"$cond": [{"$eq": ["$status", status]}, "$bit", 0]}}
+
+    return [
+        {"$set": {"day": DAY_EXPRESSION}},
+        {"$set": {
+            "month": {"$substrBytes": ["$day", 0, 7]},
+            # Each employee has at most one record per day, so summing the bits ORs them
+            "bit": {"$pow": [2, {"$subtract": [{"$toInt": {"$substrBytes": ["$day", 8, 2]}}, 1]}]}
+        }},
+        {"$group": {
+            "_id": {"employee_id": "$employee_id", "month": "$month"},
+            "present": bits_where("Present"),
+            "absent": bits_where("Absent"),
+            "marked": {"$sum": "$bit"}
+        }},
+        {"$lookup": {
+            "from": "employees",
+            "localField": "_id.employee_id",
+            "foreignField": "employee_id",
+            "as": "employee"
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.month", ":", "$_id.employee_id"]},
+            "employee_id": "$_id.employee_id",
+            "month": "$_id.month",
+            "department": {"$ifNull": [{"$arrayElemAt": ["$employee.department", 0]}, "Unknown"]},
+            "present": 1,
+            "absent": 1,
+            "marked": 1
+        }}
+    ]
+
+async def rebuild_bitmaps() -> int:
+    """Recompute every bitmap from raw attendance and swap them in, returning the document count"""
+    db = get_database()
+    staging = db[staging_name(BITMAP_COLLECTION)]
+
+    # A $bit update written meanwhile would be lost with the replaced collection
+    async with writes_paused_for_rebuild():
+        try:
+            merge = {"$merge": {"into": staging.name, "whenMatched": "replace", "whenNotMatched": "insert"}}
+            cursor = await db["attendance"].aggregate(bitmap_pipeline() + [merge])
+            await cursor.to_list()
+
+            count = await staging.count_documents({})
+            if count:
+                await staging.rename(BITMAP_COLLECTION, dropTarget=True)
+            else:
+                await db[BITMAP_COLLECTION].delete_many({})
+        finally:
+            await staging.drop()
+    return count
+
+async def bitmaps_missing() -> bool:
+    """Check whether this database has attendance but no bitmaps yet, as on first start"""
+    db = get_database()
+    if not BITMAPS_ENABLED or db is None or await db[BITMAP_COLLECTION].find_one({}, {"_id": 1}):
+        return False
+    return await db["attendance"].find_one({}, {"_id": 1}) is not None
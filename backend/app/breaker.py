@@ -0,0 +1,286 @@
+"""
+Circuit breaker for MongoDB.
+
+While MongoDB is reachable the breaker is closed and requests go through. It
+opens when BREAKER_FAILURE_THRESHOLD requests in a row fail to reach the server,
+or straight away when the driver loses its last writable server. While open,
+requests needing the database are answered with 503 at once instead of each
+waiting out the server selection timeout.
+
+After BREAKER_RESET_SECONDS the breaker is half-open: a background ping probes
+the server, recreating the client if it could never be created, and closes the
+breaker when it answers. Requests keep failing fast until then.
+
+StaleResponseMiddleware keeps the last successful JSON body of every GET and
+serves it, marked stale, in place of such a 503.
+"""
+import asyncio
+import inspect
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "10"))
+
+# Memory for the last good response bodies served during an outage (0 disables)
+STALE_CACHE_MB = float(os.getenv("STALE_CACHE_MB", "32"))
+
+def unavailable() -> HTTPException:
+    return HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
+
+def is_connection_error(error: Exception) -> bool:
+    """Check whether `error` means the server could not be reached, rather than a failed command"""
+    from pymongo.errors import ConnectionFailure, WaitQueueTimeoutError
+    # A full connection pool means this process is busy, not that the server is down
+    return isinstance(error, ConnectionFailure) and not isinstance(error, WaitQueueTimeoutError)
+
+class CircuitBreaker:
+    """Closed, open or half_open, with counters for /health"""
+
+    def __init__(self, probe, failure_threshold: int, reset_seconds: float):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.trips = 0
+        self.rejected = 0
+        self._probe_task = None
+
+    def allow(self) -> bool:
+        """Check whether a request may use the database, starting a probe once the open period is over"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self._probe_task = asyncio.create_task(self._run_probe())
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state == "closed":
+            self.failures = 0
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = str(error)
+        if self.state == "closed" and self.failures >= self.failure_threshold:
+            self.trip(error)
+
+    def trip(self, error):
+        """Open the breaker now"""
+        if self.state == "closed":
+            self.trips += 1
+            print(f"✗ MongoDB unavailable, failing fast for {self.reset_seconds:g}s: {error}")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.last_error = str(error)
+
+    def reset(self):
+        """Close the breaker, the server answered"""
+        if self.state != "closed":
+            print("✓ MongoDB reachable again")
+        self.state = "closed"
+        self.failures = 0
+
+    async def _run_probe(self):
+        try:
+            await self.probe()
+        except Exception as e:
+            self.trip(e)
+        else:
+            self.reset()
+
+    async def call(self, awaitable):
+        """Await a database operation, recording its outcome and turning unreachability into a 503"""
+        try:
+            result = await awaitable
+        except Exception as e:
+            if is_connection_error(e):
+                self.record_failure(e)
+                raise unavailable()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state != "closed" else None,
+            "trips": self.trips,
+            "rejected_requests": self.rejected,
+            "last_error": self.last_error
+        }
+
+async def _ping():
+    from app import database
+    db = database.get_database()
+    if db is None:
+        raise ConnectionError(database.connection_error or "MongoDB client could not be created")
+    await db.command("ping")
+
+mongo_breaker = CircuitBreaker(_ping, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+
+def create_topology_listener():
+    """Listener opening the breaker as soon as the driver sees no writable server, and closing it on recovery"""
+    from pymongo import monitoring
+
+    class TopologyHealthListener(monitoring.TopologyListener):
+        def opened(self, event):
+            pass
+
+        def closed(self, event):
+            pass
+
+        def description_changed(self, event):
+            had_writable = event.previous_description.has_writable_server()
+            has_writable = event.new_description.has_writable_server()
+            # Only transitions count, the topology starts out unknown
+            if had_writable and not has_writable:
+                mongo_breaker.trip("No writable MongoDB server")
+            elif has_writable and not had_writable:
+                mongo_breaker.reset()
+
+    return TopologyHealthListener()
+
+class GuardedCursor:
+    """Cursor wrapper recording the outcome of every fetch with the breaker"""
+
+    def __init__(self, cursor, breaker: CircuitBreaker):
+        self._cursor = cursor
+        self._breaker = breaker
+        self._iterator = None
+
+    def batch_size(self, size: int):
+        self._cursor.batch_size(size)
+        return self
+
+    async def to_list(self, length: int | None = None) -> list:
+        return await self._breaker.call(self._cursor.to_list(length))
+
+    def __aiter__(self):
+        self._iterator = self._cursor.__aiter__()
+        return self
+
+    async def __anext__(self):
+        try:
+            document = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._breaker.record_success()
+            raise
+        except Exception as e:
+            # Part of the response is already sent, so only the failure is recorded
+            if is_connection_error(e):
+                self._breaker.record_failure(e)
+            raise
+        return document
+
+    async def close(self):
+        await self._cursor.close()
+
+class GuardedRepository:
+    """Repository wrapper passing every call through the breaker"""
+
+    def __init__(self, repository, breaker: CircuitBreaker):
+        self._repository = repository
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attribute = getattr(self._repository, name)
+        if not callable(attribute):
+            return attribute
+        if inspect.iscoroutinefunction(attribute):
+            async def guarded(*args, **kwargs):
+                return await self._breaker.call(attribute(*args, **kwargs))
+        else:
+            # The other methods return cursors
+            def guarded(*args, **kwargs):
+                return GuardedCursor(attribute(*args, **kwargs), self._breaker)
+        return guarded
+
+class StaleResponses:
+    """Last good response of each GET, least recently stored dropped first past `max_bytes`"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.served = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, headers: list, body: bytes):
+        if len(body) > self.max_bytes // 4:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[1])
+        self._entries[key] = (headers, body, time.time())
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, dropped, _) = self._entries.popitem(last=False)
+            self.size -= len(dropped)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes, "served": self.served}
+
+stale_responses = StaleResponses(int(STALE_CACHE_MB * 1024 * 1024))
+
+def is_cors_header(name: bytes) -> bool:
+    return name.lower().startswith(b"access-control-")
+
+class StaleResponseMiddleware:
+    """Pure ASGI middleware answering GETs with their last good JSON body while the breaker rejects requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not stale_responses.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        key = (scope["path"], scope.get("query_string", b""), headers.get(b"accept", b""))
+        start = None
+        replaced = False
+
+        async def send_or_replace(message):
+            nonlocal start, replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                stale = stale_responses.get(key) if message["status"] == 503 and mongo_breaker.state != "closed" else None
+                if stale is not None:
+                    replaced = True
+                    stale_headers, body, stored_at = stale
+                    stale_responses.served += 1
+                    # CORS headers for this request's origin, added to the 503 by CORSMiddleware
+                    cors_headers = [(name, value) for name, value in message.get("headers", []) if is_cors_header(name)]
+                    await send({"type": "http.response.start", "status": 200, "headers": stale_headers + cors_headers + [
+                        (b"age", str(int(time.time() - stored_at)).encode()),
+                        (b"warning", b'110 - "Response is Stale"'),
+                        (b"x-data-stale", b"true")
+                    ]})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                start = message if message["status"] == 200 and content_type.startswith(b"application/json") else None
+            elif message["type"] == "http.response.body" and start is not None:
+                # Single-message bodies only, streamed responses are not kept
+                if not message.get("more_body"):
+                    # The stored CORS headers belong to the origin of this request, not a later one
+                    headers = [(name, value) for name, value in start.get("headers", []) if not is_cors_header(name)]
+                    stale_responses.set(key, headers, message.get("body", b""))
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_or_replace)
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, stored_at) for a fresh entry, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.ttl:
+                del self._entries[key]
+                return None
+            return entry[0], entry[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            # Keys that are never asked for again, e.g. of an older data version, expire here
+            self._entries = {k: entry for k, entry in self._entries.items() if now - entry[2] < self.ttl}
+            self._entries[key] = (value, time.time(), now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class LRUCache:
+    """Thread-safe LRU cache with a bounded size, a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Dashboard results are polled by the frontend, keep them for a few seconds.
+# Set DASHBOARD_CACHE_TTL=0 to disable caching.
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+
+def invalidate_dashboard_cache():
+    """Drop cached dashboard results after any employee or attendance write"""
+    dashboard_cache.clear()
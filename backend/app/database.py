@@ -1,60 +1,162 @@
-from pymongo import MongoClient
-from pymongo.server_api import ServerApi
 import os
 from dotenv import load_dotenv
-import certifi
 
 # Load environment variables
 load_dotenv()
 
 # Get MongoDB connection string from environment variable
 MONGODB_URL = os.getenv("MONGODB_URL", "")
+DATABASE_NAME = os.getenv("MONGODB_DATABASE", "hrms_lite")
 
-# Global variables
+# Global variables, populated on first use by get_collections()
 client = None
 db = None
 employee_collection = None
 attendance_collection = None
 connection_error = None  # Store the error for debugging
+index_errors = {}  # Index name -> why ensure_indexes() could not create it
+
+# pymongo.monitoring listeners attached to the client when it is created, either
+# listener instances or factories returning one (so their modules can avoid importing pymongo)
+EVENT_LISTENERS = []
+
+# Sequence numbers: generated employee IDs per prefix and data versions per collection
+COUNTER_COLLECTION = "counters"
+
+# Indexes the application relies on, as (collection, keys, options).
+# Built by `python -m app.manage ensure-indexes` or in the background on startup.
+INDEXES = [
+    ("employees", "employee_id", {"unique": True}),
+    ("employees", "email", {"unique": True}),
+    # Case-insensitive email and phone uniqueness, enforced by the insert itself.
+    # Partial, so it can be built before `backfill-employee-keys` fills older documents.
+    ("employees", "email_lower", {"unique": True, "partialFilterExpression": {"email_lower": {"$type": "string"}}}),
+    ("employees", "phone", {"unique": True}),
+    ("attendance", [("employee_id", 1), ("date", 1)], {"unique": True}),
+    # Covering indexes: attendance reads only return these three fields, so one
+    # employee's date range, and every employee's date range or most recent
+    # records on the dashboard, are answered from the index alone
+    ("attendance", [("employee_id", 1), ("date", 1), ("status", 1)], {}),
+    ("attendance", [("date", 1), ("employee_id", 1), ("status", 1)], {}),
+    # Background job queue, claimed oldest first; finished jobs expire after a week
+    ("jobs", [("status", 1), ("created_at", 1)], {}),
+    ("jobs", "finished_at", {"expireAfterSeconds": 7 * 24 * 3600}),
+    # At most one unfinished job per type queued with enqueue(once=True)
+    ("jobs", "active", {"unique": True, "sparse": True}),
+]
+
+def index_name(collection_name: str, keys) -> str:
+    """Collection and the name MongoDB gives an index on `keys`"""
+    keys = [(keys, 1)] if isinstance(keys, str) else keys
+    return f"{collection_name}.{'_'.join(f'{field}_{direction}' for field, direction in keys)}"
+
+def is_configured() -> bool:
+    """Check whether a usable MongoDB URL was provided"""
+    return bool(MONGODB_URL) and "placeholder" not in MONGODB_URL.lower()
+
+def _client_options() -> dict:
+    """Connection options for Atlas or a local server"""
+    if "mongodb+srv" in MONGODB_URL:
+        # MongoDB Atlas connection with stable API
+        # Use certifi CA bundle for SSL verification in Vercel
+        import certifi
+        from pymongo.server_api import ServerApi
+        return {
+            "server_api": ServerApi('1'),
+            "tlsCAFile": certifi.where(),
+            "serverSelectionTimeoutMS": 10000
+        }
+    # Local MongoDB connection
+    return {"serverSelectionTimeoutMS": 5000}
+
+# Connection pool of each server process. start_server.py divides MONGODB_MAX_CONNECTIONS
+# between its workers when MONGODB_MAX_POOL_SIZE is not set.
+POOL_SETTINGS = {
+    "maxPoolSize": "MONGODB_MAX_POOL_SIZE",
+    "minPoolSize": "MONGODB_MIN_POOL_SIZE",
+    "waitQueueTimeoutMS": "MONGODB_WAIT_QUEUE_TIMEOUT_MS"
+}
+
+def pool_options() -> dict:
+    """Pool sizes and wait timeout set in the environment, PyMongo defaults otherwise"""
+    return {option: int(os.environ[name]) for option, name in POOL_SETTINGS.items() if os.getenv(name)}
+
+def _forget_client():
+    """Drop the client without closing it, the next get_database() creates a new one"""
+    global client, db, employee_collection, attendance_collection
+    client = db = employee_collection = attendance_collection = None
+
+# A client's sockets and event loop must not be shared with a forked worker, which
+# creates its own on first use instead
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client)
+
+async def close():
+    """Close the client's pooled connections, on server shutdown"""
+    if client is not None:
+        await client.close()
+    _forget_client()
+
+def get_database():
+    """Return the application database, creating the client on first use.
+
+    Creating the client does no network I/O, it connects in the background on the first
+    query. Returns None when no database is configured.
+    """
+    global client, db, employee_collection, attendance_collection, connection_error
+    if client is not None or not is_configured():
+        return db
 
-# Configure MongoDB client with server API for Atlas
-if MONGODB_URL and "placeholder" not in MONGODB_URL.lower():
     try:
-        if "mongodb+srv" in MONGODB_URL:
-            # MongoDB Atlas connection with stable API
-            # Use certifi CA bundle for SSL verification in Vercel
-            client = MongoClient(
-                MONGODB_URL,
-                server_api=ServerApi('1'),
-                tlsCAFile=certifi.where(),
-                serverSelectionTimeoutMS=10000
-            )
-        else:
-            # Local MongoDB connection
-            client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=5000)
-        
-        # Test the connection
-        client.admin.command('ping')
-        print(f"✓ Successfully connected to MongoDB!")
-        
-        db = client["hrms_lite"]
+        # pymongo is imported here so cold starts that never touch the database skip it
+        from pymongo import AsyncMongoClient
+        listeners = [listener() if callable(listener) else listener for listener in EVENT_LISTENERS]
+        client = AsyncMongoClient(MONGODB_URL, event_listeners=listeners, **_client_options(), **pool_options())
+        db = client[DATABASE_NAME]
         employee_collection = db["employees"]
         attendance_collection = db["attendance"]
-        
-        # Create indexes for better performance
-        try:
-            employee_collection.create_index("employee_id", unique=True)
-            employee_collection.create_index("email", unique=True)
-            attendance_collection.create_index([("employee_id", 1), ("date", 1)], unique=True)
-            print("✓ Database indexes created successfully!")
-        except Exception as e:
-            print(f"Note: Indexes may already exist - {e}")
-            
+    except Exception as e:
+        connection_error = str(e)  # Store error for debugging
+        print(f"✗ MongoDB configuration error: {e}")
+        print("⚠ Running without database - API requests will return 503")
+    return db
+
+def get_collections():
+    """Return (employee_collection, attendance_collection), both None without a database"""
+    get_database()
+    return employee_collection, attendance_collection
+
+async def ensure_indexes():
+    """Verify the connection and create the indexes in INDEXES
+
+    Returns whether MongoDB was reachable, indexes that could not be created are in index_errors.
+    """
+    global connection_error, index_errors
+    if get_database() is None:
+        print("⚠ No MongoDB URL configured - Running without database")
+        return False
+
+    try:
+        await client.admin.command('ping')
+        print(f"✓ Successfully connected to MongoDB!")
+        connection_error = None
     except Exception as e:
         connection_error = str(e)  # Store error for debugging
         print(f"✗ MongoDB connection error: {e}")
         print(f"✗ Error type: {type(e).__name__}")
-        print("⚠ Running without database - API will return demo data")
-else:
-    print("⚠ No MongoDB URL configured - Running without database")
+        return False
 
+    # Each index on its own, one that cannot be built (say over duplicate values) does not stop the rest
+    errors = {}
+    for collection_name, keys, options in INDEXES:
+        try:
+            await db[collection_name].create_index(keys, **options)
+        except Exception as e:
+            errors[index_name(collection_name, keys)] = str(e)
+            print(f"✗ Index {index_name(collection_name, keys)} could not be created: {e}")
+    index_errors = errors
+    if errors:
+        print(f"✗ {len(errors)} of {len(INDEXES)} database indexes could not be created")
+    else:
+        print("✓ Database indexes created successfully!")
+    return True
@@ -0,0 +1,55 @@
+"""
+Attendance dates are stored as native BSON dates at midnight UTC and exchanged
+with clients as YYYY-MM-DD strings.
+
+Records written before `python -m app.manage migrate-attendance-dates` still hold
+the string form, so the filters built here match both representations and the
+migration can run while the application is serving requests.
+"""
+from datetime import date, datetime, time
+
+DAY_FORMAT = "%Y-%m-%d"
+
+# Aggregation expression turning the stored `date` field into a YYYY-MM-DD string
+DAY_EXPRESSION = {"$cond": [
+    {"$eq": [{"$type": "$date"}, "string"]},
+    "$date",
+    {"$dateToString": {"format": DAY_FORMAT, "date": "$date"}}
+]}
+
+def to_stored(day: date) -> datetime:
+    """Convert a calendar day to the value stored in MongoDB"""
+    return datetime.combine(day, time())
+
+def day_string(value) -> str:
+    """Convert a stored date, either form, to YYYY-MM-DD"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return value
+
+def date_equals(day: date) -> dict:
+    """Filter matching one day"""
+    return {"date": {"$in": [to_stored(day), day.isoformat()]}}
+
+def date_range(start: date | None = None, end: date | None = None, after: date | None = None) -> dict:
+    """Filter matching days from `start` to `end` inclusive, and strictly after `after`"""
+    operators = {}
+    if start:
+        operators["$gte"] = start
+    if after and (not start or after >= start):
+        operators.pop("$gte", None)
+        operators["$gt"] = after
+    if end:
+        operators["$lte"] = end
+    if not operators:
+        return {}
+    return {"$or": [
+        {"date": {op: to_stored(day) for op, day in operators.items()}},
+        {"date": {op: day.isoformat() for op, day in operators.items()}}
+    ]}
+
+def output_record(record: dict) -> dict:
+    """Return an attendance record with its date in the API's string form"""
+    if "date" in record:
+        record["date"] = day_string(record["date"])
+    return record
@@ -0,0 +1,58 @@
+import os
+from app import versions
+from app.cache import LRUCache
+from app.repository import get_repository
+
+# Only existing employees are cached; a miss always goes to storage, so a
+# newly added employee is visible immediately. add_employee and delete_employee
+# invalidate explicitly, and the whole cache is dropped when the employees data
+# version moves, so a profile never outlives the version an ETag was built from.
+employee_cache = LRUCache(
+    max_size=int(os.getenv("EMPLOYEE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("EMPLOYEE_CACHE_TTL", "60"))
+)
+
+# Employees data version the cached profiles were read at
+_cached_version = None
+
+async def _drop_outdated():
+    """Forget every cached profile once another write, possibly by another process, changed employees"""
+    global _cached_version
+    version = (await versions.current_versions())["employees"][0]
+    if version != _cached_version:
+        employee_cache.clear()
+        _cached_version = version
+
+async def find_employee(employee_id: str) -> dict | None:
+    """Look up an employee's basic profile, served from memory on the hot path"""
+    await _drop_outdated()
+    profile = employee_cache.get(employee_id)
+    if profile is not None:
+        return profile
+
+    profile = (await get_repository().employee_profiles([employee_id])).get(employee_id)
+    if profile is not None:
+        employee_cache.set(employee_id, profile)
+    return profile
+
+async def find_employee_profiles(employee_ids: list) -> dict:
+    """Map each existing employee ID to its profile, querying only the ones not cached"""
+    await _drop_outdated()
+    profiles = {}
+    unknown = []
+    for employee_id in employee_ids:
+        profile = employee_cache.get(employee_id)
+        if profile is not None:
+            profiles[employee_id] = profile
+        else:
+            unknown.append(employee_id)
+
+    if unknown:
+        for employee_id, profile in (await get_repository().employee_profiles(unknown)).items():
+            employee_cache.set(employee_id, profile)
+            profiles[employee_id] = profile
+    return profiles
+
+def invalidate_employee(employee_id: str):
+    """Forget a cached profile after the employee is added or removed"""
+    employee_cache.invalidate(employee_id)
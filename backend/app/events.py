@@ -0,0 +1,311 @@
+"""
+Live dashboard updates for GET /dashboard/stream.
+
+Writes publish what they changed to a single in-process broadcaster. It gathers
+the changes of a short window, computes one delta for them and encodes it as one
+Server-Sent Events frame, then hands the same bytes to every connected dashboard.
+Nothing is computed while no dashboard is connected.
+
+Attendance deltas are the rollup counter changes every attendance write already
+accumulates (see rollups.apply_deltas), employee deltas come from the employee
+routes. Both only see writes made by this process. With several server processes,
+set DASHBOARD_EVENTS=change_stream to feed the broadcaster from a MongoDB change
+stream instead; it needs a replica set, which every Atlas cluster is.
+
+Every published change is numbered, and dashboard stats record the number they
+were computed at, so a stream starting from a snapshot skips the changes already
+counted in it. A write and the publication of what it changed are wrapped in
+change(), and a stream's snapshot is read in snapshot_window(), which waits for
+the changes in flight and holds new ones back meanwhile; otherwise a counter
+written during the snapshot's reads would be counted in it and again as a delta.
+In change_stream mode changes reach the broadcaster after they are committed, so
+a snapshot there may still count a change made just before it twice, until the
+next snapshot.
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import orjson
+from app.database import get_database
+
+# local: writes made by this process, change_stream: every write to the database, off: no stream
+DASHBOARD_EVENTS = os.getenv("DASHBOARD_EVENTS", "local").lower()
+
+# A burst of writes (bulk marking, imports) within this window becomes a single frame
+COALESCE_SECONDS = 0.25
+
+# Frames buffered per dashboard before it is sent a fresh snapshot instead
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Comment lines keep idle connections from being closed by proxies
+KEEPALIVE_SECONDS = 15
+
+def encode_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+def _add_counts(target: dict, counts: dict):
+    for field, amount in counts.items():
+        target[field] = target.get(field, 0) + amount
+
+def merge_delta(target: dict, delta: dict):
+    """Add the counts of `delta` into `target`, both in the frame format"""
+    if "total_employees" in delta:
+        target["total_employees"] = target.get("total_employees", 0) + delta["total_employees"]
+    for section in ("total", "departments"):
+        if section in delta:
+            _add_counts(target.setdefault(section, {}), delta[section])
+    for section in ("days", "employees"):
+        for key, counts in delta.get(section, {}).items():
+            _add_counts(target.setdefault(section, {}).setdefault(key, {}), counts)
+
+class Broadcaster:
+    """Turns published changes into one encoded frame per window and fans it out"""
+
+    def __init__(self):
+        self.published = 0
+        # Writes between their database write and their publication
+        self.in_flight = 0
+        self.subscribers = set()
+        self._pending = []
+        self._first_pending = None
+        self._resync = False
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # Snapshots being read, new changes wait on the gate while there are any
+        self._snapshots = 0
+        self._gate = None
+        self._drained = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, delta: dict):
+        """Queue a change for the next frame, free when nobody is listening"""
+        if not self.subscribers or not delta:
+            return
+        self.published += 1
+        if self._first_pending is None:
+            self._first_pending = self.published
+        self._pending.append(delta)
+        self._wakeup.set()
+
+    async def begin_change(self):
+        while self._gate is not None:
+            await self._gate.wait()
+        self.in_flight += 1
+
+    def end_change(self):
+        self.in_flight -= 1
+        if not self.in_flight and self._drained is not None:
+            self._drained.set()
+
+    @asynccontextmanager
+    async def quiet(self):
+        """Hold new changes back and wait for those in flight, yielding the number of the last published one"""
+        self._snapshots += 1
+        if self._gate is None:
+            self._gate = asyncio.Event()
+            self._drained = asyncio.Event()
+        try:
+            # Set by the last change in flight, none can start while the gate is closed
+            if self.in_flight:
+                await self._drained.wait()
+            yield self.published
+        finally:
+            self._snapshots -= 1
+            if not self._snapshots:
+                gate, self._gate, self._drained = self._gate, None, None
+                gate.set()
+
+    def request_resync(self):
+        """Send every dashboard a fresh snapshot, for changes that cannot be expressed as a delta"""
+        if not self.subscribers:
+            return
+        self.published += 1
+        self._resync = True
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(COALESCE_SECONDS)
+            self._wakeup.clear()
+            pending, self._pending = self._pending, []
+            first, self._first_pending = self._first_pending, None
+            resync, self._resync = self._resync, False
+
+            if resync:
+                item = (0, self.published, None)
+            else:
+                combined = {}
+                for delta in pending:
+                    merge_delta(combined, delta)
+                item = (first, self.published, encode_event("delta", {"seq": self.published, **combined}))
+            self.broadcast(item)
+
+    def broadcast(self, item: tuple):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # A dashboard too slow to keep up starts over from a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((0, item[1], None))
+
+broadcaster = Broadcaster()
+
+@asynccontextmanager
+async def change():
+    """Wrap a write together with publishing what it changed, see snapshot_window"""
+    if DASHBOARD_EVENTS != "local":
+        yield
+        return
+    await broadcaster.begin_change()
+    try:
+        yield
+    finally:
+        broadcaster.end_change()
+
+@asynccontextmanager
+async def snapshot_window():
+    """Read a stream's snapshot inside this block, it yields the number of the last change it includes"""
+    if DASHBOARD_EVENTS != "local":
+        yield broadcaster.published
+        return
+    async with broadcaster.quiet() as seq:
+        yield seq
+
+def attendance_delta(deltas: dict) -> dict:
+    """Frame format of rollup counter changes, see rollups.add_delta"""
+    delta = {}
+    for rollup_id, entry in deltas.items():
+        if not any(entry["inc"].values()):
+            continue
+        scope, _, key = rollup_id.partition(":")
+        if rollup_id == "total":
+            delta["total"] = dict(entry["inc"])
+        elif scope == "day":
+            delta.setdefault("days", {})[key] = dict(entry["inc"])
+        elif scope == "employee":
+            delta.setdefault("employees", {})[key] = dict(entry["inc"])
+    return delta
+
+def employee_delta(departments: dict) -> dict:
+    """Frame format of employees added (positive) or removed (negative) per department"""
+    departments = {department: amount for department, amount in departments.items() if amount}
+    if not departments:
+        return {}
+    return {"total_employees": sum(departments.values()), "departments": departments}
+
+def attendance_changed(deltas: dict):
+    if DASHBOARD_EVENTS == "local":
+        broadcaster.publish(attendance_delta(deltas))
+
+def employees_changed(departments: dict):
+    if DASHBOARD_EVENTS == "local":
+        broadcaster.publish(employee_delta(departments))
+
+def change_delta(change: dict) -> dict | None:
+    """Frame format of a change stream event, None when it needs a resync.
+
+    Updates and deletes need the document's previous state, which MongoDB only
+    includes once pre-images are enabled (`python -m app.manage enable-change-stream-images`).
+    """
+    from app import rollups
+    from app.dates import day_string
+
+    operation = change["operationType"]
+    collection = change.get("ns", {}).get("coll")
+    after = change.get("fullDocument")
+    before = change.get("fullDocumentBeforeChange")
+    if operation == "update":
+        updated = change["updateDescription"]["updatedFields"]
+        fields = {"department"} if collection == "employees" else {"status", "date", "employee_id"}
+        if not fields & updated.keys():
+            return {}
+        if before is None:
+            return None
+        after = {**before, **updated}
+    elif operation == "insert":
+        before = None
+    elif operation == "delete":
+        if before is None:
+            return None
+    else:
+        return None
+
+    if collection == "employees":
+        departments = {}
+        for document, amount in ((before, -1), (after, 1)):
+            if document is not None:
+                department = document.get("department")
+                departments[department] = departments.get(department, 0) + amount
+        return employee_delta(departments)
+
+    deltas = {}
+    for document, amount in ((before, -1), (after, 1)):
+        if document is not None and document.get("status") in rollups.STATUS_FIELDS:
+            rollups.add_delta(deltas, document["employee_id"], None, day_string(document["date"]),
+                              document["status"], amount)
+    return attendance_delta(deltas)
+
+async def watch_changes():
+    """Feed the broadcaster from a change stream on the employees and attendance collections"""
+    from app.cache import invalidate_dashboard_cache
+    db = get_database()
+    pipeline = [{"$match": {"ns.coll": {"$in": ["employees", "attendance"]}}}]
+    while True:
+        try:
+            stream = await db.watch(pipeline, full_document_before_change="whenAvailable")
+            async with stream:
+                print("✓ Watching MongoDB changes for the live dashboard")
+                async for change in stream:
+                    # The write may come from another process, whose cache clearing this one never saw
+                    invalidate_dashboard_cache()
+                    delta = change_delta(change)
+                    if delta is None:
+                        broadcaster.request_resync()
+                    else:
+                        broadcaster.publish(delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Dashboard change stream error: {e}")
+        # Changes made while the stream was down are unknown
+        invalidate_dashboard_cache()
+        broadcaster.request_resync()
+        await asyncio.sleep(5)
+
+async def event_stream(load_snapshot):
+    """SSE body of one dashboard: a snapshot of the stats, then the deltas after it"""
+    # Subscribed before the snapshot is read, so no change can fall between the two
+    queue = broadcaster.subscribe()
+    try:
+        snapshot = await load_snapshot()
+        seq = snapshot["meta"]["seq"]
+        yield encode_event("snapshot", snapshot)
+        while True:
+            try:
+                first, last, frame = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if last <= seq:
+                # Already counted in the snapshot
+                continue
+            if frame is None or first <= seq:
+                snapshot = await load_snapshot()
+                seq = snapshot["meta"]["seq"]
+                yield encode_event("snapshot", snapshot)
+            else:
+                yield frame
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,278 @@
+"""
+Background jobs for maintenance work too slow to run inside a request.
+
+Jobs are documents in the `jobs` collection. Any server process may work the
+queue: a worker claims the oldest queued job with one atomic update and holds a
+lease on it, renewed in the background for as long as the job runs. A job whose
+worker died is picked up again once its lease runs out, so handlers are written
+to be safe to rerun. Without a long-running server (e.g. on Vercel), set JOBS_WORKER=false and
+work the queue with `python -m app.manage run-jobs`.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import re
+import uuid
+from app.database import get_collections, get_database
+
+JOB_COLLECTION = "jobs"
+
+# Run a worker inside each server process
+JOBS_WORKER = os.getenv("JOBS_WORKER", "true").lower() == "true"
+
+# How often an idle worker looks for jobs queued by other processes
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+# A running job not heard from for this long is assumed abandoned
+JOB_LEASE_SECONDS = 120
+
+MAX_ATTEMPTS = 3
+
+# Attendance records removed per round trip by cascading deletes
+DELETE_BATCH_SIZE = 1000
+
+WORKER_ID = uuid.uuid4().hex
+
+# Job type -> async handler(params, progress, attempt) returning the job result
+HANDLERS = {}
+
+_wakeup = asyncio.Event()
+
+def job_handler(job_type: str):
+    """Register an async function as the handler of a job type"""
+    def register(handler):
+        HANDLERS[job_type] = handler
+        return handler
+    return register
+
+def get_job_collection():
+    """Return the jobs collection, or None without a database"""
+    db = get_database()
+    return db[JOB_COLLECTION] if db is not None else None
+
+def job_view(job: dict) -> dict:
+    """Public representation of a job document"""
+    return {
+        "job_id": job["_id"],
+        "type": job["type"],
+        "status": job["status"],
+        "params": job.get("params", {}),
+        "progress": job.get("progress", {}),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+
+async def enqueue(job_type: str, params: dict, once: bool = False) -> str:
+    """Queue a job and return its ID, the local worker starts on it right away.
+
+    With `once`, a job of the same type that is still queued or running is returned
+    instead of queueing another.
+    """
+    from pymongo.errors import DuplicateKeyError
+    job = {
+        "_id": uuid.uuid4().hex,
+        "type": job_type,
+        "params": params,
+        "status": "queued",
+        "attempts": 0,
+        "progress": {},
+        "created_at": datetime.now(timezone.utc)
+    }
+    if once:
+        # Unique among unfinished jobs, see the jobs indexes in app/database.py
+        job["active"] = job_type
+    while True:
+        try:
+            await get_job_collection().insert_one(job)
+            break
+        except DuplicateKeyError:
+            existing = await get_job_collection().find_one({"active": job_type}, {"_id": 1})
+            # Otherwise it finished in between, queue a new one after all
+            if existing is not None:
+                return existing["_id"]
+    _wakeup.set()
+    return job["_id"]
+
+async def claim_job() -> dict | None:
+    """Atomically take the oldest queued job, or one whose worker's lease ran out"""
+    from pymongo import ReturnDocument
+    now = datetime.now(timezone.utc)
+    return await get_job_collection().find_one_and_update(
+        {"$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": now}}]},
+        {
+            "$set": {
+                "status": "running",
+                "worker": WORKER_ID,
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS)
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def finish_job(job_id: str, status: str, **fields):
+    await get_job_collection().update_one(
+        {"_id": job_id, "worker": WORKER_ID},
+        {"$set": {"status": status, "finished_at": datetime.now(timezone.utc), **fields},
+         "$unset": {"lease_until": "", "active": ""}}
+    )
+
+async def renew_lease(job_id: str):
+    """Keep extending this worker's lease on a running job until cancelled"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 4)
+        try:
+            await get_job_collection().update_one(
+                {"_id": job_id, "worker": WORKER_ID},
+                {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)}}
+            )
+        except Exception as e:
+            # Tried again on the next round, the lease outlasts a few missed ones
+            print(f"✗ Could not renew the lease of job {job_id}: {e}")
+
+async def run_job(job: dict):
+    """Run one claimed job to completion and record the outcome"""
+    handler = HANDLERS.get(job["type"])
+    if handler is None:
+        await finish_job(job["_id"], "failed", error=f"Unknown job type {job['type']!r}")
+        return
+    if job["attempts"] > MAX_ATTEMPTS:
+        await finish_job(job["_id"], "failed", error=f"Abandoned by its worker {MAX_ATTEMPTS} times")
+        return
+
+    async def progress(**fields):
+        """Record progress and renew the lease"""
+        await get_job_collection().update_one(
+            {"_id": job["_id"], "worker": WORKER_ID},
+            {"$set": {
+                "progress": fields,
+                "lease_until": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)
+            }}
+        )
+
+    # A single long step, such as a rebuild over years of attendance, reports no progress
+    renewer = asyncio.create_task(renew_lease(job["_id"]))
+    try:
+        result = await handler(job.get("params", {}), progress, job["attempts"])
+    except Exception as e:
+        print(f"✗ Job {job['_id']} ({job['type']}) failed: {e}")
+        await finish_job(job["_id"], "failed", error=str(e))
+        return
+    finally:
+        renewer.cancel()
+    await finish_job(job["_id"], "succeeded", result=result)
+
+async def work_queue() -> int:
+    """Run jobs until the queue is empty, returning how many ran"""
+    count = 0
+    while (job := await claim_job()) is not None:
+        await run_job(job)
+        count += 1
+    return count
+
+async def run_worker():
+    """Work the queue for the life of the server process"""
+    while True:
+        _wakeup.clear()
+        try:
+            await work_queue()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Job worker error: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+@job_handler("delete_employee_attendance")
+async def delete_employee_attendance(params: dict, progress, attempt: int) -> dict:
+    """Remove a deleted employee's attendance in batches, taking it out of the rollups and bitmaps"""
+    from app import bitmaps, rollups, versions
+    from app.cache import invalidate_dashboard_cache
+    from app.dates import day_string
+
+    employee_id = params["employee_id"]
+    department = params.get("department")
+    _, attendance_collection = get_collections()
+    deleted = 0
+    months = set()
+    # An earlier attempt may have died between removing a batch and decrementing its
+    # counters, which no rerun can tell apart, so the rollups are then recomputed instead
+    needs_rebuild = attempt > 1
+    # The first attempt leaves records claimed by another run alone, a rerun takes them over
+    query = {"employee_id": employee_id}
+    if not needs_rebuild:
+        query["deleting"] = {"$exists": False}
+    while True:
+        # The rollups are not touched while a rebuild replaces them
+        while await rollups.writes_paused():
+            await progress(deleted=deleted, waiting_for="rebuild")
+            await asyncio.sleep(rollups.PAUSE_CHECK_SECONDS)
+        batch = await attendance_collection.find(query, {"_id": 1}).limit(DELETE_BATCH_SIZE).to_list()
+        if not batch:
+            break
+        # Claim the batch before removing it, so this run decrements exactly the records it removed
+        # even while an abandoned run of the same job is still going
+        token = uuid.uuid4().hex
+        await attendance_collection.update_many(
+            {**query, "_id": {"$in": [record["_id"] for record in batch]}}, {"$set": {"deleting": token}}
+        )
+        claimed = await attendance_collection.find({"deleting": token}, {"_id": 1, "date": 1, "status": 1}).to_list()
+        result = await attendance_collection.delete_many({"deleting": token})
+        deltas = {}
+        for record in claimed:
+            day = day_string(record["date"])
+            months.add(day[:7])
+            if record.get("status") in rollups.STATUS_FIELDS:
+                rollups.add_delta(deltas, employee_id, department, day, record["status"], -1)
+        # Fewer only when a rerun took some of the claim over, it recomputes the rollups
+        if result.deleted_count == len(claimed):
+            await rollups.apply_deltas(deltas)
+        deleted += result.deleted_count
+        await progress(deleted=deleted)
+
+    # The employee's own counters are zero now, drop them rather than keep empty documents
+    db = get_database()
+    await db[rollups.ROLLUP_COLLECTION].delete_one({"_id": f"employee:{employee_id}"})
+    await db[rollups.ROLLUP_COLLECTION].delete_many({"_id": {"$regex": f"^employee_month:{re.escape(employee_id)}:"}})
+    if months:
+        await db[bitmaps.BITMAP_COLLECTION].delete_many(
+            {"_id": {"$in": [bitmaps.bitmap_id(employee_id, month) for month in months]}}
+        )
+
+    if deleted:
+        invalidate_dashboard_cache()
+        await versions.bump("attendance")
+    if needs_rebuild:
+        # One rebuild covers every rerun that needs it
+        return {"deleted_attendance": deleted, "rebuild_job_id": await enqueue("rebuild_rollups", {}, once=True)}
+    return {"deleted_attendance": deleted}
+
+@job_handler("rebuild_rollups")
+async def rebuild_rollups(params: dict, progress, attempt: int) -> dict:
+    """Recompute the attendance rollups and bitmaps from the raw records"""
+    from app import bitmaps, rollups
+    from app.cache import invalidate_dashboard_cache
+
+    rollup_count = await rollups.rebuild_rollups()
+    await progress(rollups=rollup_count)
+    bitmap_count = await bitmaps.rebuild_bitmaps() if bitmaps.BITMAPS_ENABLED else 0
+    invalidate_dashboard_cache()
+    return {"rollups": rollup_count, "bitmaps": bitmap_count}
+
+@job_handler("ensure_indexes")
+async def ensure_indexes(params: dict, progress, attempt: int) -> dict:
+    """Create every index the application relies on"""
+    from app import database
+    if not await database.ensure_indexes():
+        raise RuntimeError(f"Index creation failed: {database.connection_error}")
+    if database.index_errors:
+        raise RuntimeError(f"Indexes could not be created: {', '.join(database.index_errors)}")
+    return {"indexes": len(database.INDEXES)}
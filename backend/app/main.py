@@ -1,11 +1,55 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.routes.employees import router as employee_router
 from app.routes.attendance import router as attendance_router
 from app.routes.dashboard import router as dashboard_router
+from app.routes.reports import router as reports_router
+from app.routes.jobs import router as jobs_router
+from app import admission, bitmaps, breaker, compression, database, events, jobs, metrics, repository, rollups, versions
+import asyncio
 import os
 
-app = FastAPI(title="HRMS Lite")
+# Index creation is normally done once with `python -m app.manage ensure-indexes`.
+# When enabled, it also runs as a background task so it never delays the first request.
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+async def startup_maintenance():
+    """Create indexes, then queue the build of attendance rollups and bitmaps if this database has none yet"""
+    # Retried until MongoDB is reachable, the server may start before it
+    while not await database.ensure_indexes():
+        await asyncio.sleep(30)
+    # Every worker process gets here, the queue keeps a single build job for all of them
+    if await rollups.rollups_missing() or await bitmaps.bitmaps_missing():
+        job_id = await jobs.enqueue("rebuild_rollups", {}, once=True)
+        print(f"✓ Queued the first build of attendance rollups and bitmaps (job {job_id})")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not repository.uses_mongo():
+        print("⚠ Using in-memory storage - data is lost when the server stops")
+    else:
+        if ENSURE_INDEXES_ON_STARTUP:
+            app.state.index_task = asyncio.create_task(startup_maintenance())
+        if jobs.JOBS_WORKER:
+            app.state.job_worker = asyncio.create_task(jobs.run_worker())
+        if events.DASHBOARD_EVENTS == "change_stream":
+            app.state.change_watcher = asyncio.create_task(events.watch_changes())
+    yield
+    # Stop the background tasks, a job cut off here is picked up again once its lease runs out
+    tasks = [getattr(app.state, name, None) for name in ("index_task", "job_worker", "change_watcher")]
+    tasks = [task for task in tasks if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await database.close()
+
+app = FastAPI(title="HRMS Lite", lifespan=lifespan)
+
+# Per-client rate limits and slots for expensive routes, see app/admission.py.
+# Added first so it runs inside CORSMiddleware and browsers can read its 429/503 answers.
+app.add_middleware(admission.AdmissionMiddleware)
 
 # Allow requests from frontend deployed on Vercel and localhost
 app.add_middleware(
@@ -17,20 +61,58 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-After", "Retry-After"]
 )
 
+# ETag and Last-Modified of versioned read routes, see app/versions.py
+app.add_middleware(versions.ValidatorHeadersMiddleware)
+
+# Last good GET responses, served while MongoDB is unreachable, see app/breaker.py
+app.add_middleware(breaker.StaleResponseMiddleware)
+database.EVENT_LISTENERS.append(breaker.create_topology_listener)
+
+# br/gzip for JSON, NDJSON and CSV bodies above COMPRESSION_MIN_SIZE bytes
+app.add_middleware(compression.CompressionMiddleware)
+
+# Request timing and per-route MongoDB command counts, served at /debug/metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    database.EVENT_LISTENERS.append(metrics.create_command_listener)
+
 app.include_router(employee_router)
 app.include_router(attendance_router)
 app.include_router(dashboard_router)
+app.include_router(reports_router)
+app.include_router(jobs_router)
 
 @app.get("/")
-def root():
-    return {"message": "HRMS Lite backend running", "status": "active"}
+async def root():
+    return {
+        "message": "HRMS Lite backend running",
+        "status": "active",
+        "storage": "mongodb" if repository.uses_mongo() else "memory"
+    }
+
+@app.get("/health")
+async def health():
+    """Liveness, MongoDB circuit breaker state and admission counters; "degraded" while reads are served from stale copies"""
+    if not repository.uses_mongo():
+        return {"status": "ok", "storage": "memory", "admission": admission.snapshot()}
+    return {
+        "status": "ok" if breaker.mongo_breaker.state == "closed" else "degraded",
+        "storage": "mongodb",
+        "database": breaker.mongo_breaker.snapshot(),
+        "stale_responses": breaker.stale_responses.stats(),
+        "admission": admission.snapshot()
+    }
 
 @app.get("/debug/db-status")
-def debug_db_status():
-    from app.database import employee_collection, attendance_collection, MONGODB_URL, connection_error
+async def debug_db_status():
+    from app.directory import employee_cache
+    employee_collection, attendance_collection = database.get_collections()
+    MONGODB_URL = database.MONGODB_URL
     return {
         "mongodb_url_set": MONGODB_URL is not None and MONGODB_URL != "",
         "mongodb_url_length": len(MONGODB_URL) if MONGODB_URL else 0,
@@ -39,5 +121,14 @@ def debug_db_status():
         "employee_collection_connected": employee_collection is not None,
         "attendance_collection_connected": attendance_collection is not None,
         "env_var_exists": "MONGODB_URL" in os.environ,
-        "connection_error": connection_error
+        "connection_error": database.connection_error,
+        "index_errors": database.index_errors,
+        "employee_cache": employee_cache.stats()
     }
+
+@app.get("/debug/metrics")
+async def debug_metrics(request: Request, format: str | None = None):
+    """Request latency and MongoDB command metrics, as JSON or Prometheus text"""
+    if format == "prometheus" or "text/plain" in request.headers.get("accept", ""):
+        return PlainTextResponse(metrics.registry.prometheus(), media_type="text/plain; version=0.0.4")
+    return {"enabled": METRICS_ENABLED, "slow_request_ms": metrics.SLOW_REQUEST_MS, **metrics.registry.snapshot()}
@@ -0,0 +1,206 @@
+"""
+One-shot maintenance commands, run from the backend directory:
+
+    python -m app.manage ensure-indexes
+    python -m app.manage backfill-employee-keys
+    python -m app.manage migrate-attendance-dates
+    python -m app.manage rebuild-rollups
+    python -m app.manage verify-rollups
+    python -m app.manage rebuild-bitmaps
+    python -m app.manage run-jobs
+    python -m app.manage enable-change-stream-images
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+
+from app import bitmaps, database, jobs, rollups
+from app.dates import to_stored
+
+async def ensure_indexes(args) -> int:
+    if not await database.ensure_indexes():
+        return 1
+    return 1 if database.index_errors else 0
+
+async def backfill_employee_keys(args) -> int:
+    employee_collection, _ = database.get_collections()
+    if employee_collection is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    # A single server-side pipeline update, no documents travel to the client
+    result = await employee_collection.update_many(
+        {"email_lower": {"$exists": False}},
+        [{"$set": {"email_lower": {"$toLower": "$email"}}}]
+    )
+    print(f"✓ Added email_lower to {result.modified_count} employees")
+
+    # The unique email_lower and phone indexes cannot be built while two employees share a value
+    conflicts = 0
+    for field in ("email_lower", "phone"):
+        pipeline = [
+            {"$match": {field: {"$type": "string"}}},
+            {"$group": {"_id": f"${field}", "employee_ids": {"$push": "$employee_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        async for group in await employee_collection.aggregate(pipeline, allowDiskUse=True):
+            conflicts += 1
+            print(f"✗ {field} {group['_id']!r} is shared by {', '.join(sorted(group['employee_ids']))}")
+    if conflicts:
+        print(f"✗ {conflicts} duplicate values, change or delete all but one employee of each before running ensure-indexes")
+        return 1
+    print("✓ No duplicate emails or phone numbers")
+    return 0
+
+async def migrate_attendance_dates(args) -> int:
+    """Convert string attendance dates to BSON dates, one batch at a time.
+
+    Every batch only touches records still holding a string, so the command can be
+    stopped and rerun at any point, and the API keeps serving both forms meanwhile.
+    """
+    _, attendance_collection = database.get_collections()
+    if attendance_collection is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+
+    from pymongo import DeleteOne, UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    converted = duplicates = 0
+    remaining = await attendance_collection.count_documents({"date": {"$type": "string"}})
+    print(f"Converting {remaining} attendance records in batches of {args.batch_size}")
+    while True:
+        # Served by the (date, employee_id, status) index, strings sort before dates
+        batch = await attendance_collection.find(
+            {"date": {"$type": "string"}}, {"date": 1}
+        ).limit(args.batch_size).to_list()
+        if not batch:
+            break
+
+        filters = []
+        operations = []
+        for record in batch:
+            try:
+                stored = to_stored(date.fromisoformat(record["date"]))
+            except ValueError:
+                print(f"✗ Record {record['_id']} has an unparseable date {record['date']!r}, fix it and rerun")
+                return 1
+            # Matching on the old value leaves records changed since they were read alone
+            filters.append({"_id": record["_id"], "date": record["date"]})
+            operations.append(UpdateOne(filters[-1], {"$set": {"date": stored}}))
+
+        try:
+            result = await attendance_collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        except BulkWriteError as e:
+            converted += e.details.get("nModified", 0)
+            # The same employee and day was marked again in the new form while this one waited,
+            # the newer record wins
+            stale = [filters[error["index"]] for error in e.details.get("writeErrors", [])
+                     if error.get("code") == 11000]
+            if len(stale) < len(e.details.get("writeErrors", [])):
+                print(f"✗ Migration stopped: {e.details['writeErrors'][0].get('errmsg')}")
+                return 1
+            await attendance_collection.bulk_write([DeleteOne(f) for f in stale], ordered=False)
+            duplicates += len(stale)
+
+        print(f"  {converted} converted")
+        if args.pause:
+            await asyncio.sleep(args.pause)
+
+    print(f"✓ Converted {converted} attendance dates, paged attendance reads are available again within a minute")
+    if duplicates:
+        print(f"⚠ Removed {duplicates} older duplicates of records marked again during the migration, "
+              "run rebuild-rollups to bring the counters back in line")
+    return 0
+
+async def rebuild_rollups(args) -> int:
+    if database.get_database() is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    count = await rollups.rebuild_rollups()
+    print(f"✓ Rebuilt {count} attendance rollups")
+    return 0
+
+async def verify_rollups(args) -> int:
+    if database.get_database() is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    mismatches = await rollups.verify_rollups()
+    for mismatch in mismatches[:args.show]:
+        print(f"✗ {mismatch['_id']}: expected (present, absent) {mismatch['expected']}, found {mismatch['actual']}")
+    if mismatches:
+        print(f"✗ {len(mismatches)} rollups differ from the raw attendance, run rebuild-rollups to fix them")
+        return 1
+    print("✓ Attendance rollups match the raw records")
+    return 0
+
+async def rebuild_bitmaps(args) -> int:
+    if database.get_database() is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    count = await bitmaps.rebuild_bitmaps()
+    print(f"✓ Rebuilt {count} attendance bitmaps")
+    return 0
+
+async def run_jobs(args) -> int:
+    """Work the background job queue, for deployments without a resident worker"""
+    if database.get_database() is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    if args.forever:
+        await jobs.run_worker()
+    count = await jobs.work_queue()
+    print(f"✓ Ran {count} background jobs")
+    return 0
+
+async def enable_change_stream_images(args) -> int:
+    """Record documents' previous state in change events, needed by DASHBOARD_EVENTS=change_stream"""
+    db = database.get_database()
+    if db is None:
+        print("⚠ No MongoDB URL configured")
+        return 1
+    for name in ("employees", "attendance"):
+        await db.command("collMod", name, changeStreamPreAndPostImages={"enabled": True})
+    print("✓ Enabled change stream pre-images on employees and attendance")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="HRMS Lite maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    command = subparsers.add_parser("ensure-indexes", help="Verify the connection and create all indexes")
+    command.set_defaults(handler=ensure_indexes)
+
+    command = subparsers.add_parser("backfill-employee-keys", help="Add email_lower to employees created before it existed and report duplicate emails or phones")
+    command.set_defaults(handler=backfill_employee_keys)
+
+    command = subparsers.add_parser("migrate-attendance-dates", help="Convert string attendance dates to BSON dates")
+    command.add_argument("--batch-size", type=int, default=1000, help="Records converted per round trip")
+    command.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    command.set_defaults(handler=migrate_attendance_dates)
+
+    command = subparsers.add_parser("rebuild-rollups", help="Recompute attendance rollups from raw records")
+    command.set_defaults(handler=rebuild_rollups)
+
+    command = subparsers.add_parser("verify-rollups", help="Check attendance rollups against raw records")
+    command.add_argument("--show", type=int, default=20, help="Number of mismatches to print")
+    command.set_defaults(handler=verify_rollups)
+
+    command = subparsers.add_parser("rebuild-bitmaps", help="Recompute the monthly attendance bitmaps from raw records")
+    command.set_defaults(handler=rebuild_bitmaps)
+
+    command = subparsers.add_parser("run-jobs", help="Run queued background jobs until the queue is empty")
+    command.add_argument("--forever", action="store_true", help="Keep waiting for new jobs instead of exiting")
+    command.set_defaults(handler=run_jobs)
+
+    command = subparsers.add_parser("enable-change-stream-images",
+                                    help="Include previous document state in change events (MongoDB 6.0+)")
+    command.set_defaults(handler=enable_change_stream_images)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
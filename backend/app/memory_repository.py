@@ -0,0 +1,402 @@
+"""
+In-process implementation of the repository, for running without MongoDB.
+
+Employees are held in a dict keyed by employee_id, with hash indexes on the
+lowercase email and the phone number that enforce the same uniqueness as the
+MongoDB indexes, and a sorted ID list for keyset pages. Every employee's
+attendance days are kept sorted, so date ranges are two binary searches, and a
+per-day index serves the all-employee range queries. Counters use the same keys
+and deltas as the rollups collection, which also feed the live dashboard.
+
+Data lives only as long as the process. All methods run without awaiting, so
+each write is atomic with respect to other requests.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+import calendar
+import itertools
+import random
+import re
+from app import events, rollups
+from app.dates import to_stored
+from app.repository import DUPLICATE_MESSAGES, PROFILE_FIELDS, DuplicateEmployeeError, Repository
+
+class MemoryCursor:
+    """The part of PyMongo's async cursor the routes use, over an iterator of documents"""
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def batch_size(self, size: int):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: int | None = None) -> list:
+        return list(itertools.islice(self._documents, length))
+
+    async def close(self):
+        pass
+
+def _record(employee_id: str, day: date, status: str) -> dict:
+    return {"employee_id": employee_id, "date": to_stored(day), "status": status}
+
+def _as_day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+class MemoryRepository(Repository):
+    name = "memory"
+
+    def __init__(self):
+        self._employees = {}       # employee_id -> stored document
+        self._emails = {}          # lowercase email -> employee_id
+        self._phones = {}          # phone -> employee_id
+        self._employee_ids = []    # sorted employee IDs
+        self._days = {}            # employee_id -> sorted days with a record
+        self._status = {}          # (employee_id, day) -> status
+        self._by_day = {}          # day -> set of employee IDs with a record
+        self._dates = []           # sorted days with any record
+        self._counters = {}        # rollup ID -> {"present", "absent"}
+        self._id_counters = {}     # employee ID prefix -> last suffix handed out
+
+    def _insert_employee(self, document: dict) -> str | None:
+        """Store an employee unless a unique key is taken, returning the error message"""
+        employee_id = document["employee_id"]
+        email = document.get("email_lower") or document["email"].lower()
+        if employee_id in self._employees:
+            return DUPLICATE_MESSAGES["employee_id"]
+        if email in self._emails:
+            return DUPLICATE_MESSAGES["email"]
+        if document["phone"] in self._phones:
+            return DUPLICATE_MESSAGES["phone"]
+        self._employees[employee_id] = {**document, "email_lower": email}
+        self._emails[email] = employee_id
+        self._phones[document["phone"]] = employee_id
+        insort(self._employee_ids, employee_id)
+        return None
+
+    def _insert_record(self, employee_id: str, day: date, status: str) -> bool:
+        """Store an attendance record unless the employee has one that day"""
+        if (employee_id, day) in self._status:
+            return False
+        self._status[(employee_id, day)] = status
+        insort(self._days.setdefault(employee_id, []), day)
+        if day not in self._by_day:
+            self._by_day[day] = set()
+            insort(self._dates, day)
+        self._by_day[day].add(employee_id)
+        return True
+
+    def _apply(self, deltas: dict):
+        """Apply rollup deltas to the counters and publish them to live dashboards"""
+        if not deltas:
+            return
+        for rollup_id, entry in deltas.items():
+            counts = self._counters.setdefault(rollup_id, {"present": 0, "absent": 0})
+            for field, amount in entry["inc"].items():
+                counts[field] += amount
+        events.attendance_changed(deltas)
+
+    def _department(self, employee_id: str) -> str | None:
+        return self._employees.get(employee_id, {}).get("department")
+
+    def load(self, employees=(), attendance=()):
+        """Bulk-load employee documents and {employee_id, date, status} records, skipping duplicates"""
+        for document in employees:
+            self._insert_employee(document)
+        deltas = {}
+        for record in attendance:
+            day = _as_day(record["date"])
+            if self._insert_record(record["employee_id"], day, record["status"]):
+                rollups.add_delta(deltas, record["employee_id"], self._department(record["employee_id"]),
+                                  day.isoformat(), record["status"], 1)
+        self._apply(deltas)
+
+    # Employees
+
+    async def add_employee(self, document: dict):
+        error = self._insert_employee(document)
+        if error:
+            raise DuplicateEmployeeError(error)
+
+    async def add_employees(self, documents: list) -> list:
+        return [self._insert_employee(document) for document in documents]
+
+    async def remove_employee(self, employee_id: str) -> dict | None:
+        document = self._employees.pop(employee_id, None)
+        if document is None:
+            return None
+        self._emails.pop(document["email_lower"], None)
+        self._phones.pop(document["phone"], None)
+        del self._employee_ids[bisect_left(self._employee_ids, employee_id)]
+        return {"department": document.get("department")}
+
+    async def employee_profiles(self, employee_ids: list) -> dict:
+        return {
+            employee_id: {field: self._employees[employee_id].get(field) for field in PROFILE_FIELDS if field != "_id"}
+            for employee_id in employee_ids if employee_id in self._employees
+        }
+
+    def list_employees(self, after: str | None = None, limit: int | None = None):
+        start = bisect_right(self._employee_ids, after) if after else 0
+        stop = start + limit if limit else None
+        # Copied, so a write during a streamed response does not disturb the iteration
+        employee_ids = self._employee_ids[start:stop]
+        return MemoryCursor(
+            {key: value for key, value in self._employees[employee_id].items() if key != "email_lower"}
+            for employee_id in employee_ids if employee_id in self._employees
+        )
+
+    def _highest_suffix(self, prefix: str) -> int:
+        """Largest numeric suffix already used with this prefix"""
+        pattern = re.compile(f"{re.escape(prefix)}([0-9]+)")
+        start = bisect_left(self._employee_ids, prefix)
+        highest = 0
+        for employee_id in itertools.takewhile(lambda i: i.startswith(prefix), self._employee_ids[start:]):
+            match = pattern.fullmatch(employee_id)
+            if match:
+                highest = max(highest, int(match.group(1)))
+        return highest
+
+    async def allocate_employee_ids(self, prefix: str, count: int) -> list:
+        if prefix not in self._id_counters:
+            self._id_counters[prefix] = self._highest_suffix(prefix)
+        while True:
+            first = self._id_counters[prefix] + 1
+            self._id_counters[prefix] += count
+            employee_ids = [f"{prefix}{n:04d}" for n in range(first, first + count)]
+            # Hand-entered IDs may have overtaken the counter since it was seeded
+            if not any(employee_id in self._employees for employee_id in employee_ids):
+                return employee_ids
+            self._id_counters[prefix] = max(self._id_counters[prefix], self._highest_suffix(prefix))
+
+    async def employee_counts(self) -> dict:
+        departments = Counter(document.get("department") for document in self._employees.values())
+        return {
+            "total": len(self._employees),
+            "departments": [{"department": name, "count": count} for name, count in departments.most_common()]
+        }
+
+    # Attendance
+
+    async def mark_attendance(self, records: list, departments: dict) -> list:
+        # Held back while a live dashboard's snapshot is read, see events.snapshot_window
+        async with events.change():
+            errors = []
+            deltas = {}
+            for record in records:
+                employee_id, day, status = record["employee_id"], record["date"], record["status"]
+                if not self._insert_record(employee_id, day, status):
+                    errors.append("duplicate")
+                    continue
+                errors.append(None)
+                rollups.add_delta(deltas, employee_id, departments.get(employee_id), day.isoformat(), status, 1)
+            self._apply(deltas)
+        return errors
+
+    async def update_attendance(self, employee_id: str, day: date, status: str, department: str) -> str | None:
+        async with events.change():
+            previous = self._status.get((employee_id, day))
+            if previous is None:
+                return None
+            self._status[(employee_id, day)] = status
+            if previous != status:
+                deltas = {}
+                if previous in rollups.STATUS_FIELDS:
+                    rollups.add_delta(deltas, employee_id, department, day.isoformat(), previous, -1)
+                rollups.add_delta(deltas, employee_id, department, day.isoformat(), status, 1)
+                self._apply(deltas)
+        return previous
+
+    async def dates_migrated(self) -> bool:
+        return True
+
+    def _range_records(self, start: date | None, end: date | None, status: str | None = None,
+                       after: tuple | None = None):
+        """Records of every employee in (day, employee_id) order"""
+        low = bisect_left(self._dates, start) if start else 0
+        if after:
+            low = max(low, bisect_left(self._dates, after[0]))
+        high = bisect_right(self._dates, end) if end else len(self._dates)
+        for day in self._dates[low:high]:
+            for employee_id in sorted(self._by_day.get(day, ())):
+                if after and (day, employee_id) <= after:
+                    continue
+                record_status = self._status.get((employee_id, day))
+                if record_status is None or (status and record_status != status):
+                    continue
+                yield _record(employee_id, day, record_status)
+
+    def attendance_range(self, start: date, end: date, status: str | None = None,
+                         after: tuple | None = None, limit: int | None = None):
+        return MemoryCursor(itertools.islice(self._range_records(start, end, status, after), limit))
+
+    def _employee_days(self, employee_id: str, day: date | None, start: date | None,
+                       end: date | None, after: date | None = None) -> list:
+        days = self._days.get(employee_id, [])
+        if day:
+            return [day] if (employee_id, day) in self._status else []
+        low = bisect_left(days, start) if start else 0
+        if after:
+            low = max(low, bisect_right(days, after))
+        high = bisect_right(days, end) if end else len(days)
+        return days[low:high]
+
+    def employee_attendance(self, employee_id: str, day: date | None = None, start: date | None = None,
+                            end: date | None = None, after: date | None = None, limit: int | None = None):
+        days = self._employee_days(employee_id, day, start, end, after)[:limit]
+        return MemoryCursor(
+            _record(employee_id, record_day, self._status[(employee_id, record_day)])
+            for record_day in days if (employee_id, record_day) in self._status
+        )
+
+    async def count_present(self, employee_id: str, day: date | None = None,
+                            start: date | None = None, end: date | None = None) -> int:
+        return sum(
+            1 for record_day in self._employee_days(employee_id, day, start, end)
+            if self._status.get((employee_id, record_day)) == "Present"
+        )
+
+    def export_attendance(self, start: date | None = None, end: date | None = None,
+                          employee_id: str | None = None):
+        if employee_id:
+            return self.employee_attendance(employee_id, start=start, end=end)
+        return MemoryCursor(self._range_records(start, end))
+
+    async def remove_employee_attendance(self, employee_id: str, department: str | None) -> str | None:
+        async with events.change():
+            deltas = {}
+            for day in self._days.pop(employee_id, []):
+                status = self._status.pop((employee_id, day))
+                employees = self._by_day[day]
+                employees.discard(employee_id)
+                if not employees:
+                    del self._by_day[day]
+                    del self._dates[bisect_left(self._dates, day)]
+                if status in rollups.STATUS_FIELDS:
+                    rollups.add_delta(deltas, employee_id, department, day.isoformat(), status, -1)
+            self._apply(deltas)
+        # The employee's own counters are zero now
+        for rollup_id in [key for key in self._counters
+                          if key == f"employee:{employee_id}" or key.startswith(f"employee_month:{employee_id}:")]:
+            del self._counters[rollup_id]
+        return None
+
+    # Dashboard and reports
+
+    async def attendance_totals(self, day: str) -> dict:
+        empty = {"present": 0, "absent": 0}
+        return {
+            "total": dict(self._counters.get("total", empty)),
+            "day": dict(self._counters.get(f"day:{day}", empty))
+        }
+
+    async def recent_attendance(self, since: date, limit: int) -> list:
+        records = []
+        for day in reversed(self._dates[bisect_left(self._dates, since):]):
+            for employee_id in sorted(self._by_day[day]):
+                records.append(_record(employee_id, day, self._status[(employee_id, day)]))
+                if len(records) >= limit:
+                    return records
+        return records
+
+    async def employee_summaries(self, today: str, recent_since: date, department: str | None = None,
+                                 skip: int = 0, limit: int | None = None) -> tuple:
+        matching = [
+            document for document in self._employees.values()
+            if document.get("employee_id") and (not department or document.get("department") == department)
+        ]
+        matching.sort(key=lambda document: (document.get("full_name", ""), document["employee_id"]))
+        page = matching[skip:skip + limit if limit is not None else None]
+
+        summaries = []
+        for document in page:
+            employee_id = document["employee_id"]
+            totals = self._counters.get(f"employee:{employee_id}", {})
+            present, absent = totals.get("present", 0), totals.get("absent", 0)
+            # Last 5 records from the past week, newest first
+            days = self._days.get(employee_id, [])
+            recent_days = days[bisect_left(days, recent_since):][-5:][::-1]
+            recent = [
+                {"employee_id": employee_id, "date": day.isoformat(), "status": self._status[(employee_id, day)]}
+                for day in recent_days
+            ]
+            summaries.append({
+                "employee_id": employee_id,
+                "full_name": document.get("full_name") or "Unknown",
+                "email": document.get("email") or "",
+                "phone": document.get("phone") or "",
+                "department": document.get("department") or "Unknown",
+                "total_records": present + absent,
+                "present_count": present,
+                "absent_count": absent,
+                "attendance_rate": round(present / (present + absent) * 100, 2) if present + absent else 0.0,
+                "today_status": recent[0]["status"] if recent and recent[0]["date"] == today else "Not Marked",
+                "recent_attendance": recent
+            })
+        return len(matching), summaries
+
+    async def month_bitmaps(self, month: str, department: str | None = None) -> list | None:
+        year, month_number = int(month[:4]), int(month[5:])
+        first = date(year, month_number, 1)
+        last = date(year, month_number, calendar.monthrange(year, month_number)[1])
+        documents = []
+        for employee_id in sorted(self._days):
+            employee_department = self._department(employee_id)
+            if department and employee_department != department:
+                continue
+            days = self._days[employee_id]
+            bits = {"present": 0, "absent": 0}
+            for day in days[bisect_left(days, first):bisect_right(days, last)]:
+                field = rollups.STATUS_FIELDS.get(self._status[(employee_id, day)])
+                if field:
+                    bits[field] |= 1 << (day.day - 1)
+            if bits["present"] or bits["absent"]:
+                documents.append({"employee_id": employee_id, "department": employee_department, **bits})
+        return documents
+
+DEMO_NAMES = [
+    "John Doe", "Jane Smith", "Priya Sharma", "Rahul Verma", "Ananya Iyer", "Michael Chen",
+    "Sara Khan", "Arjun Mehta", "Emily Davis", "Vikram Singh", "Neha Gupta", "Carlos Rivera"
+]
+
+def seed_demo_data(repository: MemoryRepository, days: int = 30, seed: int = 7):
+    """Fill an empty store with sample employees and weekday attendance up to today"""
+    from app.routes.employees import PREDEFINED_DEPARTMENTS, employee_document, employee_id_prefix
+
+    rng = random.Random(seed)
+    employees = []
+    for i, full_name in enumerate(DEMO_NAMES):
+        employees.append(employee_document({
+            "employee_id": f"{employee_id_prefix(full_name)}{i + 1:04d}",
+            "full_name": full_name,
+            "email": f"{full_name.lower().replace(' ', '.')}@example.com",
+            "phone": f"98765{i:05d}",
+            "department": PREDEFINED_DEPARTMENTS[i % 6]
+        }))
+
+    today = date.today()
+    attendance = []
+    for offset in range(days, -1, -1):
+        day = today - timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for employee in employees:
+            # Today is only partly marked, as during a working day
+            if offset == 0 and rng.random() < 0.4:
+                continue
+            status = "Present" if rng.random() < 0.9 else "Absent"
+            attendance.append({"employee_id": employee["employee_id"], "date": day, "status": status})
+    repository.load(employees, attendance)
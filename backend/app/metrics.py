@@ -0,0 +1,259 @@
+"""
+Per-route request latency histograms and MongoDB command counters.
+
+MetricsMiddleware times every request and CommandMetricsListener attributes each
+MongoDB command to the request that issued it through a context variable, so a
+route doing one query per item shows up as a high commands-per-request number.
+Both are served from /debug/metrics as JSON or Prometheus text.
+"""
+from contextvars import ContextVar
+import os
+import threading
+import time
+
+# Requests slower than this are logged with their query breakdown
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Commands kept per request for the slow request log
+MAX_BREAKDOWN = 50
+
+class RequestStats:
+    """Database activity of the request currently being served"""
+    __slots__ = ("commands", "command_seconds", "documents", "by_command", "breakdown")
+
+    def __init__(self):
+        self.commands = 0
+        self.command_seconds = 0.0
+        self.documents = 0
+        self.by_command = {}
+        self.breakdown = []
+
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+class RouteMetrics:
+    __slots__ = ("requests", "errors", "seconds", "buckets", "commands", "command_seconds", "documents", "by_command")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.commands = 0
+        self.command_seconds = 0.0
+        self.documents = 0
+        self.by_command = {}
+
+class MetricsRegistry:
+    """In-memory aggregates keyed by (method, route template)"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _route(self, key) -> RouteMetrics:
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = RouteMetrics()
+        return metrics
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            metrics = self._route((method, route))
+            metrics.requests += 1
+            metrics.seconds += seconds
+            if status >= 500:
+                metrics.errors += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[i] += 1
+                    break
+            metrics.commands += stats.commands
+            metrics.command_seconds += stats.command_seconds
+            metrics.documents += stats.documents
+            for name, (count, duration) in stats.by_command.items():
+                total_count, total_seconds = metrics.by_command.get(name, (0, 0.0))
+                metrics.by_command[name] = (total_count + count, total_seconds + duration)
+
+    def record_background_command(self, name: str, seconds: float, documents: int):
+        """Commands issued outside any request, such as startup maintenance"""
+        with self._lock:
+            metrics = self._route(("-", "background"))
+            metrics.commands += 1
+            metrics.command_seconds += seconds
+            metrics.documents += documents
+            count, total = metrics.by_command.get(name, (0, 0.0))
+            metrics.by_command[name] = (count + 1, total + seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = []
+            for (method, route), m in sorted(self._routes.items(), key=lambda item: item[0][1]):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                buckets["+Inf"] = m.requests
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "requests": m.requests,
+                    "errors": m.errors,
+                    "latency_seconds_sum": round(m.seconds, 6),
+                    "latency_mean_ms": round(m.seconds / m.requests * 1000, 3) if m.requests else 0.0,
+                    "latency_buckets": buckets,
+                    "mongo_commands": m.commands,
+                    "mongo_commands_per_request": round(m.commands / m.requests, 2) if m.requests else None,
+                    "mongo_command_seconds": round(m.command_seconds, 6),
+                    "mongo_documents_returned": m.documents,
+                    "mongo_by_command": {
+                        name: {"count": count, "seconds": round(total, 6)}
+                        for name, (count, total) in sorted(m.by_command.items())
+                    }
+                })
+            return {"uptime_seconds": round(time.time() - self.started_at, 1), "routes": routes}
+
+    def prometheus(self) -> str:
+        """Render the snapshot in the Prometheus text exposition format"""
+        lines = [
+            "# HELP hrms_http_request_duration_seconds Request latency by route",
+            "# TYPE hrms_http_request_duration_seconds histogram",
+        ]
+        snapshot = self.snapshot()
+        for r in snapshot["routes"]:
+            if r["route"] == "background":
+                continue
+            labels = f'method="{r["method"]}",route="{r["route"]}"'
+            for bound, count in r["latency_buckets"].items():
+                lines.append(f'hrms_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"hrms_http_request_duration_seconds_sum{{{labels}}} {r['latency_seconds_sum']}")
+            lines.append(f"hrms_http_request_duration_seconds_count{{{labels}}} {r['requests']}")
+
+        lines += ["# HELP hrms_http_request_errors_total Requests answered with a 5xx status",
+                  "# TYPE hrms_http_request_errors_total counter"]
+        for r in snapshot["routes"]:
+            if r["route"] != "background":
+                lines.append(f'hrms_http_request_errors_total{{method="{r["method"]}",route="{r["route"]}"}} {r["errors"]}')
+
+        lines += ["# HELP hrms_mongo_commands_total MongoDB commands by issuing route and command",
+                  "# TYPE hrms_mongo_commands_total counter"]
+        for r in snapshot["routes"]:
+            for name, command in r["mongo_by_command"].items():
+                lines.append(f'hrms_mongo_commands_total{{route="{r["route"]}",command="{name}"}} {command["count"]}')
+
+        lines += ["# HELP hrms_mongo_command_duration_seconds_total Time spent in MongoDB commands",
+                  "# TYPE hrms_mongo_command_duration_seconds_total counter"]
+        for r in snapshot["routes"]:
+            for name, command in r["mongo_by_command"].items():
+                lines.append(
+                    f'hrms_mongo_command_duration_seconds_total{{route="{r["route"]}",command="{name}"}} {command["seconds"]}'
+                )
+
+        lines += ["# HELP hrms_mongo_documents_returned_total Documents returned by MongoDB",
+                  "# TYPE hrms_mongo_documents_returned_total counter"]
+        for r in snapshot["routes"]:
+            lines.append(f'hrms_mongo_documents_returned_total{{route="{r["route"]}"}} {r["mongo_documents_returned"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.started_at = time.time()
+
+registry = MetricsRegistry()
+
+def _documents_in_reply(reply) -> int:
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    return 0
+
+class CommandMetrics:
+    """Attribute every MongoDB command to the request that issued it"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, _documents_in_reply(event.reply))
+
+    def failed(self, event):
+        self._record(event, 0)
+
+    def _record(self, event, documents: int):
+        seconds = event.duration_micros / 1_000_000
+        stats = current_request.get()
+        if stats is None:
+            registry.record_background_command(event.command_name, seconds, documents)
+            return
+        stats.commands += 1
+        stats.command_seconds += seconds
+        stats.documents += documents
+        count, total = stats.by_command.get(event.command_name, (0, 0.0))
+        stats.by_command[event.command_name] = (count + 1, total + seconds)
+        if len(stats.breakdown) < MAX_BREAKDOWN:
+            stats.breakdown.append((event.command_name, event.database_name, seconds, documents))
+
+def create_command_listener():
+    """Build the pymongo listener, pymongo is imported here to keep it off the cold start path"""
+    from pymongo.monitoring import CommandListener
+
+    class CommandMetricsListener(CommandMetrics, CommandListener):
+        pass
+
+    return CommandMetricsListener()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed until their last byte"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        event_stream = False
+
+        async def send_with_status(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - started
+            current_request.reset(token)
+            # FastAPI stores the matched route in the scope, label by its template to keep cardinality low
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            registry.record_request(scope["method"], route_path, status, seconds, stats)
+            # Event streams stay open for as long as the dashboard does, that is not slowness
+            if seconds * 1000 >= SLOW_REQUEST_MS and not event_stream:
+                log_slow_request(scope, route_path, status, seconds, stats)
+
+def log_slow_request(scope, route_path: str, status: int, seconds: float, stats: RequestStats):
+    print(
+        f"⚠ Slow request {scope['method']} {scope['path']} ({route_path}) -> {status} in {seconds * 1000:.1f}ms: "
+        f"{stats.commands} MongoDB commands, {stats.command_seconds * 1000:.1f}ms in database, "
+        f"{stats.documents} documents returned"
+    )
+    for name, _, duration, documents in stats.breakdown:
+        print(f"    {name:<16} {duration * 1000:>8.1f}ms  {documents} docs")
+    if stats.commands > len(stats.breakdown):
+        print(f"    ... {stats.commands - len(stats.breakdown)} more commands")
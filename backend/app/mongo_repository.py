@@ -0,0 +1,445 @@
+"""
+MongoDB implementation of the repository.
+
+Besides the employees and attendance collections, every attendance write keeps
+the rollups (app/rollups.py) and bitmaps (app/bitmaps.py) in step, and removing
+an employee's attendance is handed to the background job queue (app/jobs.py).
+"""
+from datetime import date
+import asyncio
+import re
+import time
+from app import bitmaps, rollups
+from app.database import COUNTER_COLLECTION, get_collections, get_database
+from app.dates import DAY_EXPRESSION, date_equals, date_range, to_stored
+from app.repository import DUPLICATE_MESSAGES, EMPLOYEE_FIELDS, PROFILE_FIELDS, RECORD_FIELDS, DuplicateEmployeeError, Repository
+
+# How long a process trusts its last check for string dates; once none remain that is final
+STRING_DATES_CHECK_SECONDS = 60
+
+# Attendance records written between two looks at the rebuild pause flag
+MARK_BATCH_SIZE = 1000
+
+def duplicate_employee_message(details: dict | None, message: str) -> str:
+    """Map a duplicate key error from the employees collection back to a readable message"""
+    key_pattern = (details or {}).get("keyPattern") or {}
+    for field in key_pattern:
+        if field in DUPLICATE_MESSAGES:
+            return DUPLICATE_MESSAGES[field]
+    # Older servers only report the index name, e.g. "email_lower_1"
+    for field, detail in DUPLICATE_MESSAGES.items():
+        if f"index: {field}_" in message:
+            return detail
+    return "Employee already exists"
+
+def build_employee_summary_pipeline(today: str, recent_since: date, department: str | None = None,
+                                     skip: int = 0, limit: int | None = None) -> list:
+    """Build the aggregation that summarises every employee's attendance in one round trip"""
+    match = {"employee_id": {"$nin": [None, ""]}}
+    if department:
+        match["department"] = department
+
+    pipeline = [
+        {"$match": match},
+        # Count the matching employees alongside each document, so the page streams
+        # through a normal cursor instead of a single size-capped $facet document
+        {"$setWindowFields": {"output": {"total_matching": {"$count": {}}}}},
+        {"$sort": {"full_name": 1, "employee_id": 1}},
+        {"$skip": skip}
+    ]
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+
+    return pipeline + [
+        # All-time totals from the employee's rollup document, one _id lookup
+        {"$set": {"rollup_id": {"$concat": ["employee:", {"$toString": "$employee_id"}]}}},
+        {"$lookup": {
+            "from": rollups.ROLLUP_COLLECTION,
+            "localField": "rollup_id",
+            "foreignField": "_id",
+            "as": "totals"
+        }},
+        # Last 5 records from the past week, served by the (employee_id, date) index
+        {"$lookup": {
+            "from": "attendance",
+            "localField": "employee_id",
+            "foreignField": "employee_id",
+            "pipeline": [
+                {"$match": date_range(recent_since)},
+                {"$sort": {"date": -1}},
+                {"$limit": 5},
+                {"$project": {"_id": 0, "employee_id": 1, "date": DAY_EXPRESSION, "status": 1}}
+            ],
+            "as": "recent_attendance"
+        }},
+        {"$set": {
+            "totals": {"$ifNull": [{"$arrayElemAt": ["$totals", 0]}, {}]},
+            # Dates are never in the future, so today's record is the newest one if it exists
+            "latest": {"$arrayElemAt": ["$recent_attendance", 0]}
+        }},
+        {"$set": {
+            "present_count": {"$ifNull": ["$totals.present", 0]},
+            "absent_count": {"$ifNull": ["$totals.absent", 0]}
+        }},
+        {"$set": {"total_records": {"$add": ["$present_count", "$absent_count"]}}},
+        {"$project": {
+            "_id": 0,
+            "total_matching": 1,
+            "employee_id": {"$toString": "$employee_id"},
+            "full_name": {"$toString": {"$ifNull": ["$full_name", "Unknown"]}},
+            "email": {"$toString": {"$ifNull": ["$email", ""]}},
+            "phone": {"$toString": {"$ifNull": ["$phone", ""]}},
+            "department": {"$toString": {"$ifNull": ["$department", "Unknown"]}},
+            "total_records": 1,
+            "present_count": 1,
+            "absent_count": 1,
+            "attendance_rate": {"$cond": [
+                {"$gt": ["$total_records", 0]},
+                {"$round": [{"$multiply": [{"$divide": ["$present_count", "$total_records"]}, 100]}, 2]},
+                0.0
+            ]},
+            "today_status": {"$cond": [
+                {"$eq": ["$latest.date", today]}, "$latest.status", "Not Marked"
+            ]},
+            "recent_attendance": 1
+        }}
+    ]
+
+async def first_result(collection, pipeline: list) -> dict:
+    """Run an aggregation that yields a single document, such as a $facet"""
+    cursor = await collection.aggregate(pipeline)
+    results = await cursor.to_list(1)
+    return results[0] if results else {}
+
+class MongoRepository(Repository):
+    name = "mongo"
+
+    def __init__(self):
+        # Prefixes whose counter this process has already checked against existing IDs
+        self._seeded_prefixes = set()
+        # Whether records still hold a string date, and when that was checked
+        self._string_dates = True
+        self._string_dates_checked_at = None
+
+    # Employees
+
+    async def add_employee(self, document: dict):
+        from pymongo.errors import DuplicateKeyError
+        employee_collection, _ = get_collections()
+        # Unique indexes on employee_id, email_lower and phone reject duplicates,
+        # so the insert is the only round trip
+        try:
+            await employee_collection.insert_one(document)
+        except DuplicateKeyError as e:
+            raise DuplicateEmployeeError(duplicate_employee_message(e.details, str(e)))
+
+    async def add_employees(self, documents: list) -> list:
+        from pymongo.errors import BulkWriteError
+        employee_collection, _ = get_collections()
+        errors = [None] * len(documents)
+        # The unique indexes reject duplicates, against existing employees and within the batch
+        try:
+            await employee_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == 11000:
+                    errors[error["index"]] = duplicate_employee_message(error, error.get("errmsg", ""))
+                else:
+                    errors[error["index"]] = error.get("errmsg", "Insert failed")
+        return errors
+
+    async def remove_employee(self, employee_id: str) -> dict | None:
+        # Its attendance is taken out of the rollups next
+        await rollups.check_writes_allowed()
+        employee_collection, _ = get_collections()
+        return await employee_collection.find_one_and_delete(
+            {"employee_id": employee_id}, projection={"_id": 0, "department": 1}
+        )
+
+    async def employee_profiles(self, employee_ids: list) -> dict:
+        employee_collection, _ = get_collections()
+        return {
+            profile["employee_id"]: profile
+            async for profile in employee_collection.find({"employee_id": {"$in": employee_ids}}, PROFILE_FIELDS)
+        }
+
+    def list_employees(self, after: str | None = None, limit: int | None = None):
+        employee_collection, _ = get_collections()
+        query = {}
+        if after:
+            query["employee_id"] = {"$gt": after}
+        cursor = employee_collection.find(query, EMPLOYEE_FIELDS)
+        if after is not None or limit:
+            # Keyset pagination walks the unique employee_id index
+            cursor = cursor.sort("employee_id", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def highest_existing_suffix(self, prefix: str) -> int:
+        """Largest numeric suffix already used with this prefix, e.g. by IDs generated before counters existed"""
+        employee_collection, _ = get_collections()
+        highest = 0
+        # Anchored prefix regex, served by the employee_id index
+        async for doc in employee_collection.find(
+            {"employee_id": {"$regex": f"^{re.escape(prefix)}[0-9]+$"}}, {"_id": 0, "employee_id": 1}
+        ):
+            highest = max(highest, int(doc["employee_id"][len(prefix):]))
+        return highest
+
+    async def allocate_employee_ids(self, prefix: str, count: int) -> list:
+        """Reserve the IDs with one atomic counter increment"""
+        from pymongo import ReturnDocument
+
+        counters = get_database()[COUNTER_COLLECTION]
+        key = f"employee_id:{prefix}"
+
+        if prefix not in self._seeded_prefixes:
+            # First use of this prefix by this process: make sure a new counter starts above
+            # the IDs that already exist. $max keeps concurrent seeders from moving it backwards.
+            if await counters.find_one({"_id": key}) is None:
+                await counters.update_one(
+                    {"_id": key}, {"$max": {"seq": await self.highest_existing_suffix(prefix)}}, upsert=True
+                )
+            self._seeded_prefixes.add(prefix)
+
+        employee_collection, _ = get_collections()
+        while True:
+            counter = await counters.find_one_and_update(
+                {"_id": key},
+                {"$inc": {"seq": count}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            last = counter["seq"]
+            employee_ids = [f"{prefix}{n:04d}" for n in range(last - count + 1, last + 1)]
+            # An employee created with a hand-entered ID may be ahead of the counter,
+            # move the counter past it and allocate again
+            if not await employee_collection.count_documents({"employee_id": {"$in": employee_ids}}, limit=1):
+                return employee_ids
+            await counters.update_one({"_id": key}, {"$max": {"seq": await self.highest_existing_suffix(prefix)}})
+
+    async def employee_counts(self) -> dict:
+        employee_collection, _ = get_collections()
+        # Employee total and department wise employee count
+        facets = await first_result(employee_collection, [
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "departments": [
+                    {"$group": {"_id": "$department", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}}
+                ]
+            }}
+        ])
+        return {
+            "total": facets["total"][0]["count"] if facets.get("total") else 0,
+            "departments": [
+                {"department": item["_id"], "count": item["count"]} for item in facets.get("departments", [])
+            ]
+        }
+
+    # Attendance
+
+    async def string_dates_remain(self) -> bool:
+        """Check whether records written before migrate-attendance-dates still hold a string date"""
+        if not self._string_dates:
+            # New records are always stored with a native date
+            return False
+        if self._string_dates_checked_at is None or time.monotonic() - self._string_dates_checked_at >= STRING_DATES_CHECK_SECONDS:
+            _, attendance_collection = get_collections()
+            # Strings sort before dates, so this reads the start of the date index
+            self._string_dates = await attendance_collection.find_one({"date": {"$type": "string"}}, {"_id": 1}) is not None
+            self._string_dates_checked_at = time.monotonic()
+        return self._string_dates
+
+    async def dates_migrated(self) -> bool:
+        return not await self.string_dates_remain()
+
+    async def marked_with_string_dates(self, records: list) -> set:
+        """(employee_id, YYYY-MM-DD) of the records already stored with a string date"""
+        if not await self.string_dates_remain():
+            return set()
+        _, attendance_collection = get_collections()
+        query = {
+            "date": {"$in": sorted({record["date"].isoformat() for record in records})},
+            "employee_id": {"$in": list({record["employee_id"] for record in records})}
+        }
+        return {
+            (document["employee_id"], document["date"])
+            async for document in attendance_collection.find(query, {"_id": 0, "employee_id": 1, "date": 1})
+        }
+
+    async def mark_attendance(self, records: list, departments: dict) -> list:
+        await rollups.check_writes_allowed()
+        errors = []
+        for start in range(0, len(records), MARK_BATCH_SIZE):
+            # A rebuild started meanwhile waits for the current batch only, the rest is refused
+            if start and await rollups.writes_paused():
+                errors += [rollups.PAUSED_MESSAGE] * (len(records) - start)
+                break
+            errors += await self._mark_batch(records[start:start + MARK_BATCH_SIZE], departments)
+        return errors
+
+    async def _mark_batch(self, records: list, departments: dict) -> list:
+        from pymongo.errors import BulkWriteError
+        _, attendance_collection = get_collections()
+
+        # The unique index rejects a day marked again in the same form. One still held as a
+        # string by an unfinished migration is only caught by looking it up.
+        marked = await self.marked_with_string_dates(records)
+        errors = [
+            "duplicate" if (record["employee_id"], record["date"].isoformat()) in marked else None
+            for record in records
+        ]
+        positions = [i for i, error in enumerate(errors) if error is None]
+        documents = [
+            {"employee_id": records[i]["employee_id"], "date": to_stored(records[i]["date"]), "status": records[i]["status"]}
+            for i in positions
+        ]
+        # Unordered insert keeps going past duplicates, the (employee_id, date) unique
+        # index rejects records that were already marked
+        try:
+            if documents:
+                await attendance_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[positions[error["index"]]] = (
+                    "duplicate" if error.get("code") == 11000 else error.get("errmsg", "Insert failed")
+                )
+
+        deltas = {}
+        changes = {}
+        for record, error in zip(records, errors):
+            if error is None:
+                counted = (record["employee_id"], departments.get(record["employee_id"]),
+                           record["date"].isoformat(), record["status"])
+                rollups.add_delta(deltas, *counted, 1)
+                bitmaps.add_change(changes, *counted)
+        await asyncio.gather(rollups.apply_deltas(deltas), bitmaps.apply_changes(changes))
+        return errors
+
+    async def update_attendance(self, employee_id: str, day: date, status: str, department: str) -> str | None:
+        from pymongo import ReturnDocument
+        await rollups.check_writes_allowed()
+        _, attendance_collection = get_collections()
+        # Keep the previous status to adjust the rollups
+        previous = await attendance_collection.find_one_and_update(
+            {"employee_id": employee_id, **date_equals(day)},
+            {"$set": {"status": status}},
+            projection={"_id": 0, "status": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            return None
+        changed = (employee_id, department, day.isoformat(), previous.get("status"), status)
+        await asyncio.gather(rollups.record_status_change(*changed), bitmaps.record_status_change(*changed))
+        return previous.get("status")
+
+    def attendance_range(self, start: date, end: date, status: str | None = None,
+                         after: tuple | None = None, limit: int | None = None):
+        _, attendance_collection = get_collections()
+        conditions = [date_range(start, end)]
+        if after:
+            after_day, after_employee = after
+            conditions.append({"$or": [
+                date_range(after=after_day),
+                {**date_equals(after_day), "employee_id": {"$gt": after_employee}}
+            ]})
+        query = {"$and": conditions} if len(conditions) > 1 else conditions[0]
+        if status:
+            query["status"] = status
+
+        cursor = attendance_collection.find(query, RECORD_FIELDS).sort([("date", 1), ("employee_id", 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    def _employee_query(self, employee_id: str, day: date | None, start: date | None, end: date | None) -> dict:
+        query = {"employee_id": employee_id}
+        if day:
+            query.update(date_equals(day))
+        else:
+            query.update(date_range(start, end))
+        return query
+
+    def employee_attendance(self, employee_id: str, day: date | None = None, start: date | None = None,
+                            end: date | None = None, after: date | None = None, limit: int | None = None):
+        _, attendance_collection = get_collections()
+        query = self._employee_query(employee_id, day, start, end)
+        if after and not day:
+            query.update(date_range(start, end, after))
+
+        cursor = attendance_collection.find(query, RECORD_FIELDS)
+        if after or limit or start or end:
+            # Keyset pagination walks the (employee_id, date) index
+            cursor = cursor.sort("date", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def count_present(self, employee_id: str, day: date | None = None,
+                            start: date | None = None, end: date | None = None) -> int:
+        _, attendance_collection = get_collections()
+        return await attendance_collection.count_documents(
+            {**self._employee_query(employee_id, day, start, end), "status": "Present"}
+        )
+
+    def export_attendance(self, start: date | None = None, end: date | None = None,
+                          employee_id: str | None = None):
+        _, attendance_collection = get_collections()
+        query = date_range(start, end)
+        if employee_id:
+            query["employee_id"] = employee_id
+            sort = [("date", 1)]
+        else:
+            sort = [("date", 1), ("employee_id", 1)]
+        return attendance_collection.find(query, RECORD_FIELDS).sort(sort)
+
+    async def remove_employee_attendance(self, employee_id: str, department: str | None) -> str | None:
+        from app import jobs
+        # Their attendance can run to thousands of records, removed by a background job
+        return await jobs.enqueue("delete_employee_attendance", {"employee_id": employee_id, "department": department})
+
+    # Dashboard and reports
+
+    async def attendance_totals(self, day: str) -> dict:
+        # Counters come from the rollups, constant work however long the history
+        counters = await rollups.get_rollup_collection().find({"_id": {"$in": ["total", f"day:{day}"]}}).to_list()
+        counters = {doc["_id"]: doc for doc in counters}
+        return {
+            scope: {"present": counters.get(rollup_id, {}).get("present", 0),
+                    "absent": counters.get(rollup_id, {}).get("absent", 0)}
+            for scope, rollup_id in (("total", "total"), ("day", f"day:{day}"))
+        }
+
+    async def recent_attendance(self, since: date, limit: int) -> list:
+        _, attendance_collection = get_collections()
+        # Latest records, read newest first from the date index
+        return await attendance_collection.find(date_range(since), RECORD_FIELDS).sort("date", -1).limit(limit).to_list()
+
+    async def employee_summaries(self, today: str, recent_since: date, department: str | None = None,
+                                 skip: int = 0, limit: int | None = None) -> tuple:
+        employee_collection, _ = get_collections()
+        pipeline = build_employee_summary_pipeline(today, recent_since, department, skip, limit)
+        summaries = await (await employee_collection.aggregate(pipeline)).to_list()
+
+        if summaries:
+            total = summaries[0]["total_matching"]
+        elif skip > 0:
+            # Paged past the end, the window count never ran
+            total = await employee_collection.count_documents(pipeline[0]["$match"])
+        else:
+            total = 0
+        for summary in summaries:
+            summary.pop("total_matching", None)
+        return total, summaries
+
+    async def month_bitmaps(self, month: str, department: str | None = None) -> list | None:
+        if not bitmaps.BITMAPS_ENABLED:
+            return None
+        query = bitmaps.month_range(month)
+        if department:
+            query["department"] = department
+        return await bitmaps.get_bitmap_collection().find(
+            query, {"_id": 0, "employee_id": 1, "department": 1, "present": 1, "absent": 1}
+        ).sort("_id", 1).to_list()
@@ -0,0 +1,188 @@
+"""
+Storage for employees and attendance.
+
+Routes go through a Repository instead of talking to MongoDB. Two backends
+implement it:
+
+- MongoRepository (app/mongo_repository.py), used whenever MONGODB_URL is set.
+  It keeps the rollups and bitmaps in step with every write, and its calls go
+  through the circuit breaker in app/breaker.py.
+- MemoryRepository (app/memory_repository.py), an indexed in-process store used
+  when no database is configured. It starts with demo data unless DEMO_DATA=false.
+
+Set STORAGE_BACKEND=memory to use the in-memory store even with a database
+configured, e.g. for tests and benchmarks.
+
+Attendance days are passed in as `datetime.date`. Records come back with the stored
+date, so callers run them through dates.output_record. Methods documented as
+returning a cursor return an object with PyMongo's async cursor interface:
+`async for`, `to_list()`, `batch_size()` and `close()`.
+"""
+from abc import ABC, abstractmethod
+from datetime import date
+import os
+from app import database
+from app.breaker import GuardedRepository, mongo_breaker, unavailable
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "").lower()
+
+# Seed the in-memory store with sample employees and attendance
+DEMO_DATA = os.getenv("DEMO_DATA", "true").lower() == "true"
+
+# Stored employee fields returned to clients, internal lookup keys are left out
+EMPLOYEE_FIELDS = {"_id": 0, "email_lower": 0}
+
+# Basic profile fields needed by routes that only check who an employee is
+PROFILE_FIELDS = {"_id": 0, "employee_id": 1, "full_name": 1, "department": 1}
+
+# Every returned attendance field, covered by the attendance indexes in MongoDB
+RECORD_FIELDS = {"_id": 0, "employee_id": 1, "date": 1, "status": 1}
+
+# Messages for the unique key a new employee collides with
+DUPLICATE_MESSAGES = {
+    "employee_id": "Employee ID already exists",
+    "email_lower": "Email already exists",
+    "email": "Email already exists",
+    "phone": "Phone number already exists"
+}
+
+class DuplicateEmployeeError(Exception):
+    """An employee with the same ID, email or phone already exists"""
+
+class Repository(ABC):
+    """Operations the routes need on employees and attendance, every one required of a backend"""
+
+    name = None
+
+    # Employees
+
+    @abstractmethod
+    async def add_employee(self, document: dict):
+        """Store a new employee, raising DuplicateEmployeeError with a readable message"""
+
+    @abstractmethod
+    async def add_employees(self, documents: list) -> list:
+        """Store many employees, returning None or an error message for each document"""
+
+    @abstractmethod
+    async def remove_employee(self, employee_id: str) -> dict | None:
+        """Delete an employee, returning the removed document or None if there was none"""
+
+    @abstractmethod
+    async def employee_profiles(self, employee_ids: list) -> dict:
+        """Map each existing employee ID to its PROFILE_FIELDS"""
+
+    @abstractmethod
+    def list_employees(self, after: str | None = None, limit: int | None = None):
+        """Cursor over employees with EMPLOYEE_FIELDS, in employee ID order when paging.
+
+        Pass `after=""` for every employee in ID order.
+        """
+
+    @abstractmethod
+    async def allocate_employee_ids(self, prefix: str, count: int) -> list:
+        """Reserve `count` new consecutive IDs starting with `prefix`"""
+
+    @abstractmethod
+    async def employee_counts(self) -> dict:
+        """{"total": n, "departments": [{"department", "count"}]}, largest department first"""
+
+    # Attendance
+
+    @abstractmethod
+    async def mark_attendance(self, records: list, departments: dict) -> list:
+        """Store new {employee_id, date, status} records for employees in `departments`.
+
+        Returns None for each stored record, "duplicate" when the employee already has
+        one for that day, or an error message.
+        """
+
+    @abstractmethod
+    async def update_attendance(self, employee_id: str, day: date, status: str, department: str) -> str | None:
+        """Change a record's status, returning the previous status or None if there is no record"""
+
+    @abstractmethod
+    async def dates_migrated(self) -> bool:
+        """Check whether every stored attendance date has the native form, which paging in date order needs"""
+
+    @abstractmethod
+    def attendance_range(self, start: date, end: date, status: str | None = None,
+                         after: tuple | None = None, limit: int | None = None):
+        """Cursor over every employee's records from `start` to `end`, ordered by date then employee.
+
+        `after` is a (day, employee_id) keyset position.
+        """
+
+    @abstractmethod
+    def employee_attendance(self, employee_id: str, day: date | None = None, start: date | None = None,
+                            end: date | None = None, after: date | None = None, limit: int | None = None):
+        """Cursor over one employee's records on `day` or in a range, in date order when paging"""
+
+    @abstractmethod
+    async def count_present(self, employee_id: str, day: date | None = None,
+                            start: date | None = None, end: date | None = None) -> int:
+        """Number of Present records of one employee on `day` or in a range"""
+
+    @abstractmethod
+    def export_attendance(self, start: date | None = None, end: date | None = None,
+                          employee_id: str | None = None):
+        """Cursor over records in date order, then employee order"""
+
+    @abstractmethod
+    async def remove_employee_attendance(self, employee_id: str, department: str | None) -> str | None:
+        """Delete a removed employee's attendance, returning a job ID when it happens in the background"""
+
+    # Dashboard and reports
+
+    @abstractmethod
+    async def attendance_totals(self, day: str) -> dict:
+        """{"total": {"present", "absent"}, "day": {"present", "absent"}} for all time and for `day`"""
+
+    @abstractmethod
+    async def recent_attendance(self, since: date, limit: int) -> list:
+        """Newest records dated `since` or later"""
+
+    @abstractmethod
+    async def employee_summaries(self, today: str, recent_since: date, department: str | None = None,
+                                 skip: int = 0, limit: int | None = None) -> tuple:
+        """(matching employees, page of per-employee attendance summaries) ordered by name"""
+
+    @abstractmethod
+    async def month_bitmaps(self, month: str, department: str | None = None) -> list | None:
+        """Per-employee day bitmaps of one month in employee order, None when not maintained"""
+
+_repository = None
+
+def get_repository() -> Repository:
+    """Return the configured repository, created on first use"""
+    global _repository
+    if _repository is None:
+        backend = STORAGE_BACKEND or ("mongo" if database.is_configured() else "memory")
+        if backend == "memory":
+            from app.memory_repository import MemoryRepository, seed_demo_data
+            _repository = MemoryRepository()
+            if DEMO_DATA:
+                seed_demo_data(_repository)
+        else:
+            from app.mongo_repository import MongoRepository
+            _repository = GuardedRepository(MongoRepository(), mongo_breaker)
+    if _repository.name == "mongo":
+        # Fail fast while MongoDB is known to be unreachable, see app/breaker.py
+        if not mongo_breaker.allow():
+            raise unavailable()
+        if database.get_database() is None:
+            if database.is_configured():
+                mongo_breaker.record_failure(database.connection_error)
+            raise unavailable()
+    return _repository
+
+def set_repository(repository: Repository | None):
+    """Use `repository` from now on, or pick one from the environment again with None"""
+    global _repository
+    _repository = repository
+
+def uses_mongo() -> bool:
+    """Check whether writes go to MongoDB, where rollups, bitmaps and jobs live"""
+    if _repository is not None:
+        return _repository.name == "mongo"
+    return (STORAGE_BACKEND or ("mongo" if database.is_configured() else "memory")) == "mongo"
@@ -0,0 +1,291 @@
+"""
+Attendance rollups: Present/Absent counters kept up to date on every attendance write,
+so dashboards read a handful of small documents instead of rescanning attendance.
+
+All counters live in one collection, keyed by a readable string _id:
+
+    total                                  all attendance
+    day:<date>                             one day, all employees
+    employee:<employee_id>                 one employee, all time
+    employee_month:<employee_id>:<YYYY-MM> one employee, one month
+    department_day:<department>:<date>     one department, one day
+
+Each document holds `present` and `absent` counts plus the fields named in its key.
+Rebuild or check them against the raw records with `python -m app.manage rebuild-rollups`
+and `python -m app.manage verify-rollups`.
+
+A rebuild replaces the whole collection, so a counter change written meanwhile would
+be lost. Attendance writes are therefore refused with 503 in every server process
+while a rebuild (of the rollups or the bitmaps) runs, see writes_paused_for_rebuild.
+Large writes look at the flag again before every batch of records, so one already
+under way when a rebuild starts stops at the end of its current batch.
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import time
+import uuid
+from fastapi import HTTPException
+from app import events
+from app.database import COUNTER_COLLECTION, get_database
+from app.dates import DAY_EXPRESSION
+
+ROLLUP_COLLECTION = "attendance_rollups"
+
+STATUS_FIELDS = {"Present": "present", "Absent": "absent"}
+
+# Counters document flagging a rebuild in progress, held by `holders` rebuilds until `until`
+PAUSE_ID = "attendance_writes_paused"
+
+# A rebuild renews the flag while it runs, one that died stops blocking writes after this
+PAUSE_LEASE_SECONDS = 60
+
+# How long a process trusts its last look at the flag
+PAUSE_CHECK_SECONDS = 2
+
+PAUSED_MESSAGE = "Attendance totals are being rebuilt, please retry shortly."
+
+# Epoch seconds until which writes are paused as last read, and when that was
+_paused_until = None
+_pause_checked_at = None
+
+def get_rollup_collection():
+    """Return the rollup collection, or None without a database"""
+    db = get_database()
+    return db[ROLLUP_COLLECTION] if db is not None else None
+
+async def writes_paused() -> bool:
+    """Check whether a rebuild is running in any process, re-reading the flag every PAUSE_CHECK_SECONDS"""
+    global _paused_until, _pause_checked_at
+    if _pause_checked_at is None or time.monotonic() - _pause_checked_at >= PAUSE_CHECK_SECONDS:
+        flag = await get_database()[COUNTER_COLLECTION].find_one({"_id": PAUSE_ID})
+        _paused_until = flag["until"] if flag and flag.get("holders", 0) > 0 else None
+        _pause_checked_at = time.monotonic()
+    return _paused_until is not None and _paused_until > time.time()
+
+async def check_writes_allowed():
+    """Refuse an attendance write with 503 while a rebuild is running"""
+    if await writes_paused():
+        raise HTTPException(
+            status_code=503,
+            detail=PAUSED_MESSAGE,
+            headers={"Retry-After": str(PAUSE_CHECK_SECONDS * 5)}
+        )
+
+@asynccontextmanager
+async def writes_paused_for_rebuild():
+    """Pause attendance writes in every server process while the block runs"""
+    global _pause_checked_at
+    counters = get_database()[COUNTER_COLLECTION]
+
+    async def renew():
+        while True:
+            await asyncio.sleep(PAUSE_LEASE_SECONDS / 3)
+            await counters.update_one({"_id": PAUSE_ID}, {"$max": {"until": time.time() + PAUSE_LEASE_SECONDS}})
+
+    await counters.update_one(
+        {"_id": PAUSE_ID},
+        {"$inc": {"holders": 1}, "$max": {"until": time.time() + PAUSE_LEASE_SECONDS}},
+        upsert=True
+    )
+    _pause_checked_at = None
+    renewer = asyncio.create_task(renew())
+    try:
+        # Every process sees the flag within PAUSE_CHECK_SECONDS, and writes that
+        # passed their check before it was set finish their current batch (at most
+        # MARK_BATCH_SIZE records, see MongoRepository.mark_attendance) in the meantime
+        await asyncio.sleep(PAUSE_CHECK_SECONDS + 1)
+        yield
+    finally:
+        renewer.cancel()
+        await counters.update_one({"_id": PAUSE_ID}, {"$inc": {"holders": -1}})
+        _pause_checked_at = None
+
+def rollup_keys(employee_id: str, department: str, date: str) -> list:
+    """Return (_id, identifying fields) of every rollup a single attendance record counts towards"""
+    month = date[:7]
+    return [
+        ("total", {"scope": "total"}),
+        (f"day:{date}", {"scope": "day", "date": date}),
+        (f"employee:{employee_id}", {"scope": "employee", "employee_id": employee_id}),
+        (f"employee_month:{employee_id}:{month}",
+         {"scope": "employee_month", "employee_id": employee_id, "month": month}),
+        (f"department_day:{department}:{date}",
+         {"scope": "department_day", "department": department, "date": date}),
+    ]
+
+def add_delta(deltas: dict, employee_id: str, department: str, date: str, status: str, amount: int):
+    """Accumulate a counter change into `deltas` so several records can be written together"""
+    field = STATUS_FIELDS[status]
+    for rollup_id, fields in rollup_keys(employee_id, department or "Unknown", date):
+        entry = deltas.setdefault(rollup_id, {"fields": fields, "inc": {}})
+        entry["inc"][field] = entry["inc"].get(field, 0) + amount
+
+async def apply_deltas(deltas: dict):
+    """Write accumulated counter changes in one bulk round trip.
+
+    Rollups are derived data: a failure here is logged rather than failing the
+    request that already stored the raw record, and verify-rollups will report it.
+    """
+    rollup_collection = get_rollup_collection()
+    if rollup_collection is None or not deltas:
+        return
+
+    from pymongo import UpdateOne
+    operations = [
+        UpdateOne({"_id": rollup_id}, {"$inc": entry["inc"], "$setOnInsert": entry["fields"]}, upsert=True)
+        for rollup_id, entry in deltas.items()
+        if any(entry["inc"].values())
+    ]
+    if not operations:
+        return
+    async with events.change():
+        try:
+            await rollup_collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"✗ Failed to update attendance rollups: {e}")
+            return
+        # The same counter changes are what live dashboards need
+        events.attendance_changed(deltas)
+
+async def record_attendance(employee_id: str, department: str, date: str, status: str):
+    """Count a newly marked attendance record"""
+    deltas = {}
+    add_delta(deltas, employee_id, department, date, status, 1)
+    await apply_deltas(deltas)
+
+async def record_status_change(employee_id: str, department: str, date: str, old_status: str, new_status: str):
+    """Move one record's count from its old status to the new one"""
+    if old_status == new_status:
+        return
+    deltas = {}
+    if old_status in STATUS_FIELDS:
+        add_delta(deltas, employee_id, department, date, old_status, -1)
+    add_delta(deltas, employee_id, department, date, new_status, 1)
+    await apply_deltas(deltas)
+
+def _counters() -> dict:
+    return {
+        "present": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+        "absent": {"$sum": {"$cond": [{"$eq": ["$status", "Absent"]}, 1, 0]}}
+    }
+
+def scope_pipelines() -> list:
+    """Aggregations over raw attendance that produce every rollup document"""
+    # Rollup keys use YYYY-MM-DD whichever form the record's date is stored in
+    day = {"$set": {"day": DAY_EXPRESSION}}
+    return [
+        [
+            {"$group": {"_id": "total", **_counters()}},
+            {"$set": {"scope": "total"}}
+        ],
+        [
+            day,
+            {"$group": {"_id": "$day", **_counters()}},
+            {"$project": {
+                "_id": {"$concat": ["day:", "$_id"]},
+                "scope": {"$literal": "day"},
+                "date": "$_id",
+                "present": 1,
+                "absent": 1
+            }}
+        ],
+        [
+            {"$group": {"_id": "$employee_id", **_counters()}},
+            {"$project": {
+                "_id": {"$concat": ["employee:", "$_id"]},
+                "scope": {"$literal": "employee"},
+                "employee_id": "$_id",
+                "present": 1,
+                "absent": 1
+            }}
+        ],
+        [
+            day,
+            {"$group": {
+                "_id": {"employee_id": "$employee_id", "month": {"$substrBytes": ["$day", 0, 7]}},
+                **_counters()
+            }},
+            {"$project": {
+                "_id": {"$concat": ["employee_month:", "$_id.employee_id", ":", "$_id.month"]},
+                "scope": {"$literal": "employee_month"},
+                "employee_id": "$_id.employee_id",
+                "month": "$_id.month",
+                "present": 1,
+                "absent": 1
+            }}
+        ],
+        [
+            day,
+            {"$lookup": {
+                "from": "employees",
+                "localField": "employee_id",
+                "foreignField": "employee_id",
+                "as": "employee"
+            }},
+            {"$set": {"department": {"$ifNull": [{"$arrayElemAt": ["$employee.department", 0]}, "Unknown"]}}},
+            {"$group": {"_id": {"department": "$department", "date": "$day"}, **_counters()}},
+            {"$project": {
+                "_id": {"$concat": ["department_day:", "$_id.department", ":", "$_id.date"]},
+                "scope": {"$literal": "department_day"},
+                "department": "$_id.department",
+                "date": "$_id.date",
+                "present": 1,
+                "absent": 1
+            }}
+        ],
+    ]
+
+def staging_name(collection: str) -> str:
+    """Name of a new collection a rebuild of `collection` is written to before it is swapped in"""
+    return f"{collection}_rebuild_{uuid.uuid4().hex[:12]}"
+
+async def rebuild_rollups() -> int:
+    """Recompute every rollup from raw attendance and swap them in, returning the document count"""
+    db = get_database()
+    # A staging collection of its own, so rebuilds running at the same time cannot mix
+    staging = db[staging_name(ROLLUP_COLLECTION)]
+
+    async with writes_paused_for_rebuild():
+        try:
+            for pipeline in scope_pipelines():
+                merge = {"$merge": {"into": staging.name, "whenMatched": "replace", "whenNotMatched": "insert"}}
+                cursor = await db["attendance"].aggregate(pipeline + [merge])
+                await cursor.to_list()
+
+            count = await staging.count_documents({})
+            if count:
+                await staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+            else:
+                await db[ROLLUP_COLLECTION].delete_many({})
+        finally:
+            # Only still there when the rebuild failed
+            await staging.drop()
+    return count
+
+async def verify_rollups() -> list:
+    """Compare stored rollups with freshly computed ones, returning every mismatch"""
+    db = get_database()
+    expected = {}
+    for pipeline in scope_pipelines():
+        async for document in await db["attendance"].aggregate(pipeline):
+            expected[document["_id"]] = (document["present"], document["absent"])
+
+    actual = {}
+    async for document in db[ROLLUP_COLLECTION].find({}, {"present": 1, "absent": 1}):
+        actual[document["_id"]] = (document.get("present", 0), document.get("absent", 0))
+
+    mismatches = []
+    for rollup_id in expected.keys() | actual.keys():
+        # A counter decremented back to zero is equivalent to one that never existed
+        want = expected.get(rollup_id, (0, 0))
+        have = actual.get(rollup_id, (0, 0))
+        if want != have:
+            mismatches.append({"_id": rollup_id, "expected": want, "actual": have})
+    return mismatches
+
+async def rollups_missing() -> bool:
+    """Check whether this database has attendance but no rollups yet, as on first start"""
+    db = get_database()
+    if db is None or await db[ROLLUP_COLLECTION].find_one({"_id": "total"}):
+        return False
+    return await db["attendance"].find_one({}, {"_id": 1}) is not None
@@ -1,41 +1,154 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.database import attendance_collection, employee_collection, db
-from app.schemas import AttendanceCreate, AttendanceUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from app.repository import get_repository
+from app.schemas import AttendanceCreate, AttendanceUpdate, AttendanceBulkCreate
+from app.cache import invalidate_dashboard_cache
+from app.directory import find_employee, find_employee_profiles
+from app import versions
+from app.versions import versioned
+from app.streaming import wants_ndjson, ndjson_response
+from app.dates import output_record
+from app.transfer import ImportReport, upload_format, read_records, read_batches, validate_batch, export_response
+from pydantic import TypeAdapter
 from datetime import date as date_class
+import time
 
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
 
+# Built once, validating a whole import batch per call
+ATTENDANCE_BATCH = TypeAdapter(list[AttendanceCreate])
+
+async def check_date_paging(repository):
+    """Refuse a paged read in date order while string dates remain, MongoDB sorts every string before every date"""
+    if not await repository.dates_migrated():
+        raise HTTPException(
+            status_code=503,
+            detail="Paging attendance by date is unavailable until every record's date is migrated "
+                   "(python -m app.manage migrate-attendance-dates)"
+        )
+
 @router.post("/")
-def mark_attendance(attendance: AttendanceCreate):
-    if attendance_collection is None or employee_collection is None:
-        raise HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
-    
-    if not employee_collection.find_one({"employee_id": attendance.employee_id}):
+async def mark_attendance(attendance: AttendanceCreate):
+    repository = get_repository()
+
+    employee = await find_employee(attendance.employee_id)
+    if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
     if attendance.status not in ["Present", "Absent"]:
         raise HTTPException(status_code=400, detail="Invalid attendance status")
 
-    # Check if attendance already exists for this employee and date
-    existing = attendance_collection.find_one({
-        "employee_id": attendance.employee_id,
-        "date": str(attendance.date)
-    })
-    
-    if existing:
+    [error] = await repository.mark_attendance(
+        [attendance.model_dump()], {attendance.employee_id: employee.get("department")}
+    )
+    if error == "duplicate":
         raise HTTPException(status_code=409, detail="Attendance already marked for this date. Use update endpoint to modify.")
+    if error:
+        raise HTTPException(status_code=500, detail=error)
 
-    attendance_dict = attendance.dict()
-    attendance_dict["date"] = str(attendance.date)
-    attendance_collection.insert_one(attendance_dict)
+    invalidate_dashboard_cache()
+    await versions.bump("attendance")
     return {"message": "Attendance marked successfully"}
 
+@router.post("/bulk")
+async def mark_attendance_bulk(payload: AttendanceBulkCreate):
+    """Mark attendance for many employees at once, reporting the outcome of every record"""
+    repository = get_repository()
+
+    started = time.perf_counter()
+    records = payload.records
+
+    # At most one query to check every referenced employee
+    employees = await find_employee_profiles(list({record.employee_id for record in records}))
+
+    results = [
+        {"index": i, "employee_id": record.employee_id, "date": str(record.date), "result": "created"}
+        for i, record in enumerate(records)
+    ]
+    new_records = []
+    positions = []
+    for i, record in enumerate(records):
+        if record.employee_id not in employees:
+            results[i]["result"] = "employee_not_found"
+            continue
+        new_records.append(record.model_dump())
+        positions.append(i)
+
+    if new_records:
+        departments = {employee_id: profile.get("department") for employee_id, profile in employees.items()}
+        errors = await repository.mark_attendance(new_records, departments)
+        for i, error in zip(positions, errors):
+            if error == "duplicate":
+                results[i]["result"] = "duplicate"
+            elif error:
+                results[i]["result"] = "error"
+                results[i]["detail"] = error
+
+    summary = {"created": 0, "duplicate": 0, "employee_not_found": 0, "error": 0}
+    for result in results:
+        summary[result["result"]] += 1
+
+    if summary["created"]:
+        invalidate_dashboard_cache()
+        await versions.bump("attendance")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "message": f"Marked attendance for {summary['created']} of {len(records)} records",
+        "total": len(records),
+        **summary,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "records_per_second": round(len(records) / elapsed, 1) if elapsed > 0 else None,
+        "results": results
+    }
+
+@router.post("/import")
+async def import_attendance(request: Request):
+    """Mark attendance from a CSV or NDJSON upload, reporting every rejected row"""
+    repository = get_repository()
+
+    report = ImportReport()
+    # A batch refused while attendance totals are rebuilt answers 503, the rows
+    # created before it still count
+    try:
+        async for batch in read_batches(read_records(request, upload_format(request), report)):
+            valid = validate_batch(ATTENDANCE_BATCH, batch, report)
+            if not valid:
+                continue
+
+            # One query per batch for the employees it references
+            employees = await find_employee_profiles(list({record.employee_id for _, record in valid}))
+            rows = []
+            new_records = []
+            for row, record in valid:
+                if record.employee_id not in employees:
+                    report.add_error(row, "Employee not found")
+                    continue
+                rows.append(row)
+                new_records.append(record.model_dump())
+            if not new_records:
+                continue
+
+            departments = {employee_id: profile.get("department") for employee_id, profile in employees.items()}
+            errors = await repository.mark_attendance(new_records, departments)
+            for row, error in zip(rows, errors):
+                if error == "duplicate":
+                    report.add_error(row, "Attendance already marked for this date")
+                elif error:
+                    report.add_error(row, error)
+                else:
+                    report.created += 1
+    finally:
+        if report.created:
+            invalidate_dashboard_cache()
+            await versions.bump("attendance")
+    return report.summary()
+
 @router.put("/{employee_id}/{date}")
-def update_attendance(employee_id: str, date: str, attendance: AttendanceUpdate):
+async def update_attendance(employee_id: str, date: str, attendance: AttendanceUpdate):
     """Update attendance for a specific employee and date (only past and current dates)"""
-    if attendance_collection is None or employee_collection is None:
-        raise HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
-    
+    repository = get_repository()
+
     try:
         # Parse the date
         attendance_date = date_class.fromisoformat(date)
@@ -46,45 +159,112 @@ def update_attendance(employee_id: str, date: str, attendance: AttendanceUpdate)
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
     # Check if employee exists
-    if not employee_collection.find_one({"employee_id": employee_id}):
+    employee = await find_employee(employee_id)
+    if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Validate status
     if attendance.status not in ["Present", "Absent"]:
         raise HTTPException(status_code=400, detail="Invalid attendance status")
     
-    # Update the attendance record
-    result = attendance_collection.update_one(
-        {"employee_id": employee_id, "date": date},
-        {"$set": {"status": attendance.status}}
+    previous = await repository.update_attendance(
+        employee_id, attendance_date, attendance.status, employee.get("department")
     )
-    
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Attendance record not found for this employee and date")
-    
+
+    invalidate_dashboard_cache()
+    await versions.bump("attendance")
     return {"message": "Attendance updated successfully"}
 
-@router.get("/{employee_id}")
-def get_attendance(
+@router.get("/", response_class=ORJSONResponse, dependencies=[Depends(versioned("attendance"))])
+async def get_attendance_range(
+    request: Request,
+    start: date_class = Query(alias="from", description="First day of the range (YYYY-MM-DD)"),
+    end: date_class = Query(alias="to", description="Last day of the range (YYYY-MM-DD)"),
+    status: str | None = Query(default=None, pattern="^(Present|Absent)$"),
+    after: str | None = Query(default=None, description="next_after value of the previous page"),
+    limit: int | None = Query(default=None, ge=1, le=10000)
+):
+    """Attendance of all employees between two dates, ordered by date then employee"""
+    repository = get_repository()
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    position = None
+    if after:
+        # Keyset pagination on (date, employee_id), the next_after token is "<date>:<employee_id>"
+        after_date, _, after_employee = after.partition(":")
+        try:
+            position = (date_class.fromisoformat(after_date), after_employee)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'after' value")
+    if after or limit:
+        await check_date_paging(repository)
+
+    cursor = repository.attendance_range(start, end, status, position, limit)
+
+    if wants_ndjson(request):
+        return ndjson_response(cursor, transform=output_record)
+
+    records = [output_record(record) for record in await cursor.to_list()]
+    last = records[-1] if limit and len(records) == limit else None
+    return ORJSONResponse({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "records": records,
+        "next_after": f"{last['date']}:{last['employee_id']}" if last else None
+    })
+
+@router.get("/export", dependencies=[Depends(versioned("attendance"))])
+async def export_attendance(
+    start: date_class | None = Query(default=None, alias="from", description="First day to include (YYYY-MM-DD)"),
+    end: date_class | None = Query(default=None, alias="to", description="Last day to include (YYYY-MM-DD)"),
+    employee_id: str | None = Query(default=None),
+    export_format: str = Query(default="csv", alias="format", pattern="^(csv|ndjson)$")
+):
+    """Download attendance as CSV or NDJSON, streamed in date order"""
+    cursor = get_repository().export_attendance(start, end, employee_id)
+    return export_response(cursor, export_format, ["employee_id", "date", "status"], "attendance",
+                           transform=output_record)
+
+@router.get("/{employee_id}", response_class=ORJSONResponse,
+            dependencies=[Depends(versioned("employees", "attendance"))])
+async def get_attendance(
     employee_id: str,
-    date: str | None = Query(default=None)
+    request: Request,
+    date: date_class | None = Query(default=None),
+    start: date_class | None = Query(default=None, alias="from", description="First day of the range (YYYY-MM-DD)"),
+    end: date_class | None = Query(default=None, alias="to", description="Last day of the range (YYYY-MM-DD)"),
+    after: date_class | None = Query(default=None, description="Return records dated after this date (YYYY-MM-DD)"),
+    limit: int | None = Query(default=None, ge=1, le=1000)
 ):
-    if attendance_collection is None or employee_collection is None:
-        raise HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
-    
-    if not employee_collection.find_one({"employee_id": employee_id}):
+    repository = get_repository()
+
+    if not await find_employee(employee_id):
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    query = {"employee_id": employee_id}
-    if date:
-        query["date"] = date
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if after or limit:
+        await check_date_paging(repository)
 
-    records = list(attendance_collection.find(query, {"_id": 0}))
-    total_present_days = sum(
-        1 for record in records if record["status"] == "Present"
-    )
+    cursor = repository.employee_attendance(employee_id, date, start, end, after, limit)
 
-    return {
+    if wants_ndjson(request):
+        return ndjson_response(cursor, transform=output_record)
+
+    records = [output_record(record) for record in await cursor.to_list()]
+    if after or limit:
+        total_present_days = await repository.count_present(employee_id, date, start, end)
+    else:
+        total_present_days = sum(
+            1 for record in records if record["status"] == "Present"
+        )
+
+    return ORJSONResponse({
         "records": records,
-        "total_present_days": total_present_days
-    }
+        "total_present_days": total_present_days,
+        "next_after": records[-1]["date"] if limit and len(records) == limit else None
+    })
@@ -1,65 +1,75 @@
-from fastapi import APIRouter, HTTPException
-from app.database import employee_collection, attendance_collection, db
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.repository import get_repository
+from app.cache import dashboard_cache
+from app.versions import versioned
+from app import events, versions
+from app.dates import output_record
+from datetime import date, datetime, timedelta
+import asyncio
+import time
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
-@router.get("/stats")
-def get_dashboard_stats():
+@router.get("/stats", dependencies=[Depends(versioned("employees", "attendance", daily=True))])
+async def get_dashboard_stats():
     """Get dashboard statistics"""
-    if employee_collection is None or attendance_collection is None:
-        # Return demo data when database is not available
-        return {
-            "total_employees": 2,
-            "total_attendance_records": 10,
-            "total_present": 8,
-            "total_absent": 2,
-            "present_today": 2,
-            "absent_today": 0,
-            "attendance_rate": 80.0,
-            "present_this_month": 8,
-            "absent_this_month": 2,
-            "message": "Demo data - Database not connected"
-        }
-    
+    return await load_stats(seq=events.broadcaster.published)
+
+async def stream_snapshot() -> dict:
+    """Dashboard statistics for a live dashboard, counting exactly the changes up to their seq"""
+    async with events.snapshot_window() as seq:
+        # Not from the cache, a body cached outside the window may hold changes published after its seq
+        return await load_stats(seq=seq, use_cache=False)
+
+async def load_stats(seq: int, use_cache: bool = True) -> dict:
+    """Compute the dashboard statistics, or take them from the cache"""
+    repository = get_repository()
+
+    # Keyed by the data versions ETags are built from. Another process's write only clears
+    # that process's cache, so a body from before it must not be sent under the newer ETag;
+    # the versions never go backwards, so the body is at least as new as the ETag.
+    data_versions = await versions.current_versions()
+    cache_key = ("stats", data_versions["employees"][0], data_versions["attendance"][0], date.today().isoformat())
+    cached = dashboard_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        stats, cached_at = cached
+        return {**stats, "meta": {
+            "cache_hit": True,
+            "cached_at": datetime.fromtimestamp(cached_at).isoformat(),
+            "computation_ms": stats["meta"]["computation_ms"],
+            "seq": stats["meta"]["seq"]
+        }}
+
     try:
-        # Total employees
-        total_employees = employee_collection.count_documents({})
-        
-        # Total attendance records
-        total_attendance_records = attendance_collection.count_documents({})
-        
-        # Present/Absent counts (all time)
-        total_present = attendance_collection.count_documents({"status": "Present"})
-        total_absent = attendance_collection.count_documents({"status": "Absent"})
-        
-        # Today's attendance
+        started = time.perf_counter()
         today = datetime.now().date().isoformat()
-        today_present = attendance_collection.count_documents({"status": "Present", "date": today})
-        today_absent = attendance_collection.count_documents({"status": "Absent", "date": today})
+        seven_days_ago = datetime.now().date() - timedelta(days=7)
+
+        # All three reads are independent, run them concurrently
+        counters, recent_attendance, employee_counts = await asyncio.gather(
+            repository.attendance_totals(today),
+            repository.recent_attendance(seven_days_ago, 10),
+            repository.employee_counts()
+        )
+        totals = counters["total"]
+        today_counts = counters["day"]
+
+        total_employees = employee_counts["total"]
+        total_present = totals.get("present", 0)
+        total_absent = totals.get("absent", 0)
+        total_attendance_records = total_present + total_absent
+        today_present = today_counts.get("present", 0)
+        today_absent = today_counts.get("absent", 0)
         today_total = today_present + today_absent
-        
-        # Department wise employee count
-        pipeline = [
-            {"$group": {"_id": "$department", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        department_counts = list(employee_collection.aggregate(pipeline))
-        department_stats = [{"department": item["_id"], "count": item["count"]} for item in department_counts]
-        
-        # Recent attendance (last 7 days)
-        seven_days_ago = (datetime.now().date() - timedelta(days=7)).isoformat()
-        recent_attendance = list(attendance_collection.find(
-            {"date": {"$gte": seven_days_ago}},
-            {"_id": 0}
-        ).sort("date", -1).limit(10))
-        
+        department_stats = employee_counts["departments"]
+
         # Attendance rate calculation
         attendance_rate = 0
         if total_attendance_records > 0:
             attendance_rate = round((total_present / total_attendance_records) * 100, 2)
         
-        return {
+        stats = {
             "total_employees": total_employees,
             "total_attendance_records": total_attendance_records,
             "total_present": total_present,
@@ -73,73 +83,66 @@ def get_dashboard_stats():
                 "attendance_rate": round((today_present / today_total * 100), 2) if today_total > 0 else 0
             },
             "department_stats": department_stats,
-            "recent_attendance": recent_attendance
+            "recent_attendance": [output_record(record) for record in recent_attendance],
+            "meta": {
+                "cache_hit": False,
+                "cached_at": None,
+                "computation_ms": round((time.perf_counter() - started) * 1000, 2),
+                "seq": seq
+            }
         }
+        dashboard_cache.set(cache_key, stats)
+        return stats
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard stats: {str(e)}")
 
+@router.get("/stream")
+async def stream_dashboard_stats():
+    """Server-Sent Events: the dashboard stats once, then a delta event whenever employees or attendance change"""
+    get_repository()
+    if events.DASHBOARD_EVENTS == "off":
+        raise HTTPException(status_code=404, detail="Live dashboard updates are disabled")
+
+    return StreamingResponse(
+        events.event_stream(stream_snapshot),
+        media_type="text/event-stream",
+        # Keep reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/test")
-def test_endpoint():
+async def test_endpoint():
     """Simple test endpoint"""
     return {"message": "Test endpoint works"}
 
-@router.get("/employees")
-def get_employee_dashboard():
+@router.get("/employees", response_class=ORJSONResponse, dependencies=[Depends(versioned("employees", "attendance", daily=True))])
+async def get_employee_dashboard(
+    department: str | None = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int | None = Query(default=None, ge=1, le=1000)
+):
     """Get dashboard with individual employee summaries"""
+    repository = get_repository()
+
     try:
-        # Get all employees
-        employees = list(employee_collection.find({}, {"_id": 0}))
-        
-        employee_summaries = []
         today = datetime.now().date().isoformat()
-        seven_days_ago = (datetime.now().date() - timedelta(days=7)).isoformat()
-        
-        for emp in employees:
-            emp_id = emp.get("employee_id")
-            if not emp_id:
-                continue
-            
-            # Get attendance stats
-            all_attendance = list(attendance_collection.find({"employee_id": emp_id}, {"_id": 0}))
-            total_records = len(all_attendance)
-            present_count = len([r for r in all_attendance if r.get("status") == "Present"])
-            absent_count = total_records - present_count
-            
-            attendance_rate = round((present_count / total_records) * 100, 2) if total_records > 0 else 0
-            
-            # Today's status
-            today_rec = attendance_collection.find_one({"employee_id": emp_id, "date": today}, {"_id": 0})
-            today_status = today_rec.get("status") if today_rec else "Not Marked"
-            
-            # Recent records
-            recent = list(attendance_collection.find(
-                {"employee_id": emp_id, "date": {"$gte": seven_days_ago}},
-                {"_id": 0}
-            ).sort("date", -1).limit(5))
-            
-            employee_summaries.append({
-                "employee_id": str(emp_id),
-                "full_name": str(emp.get("full_name", "Unknown")),
-                "email": str(emp.get("email", "")),
-                "phone": str(emp.get("phone", "")),
-                "department": str(emp.get("department", "Unknown")),
-                "total_records": int(total_records),
-                "present_count": int(present_count),
-                "absent_count": int(absent_count),
-                "attendance_rate": float(attendance_rate),
-                "today_status": str(today_status),
-                "recent_attendance": recent
-            })
-        
-        employee_summaries.sort(key=lambda x: x["full_name"])
-        
-        return {
-            "total_employees": len(employee_summaries),
+        seven_days_ago = datetime.now().date() - timedelta(days=7)
+
+        total_employees, employee_summaries = await repository.employee_summaries(
+            today, seven_days_ago, department, skip, limit
+        )
+
+        return ORJSONResponse({
+            "total_employees": total_employees,
+            "skip": skip,
+            "limit": limit,
             "employees": employee_summaries
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-
-
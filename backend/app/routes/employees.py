@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from app.database import employee_collection, db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.repository import DuplicateEmployeeError, get_repository
 from app.schemas import EmployeeCreate
-import random
-import string
+from app.cache import invalidate_dashboard_cache
+from app.directory import invalidate_employee
+from app import events, search, versions
+from app.versions import check_conditional, etag_matches, versioned
+from app.streaming import wants_ndjson, ndjson_response
+from app.transfer import ImportReport, upload_format, read_records, read_batches, validate_batch, export_response
+from pydantic import TypeAdapter
+import asyncio
+import hashlib
 
 router = APIRouter(prefix="/employees", tags=["Employees"])
 
@@ -22,109 +30,204 @@ PREDEFINED_DEPARTMENTS = [
     "Product Management"
 ]
 
-def generate_unique_employee_id(full_name: str) -> str:
-    """Generate a unique employee ID based on name and random numbers"""
+INVALID_DEPARTMENT = f"Invalid department. Must be one of: {', '.join(PREDEFINED_DEPARTMENTS)}"
+
+DEPARTMENTS_ETAG = f'"{hashlib.sha1("|".join(PREDEFINED_DEPARTMENTS).encode()).hexdigest()[:16]}"'
+
+# Columns of an employee export, in order
+EXPORT_FIELDS = ["employee_id", "full_name", "email", "phone", "department"]
+
+# Built once, validating a whole import batch per call
+EMPLOYEE_BATCH = TypeAdapter(list[EmployeeCreate])
+
+def employee_document(employee: dict) -> dict:
+    """Build the stored employee document, with the lowercase email used for case-insensitive uniqueness"""
+    return {**employee, "email_lower": employee["email"].lower()}
+
+def employee_id_prefix(full_name: str) -> str:
+    """Build the ID prefix from a name's initials"""
     # Extract initials from the name
     name_parts = full_name.strip().split()
     if len(name_parts) >= 2:
         # Use first 2 letters of first name + first 2 letters of last name
-        prefix = (name_parts[0][:2] + name_parts[-1][:2]).upper()
-    else:
-        # Use first 4 letters of the single name
-        prefix = name_parts[0][:4].upper()
-    
-    # Generate unique ID with random numbers
-    max_attempts = 100
-    for _ in range(max_attempts):
-        # Generate 4 random digits
-        random_suffix = ''.join(random.choices(string.digits, k=4))
-        employee_id = f"{prefix}{random_suffix}"
-        
-        # Check if ID already exists (only if database is connected)
-        if employee_collection is None or not employee_collection.find_one({"employee_id": employee_id}):
-            return employee_id
-    
-    # If still not unique after max attempts, add extra random characters
-    random_suffix = ''.join(random.choices(string.digits, k=6))
-    return f"{prefix}{random_suffix}"
+        return (name_parts[0][:2] + name_parts[-1][:2]).upper()
+    # Use first 4 letters of the single name
+    return name_parts[0][:4].upper()
+
+async def generate_unique_employee_id(full_name: str) -> str:
+    """Generate a unique employee ID from the name's initials and a per-prefix sequence"""
+    return (await get_repository().allocate_employee_ids(employee_id_prefix(full_name), 1))[0]
 
 @router.post("/generate-id")
-def generate_employee_id(request: dict):
+async def generate_employee_id(request: dict):
     """Generate a unique employee ID based on the provided name"""
     full_name = request.get("full_name", "")
     if not full_name or len(full_name.strip()) < 2:
         raise HTTPException(status_code=400, detail="Full name must be at least 2 characters")
     
-    employee_id = generate_unique_employee_id(full_name)
+    employee_id = await generate_unique_employee_id(full_name)
     return {"employee_id": employee_id}
 
+@router.post("/generate-ids")
+async def generate_employee_ids(request: dict):
+    """Generate unique employee IDs for many names at once, one counter update per distinct prefix"""
+    full_names = request.get("full_names")
+    if not isinstance(full_names, list) or not full_names:
+        raise HTTPException(status_code=400, detail="full_names must be a non-empty list")
+    if len(full_names) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 names can be processed at once")
+    for full_name in full_names:
+        if not isinstance(full_name, str) or len(full_name.strip()) < 2:
+            raise HTTPException(status_code=400, detail="Full name must be at least 2 characters")
+
+    repository = get_repository()
+    # Group names by prefix and reserve each prefix's block concurrently
+    positions = {}
+    for i, full_name in enumerate(full_names):
+        positions.setdefault(employee_id_prefix(full_name), []).append(i)
+    blocks = await asyncio.gather(*[
+        repository.allocate_employee_ids(prefix, len(indexes)) for prefix, indexes in positions.items()
+    ])
+    employee_ids = [None] * len(full_names)
+    for indexes, block in zip(positions.values(), blocks):
+        for i, employee_id in zip(indexes, block):
+            employee_ids[i] = employee_id
+
+    return {
+        "employee_ids": [
+            {"full_name": full_name, "employee_id": employee_id}
+            for full_name, employee_id in zip(full_names, employee_ids)
+        ]
+    }
+
 @router.get("/departments")
-def get_departments():
+async def get_departments(request: Request, response: Response):
     """Get list of predefined departments"""
+    # The list only changes with a deployment, so browsers may keep it for a day
+    headers = {"ETag": DEPARTMENTS_ETAG, "Cache-Control": "public, max-age=86400, stale-while-revalidate=604800"}
+    if etag_matches(request.headers.get("if-none-match", ""), DEPARTMENTS_ETAG):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return {"departments": PREDEFINED_DEPARTMENTS}
 
+@router.get("/search", response_class=ORJSONResponse)
+async def search_employees(
+    request: Request,
+    q: str = Query(default="", max_length=100, description="Matched against name, email, employee ID and phone"),
+    department: str | None = Query(default=None),
+    sort: str = Query(default="full_name", pattern="^(full_name|employee_id|email|department)$"),
+    order: str = Query(default="asc", pattern="^(asc|desc)$"),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=1000)
+):
+    """Find employees from the in-process search index, returning one sorted page and the number of matches"""
+    index = await search.employee_index()
+    # As of the index, which may still be catching up with other processes' writes
+    check_conditional(request, {"employees": (index.version, None)}, ("employees",))
+    total, employees = index.search(q, department, sort, order == "desc", skip, limit)
+    return ORJSONResponse({"total": total, "skip": skip, "limit": limit, "employees": employees})
+
 @router.post("/")
-def add_employee(employee: EmployeeCreate):
-    if employee_collection is None:
-        raise HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
-    
+async def add_employee(employee: EmployeeCreate):
+    repository = get_repository()
+
     # Validate phone number format
     if not EmployeeCreate.validate_phone(employee.phone):
         raise HTTPException(status_code=400, detail="Phone number must be exactly 10 digits")
     
     # Validate department
     if employee.department not in PREDEFINED_DEPARTMENTS:
-        raise HTTPException(status_code=400, detail=f"Invalid department. Must be one of: {', '.join(PREDEFINED_DEPARTMENTS)}")
+        raise HTTPException(status_code=400, detail=INVALID_DEPARTMENT)
     
-    # Check for duplicate employee ID
-    if employee_collection.find_one({"employee_id": employee.employee_id}):
-        raise HTTPException(status_code=409, detail="Employee ID already exists")
+    document = employee_document(employee.model_dump())
+    # Published together with the write, see events.snapshot_window
+    async with events.change():
+        try:
+            await repository.add_employee(document)
+        except DuplicateEmployeeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        events.employees_changed({employee.department: 1})
+    invalidate_employee(employee.employee_id)
+    invalidate_dashboard_cache()
+    added_to = search.employees_added([document])
+    search.employees_synced(await versions.bump("employees"), added_to)
+    return {"message": "Employee added successfully"}
 
-    # Check for duplicate email (case-insensitive)
-    if employee_collection.find_one({"email": {"$regex": f"^{employee.email}$", "$options": "i"}}):
-        raise HTTPException(status_code=409, detail="Email already exists")
-    
-    # Check for duplicate phone number
-    if employee_collection.find_one({"phone": employee.phone}):
-        raise HTTPException(status_code=409, detail="Phone number already exists")
+@router.post("/import")
+async def import_employees(request: Request):
+    """Create employees from a CSV or NDJSON upload, reporting every rejected row"""
+    repository = get_repository()
 
-    employee_collection.insert_one(employee.dict())
-    return {"message": "Employee added successfully"}
+    report = ImportReport()
+    added_to = []
+    async for batch in read_batches(read_records(request, upload_format(request), report)):
+        valid = []
+        # Same department check as add_employee, rows failing it are reported like validation errors
+        for row, employee in validate_batch(EMPLOYEE_BATCH, batch, report):
+            if employee.department in PREDEFINED_DEPARTMENTS:
+                valid.append((row, employee))
+            else:
+                report.add_error(row, f"department: {INVALID_DEPARTMENT}")
+        if not valid:
+            continue
+        documents = [employee_document(employee.model_dump()) for _, employee in valid]
+        async with events.change():
+            # Duplicates are rejected against existing employees and within the file
+            errors = await repository.add_employees(documents)
+            departments = {}
+            created = []
+            for (row, _), document, error in zip(valid, documents, errors):
+                invalidate_employee(document["employee_id"])
+                if error:
+                    report.add_error(row, error)
+                else:
+                    report.created += 1
+                    created.append(document)
+                    departments[document["department"]] = departments.get(document["department"], 0) + 1
+            events.employees_changed(departments)
+        added_to.append(search.employees_added(created))
 
-@router.get("/")
-def get_employees():
-    if employee_collection is None:
-        # Return demo data when database is not available
-        return [
-            {
-                "employee_id": "DEMO0001",
-                "full_name": "John Doe",
-                "email": "john.doe@example.com",
-                "phone": "1234567890",
-                "department": "Engineering",
-                "designation": "Software Engineer",
-                "hire_date": "2024-01-15"
-            },
-            {
-                "employee_id": "DEMO0002",
-                "full_name": "Jane Smith",
-                "email": "jane.smith@example.com",
-                "phone": "0987654321",
-                "department": "Human Resources",
-                "designation": "HR Manager",
-                "hire_date": "2023-06-20"
-            }
-        ]
-    
-    employees = list(employee_collection.find({}, {"_id": 0}))
-    return employees
+    if report.created:
+        invalidate_dashboard_cache()
+        search.employees_synced(await versions.bump("employees"), *added_to)
+    return report.summary()
+
+@router.get("/export", dependencies=[Depends(versioned("employees"))])
+async def export_employees(export_format: str = Query(default="csv", alias="format", pattern="^(csv|ndjson)$")):
+    """Download every employee as CSV or NDJSON, streamed in employee ID order"""
+    cursor = get_repository().list_employees(after="")
+    return export_response(cursor, export_format, EXPORT_FIELDS, "employees")
+
+@router.get("/", response_class=ORJSONResponse, dependencies=[Depends(versioned("employees"))])
+async def get_employees(
+    request: Request,
+    after: str | None = Query(default=None, description="Return employees whose ID sorts after this one"),
+    limit: int | None = Query(default=None, ge=1, le=1000)
+):
+    cursor = get_repository().list_employees(after, limit)
+
+    if wants_ndjson(request):
+        return ndjson_response(cursor)
+
+    employees = await cursor.to_list()
+    headers = {}
+    if limit and len(employees) == limit:
+        headers["X-Next-After"] = employees[-1]["employee_id"]
+    # Returned as a response so the documents go straight to orjson, skipping jsonable_encoder
+    return ORJSONResponse(employees, headers=headers)
 
 @router.delete("/{employee_id}")
-def delete_employee(employee_id: str):
-    if employee_collection is None:
-        raise HTTPException(status_code=503, detail="Database not available. Please configure MongoDB connection.")
-    
-    result = employee_collection.delete_one({"employee_id": employee_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    return {"message": "Employee deleted successfully"}
+async def delete_employee(employee_id: str):
+    repository = get_repository()
+    async with events.change():
+        employee = await repository.remove_employee(employee_id)
+        if employee is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        events.employees_changed({employee.get("department"): -1})
+    invalidate_employee(employee_id)
+    invalidate_dashboard_cache()
+    removed_from = search.employee_removed(employee_id)
+    search.employees_synced(await versions.bump("employees"), removed_from)
+
+    job_id = await repository.remove_employee_attendance(employee_id, employee.get("department"))
+    return {"message": "Employee deleted successfully", "job_id": job_id}
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.schemas import JobCreate
+from app.breaker import mongo_breaker, unavailable
+from app import jobs
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+def job_collection():
+    """The jobs collection, or a 503 when MongoDB is not configured or unreachable"""
+    collection = jobs.get_job_collection()
+    if collection is None or not mongo_breaker.allow():
+        raise unavailable()
+    return collection
+
+@router.post("/", status_code=202)
+async def create_job(job: JobCreate):
+    """Queue a maintenance job, poll /jobs/{job_id} for its outcome.
+
+    While a job of the same type is still queued or running, that job is returned instead.
+    """
+    job_collection()
+    job_id = await jobs.enqueue(job.type, {}, once=True)
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/")
+async def list_jobs(
+    status: str | None = Query(default=None, pattern="^(queued|running|succeeded|failed)$"),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    """List the most recent jobs"""
+    collection = job_collection()
+    query = {"status": status} if status else {}
+    documents = await collection.find(query).sort("created_at", -1).limit(limit).to_list()
+    return [jobs.job_view(job) for job in documents]
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get a job's status, progress and result"""
+    collection = job_collection()
+    job = await collection.find_one({"_id": job_id})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_view(job)
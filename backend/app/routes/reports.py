@@ -0,0 +1,153 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from app.repository import get_repository
+from app.versions import versioned
+from datetime import date
+import calendar
+import time
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+# Day cells of the matrix rows
+DAY_CODES = {"present": ord("P"), "absent": ord("A"), "unmarked": ord("-")}
+
+def unpack_days(np, bitmaps, days: int):
+    """Turn a vector of 32-bit day bitmaps into an (employees x days) boolean matrix"""
+    as_bytes = bitmaps.astype("<u4").view(np.uint8).reshape(len(bitmaps), 4)
+    return np.unpackbits(as_bytes, axis=1, bitorder="little")[:, :days].astype(bool)
+
+def running_streaks(np, hits, breaks):
+    """Length of the current streak of `hits` at every day, reset by `breaks` and unaffected by unmarked days"""
+    so_far = np.cumsum(hits, axis=1)
+    at_last_break = np.maximum.accumulate(np.where(breaks, so_far, 0), axis=1)
+    return so_far - at_last_break
+
+def summarise_month(np, documents: list, days: int, through: int, include_matrix: bool) -> dict:
+    """Compute every report figure for one month of bitmap documents with vectorized operations"""
+    count = len(documents)
+    present = unpack_days(np, np.fromiter((d.get("present", 0) for d in documents), np.int64, count), days)
+    absent = unpack_days(np, np.fromiter((d.get("absent", 0) for d in documents), np.int64, count), days)
+
+    present_days = present.sum(axis=1)
+    absent_days = absent.sum(axis=1)
+    marked_days = present_days + absent_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(marked_days > 0, np.round(present_days / marked_days * 100, 2), 0.0)
+
+    present_runs = running_streaks(np, present, absent)
+    absent_runs = running_streaks(np, absent, present)
+    longest_present = present_runs.max(axis=1)
+    longest_absent = absent_runs.max(axis=1)
+    # The streak still going on the last day reported: today for the current month
+    current_present = present_runs[:, through - 1] if through else np.zeros(count, int)
+
+    departments = [d.get("department", "Unknown") for d in documents]
+    names, department_index = np.unique(np.array(departments, dtype=object), return_inverse=True)
+    department_sizes = np.bincount(department_index, minlength=len(names))
+    # Group rows by department, then sum each group's day columns in one pass
+    order = np.argsort(department_index, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(department_sizes)[:-1])) if count else []
+    department_present = np.add.reduceat(present[order].astype(np.int64), starts, axis=0) if count else []
+    department_absent = np.add.reduceat(absent[order].astype(np.int64), starts, axis=0) if count else []
+
+    rows = []
+    if count:
+        day_matrix = np.full((count, days), DAY_CODES["unmarked"], dtype=np.uint8)
+        day_matrix[present] = DAY_CODES["present"]
+        day_matrix[absent] = DAY_CODES["absent"]
+        # Every row's bytes are contiguous, view them as one fixed-width string per employee
+        day_strings = day_matrix.view(f"S{days}").ravel().tolist()
+        columns = zip(
+            documents, departments, present_days.tolist(), absent_days.tolist(), rates.tolist(),
+            longest_present.tolist(), longest_absent.tolist(), current_present.tolist(), day_strings
+        )
+        for document, department, present_count, absent_count, rate, longest, longest_out, current, days_string in columns:
+            row = {
+                "employee_id": document["employee_id"],
+                "department": department,
+                "present": present_count,
+                "absent": absent_count,
+                "attendance_rate": rate,
+                "longest_present_streak": longest,
+                "longest_absent_streak": longest_out,
+                "current_present_streak": current
+            }
+            if include_matrix:
+                row["days"] = days_string.decode()
+            rows.append(row)
+
+    def rate(present_total, absent_total):
+        total = present_total + absent_total
+        return round(present_total / total * 100, 2) if total else 0.0
+
+    department_rows = []
+    for i, name in enumerate(names):
+        present_total = int(department_present[i].sum())
+        absent_total = int(department_absent[i].sum())
+        department_row = {
+            "department": name,
+            "employees": int(department_sizes[i]),
+            "present": present_total,
+            "absent": absent_total,
+            "attendance_rate": rate(present_total, absent_total)
+        }
+        if include_matrix:
+            department_row["daily_present"] = department_present[i].tolist()
+            department_row["daily_absent"] = department_absent[i].tolist()
+        department_rows.append(department_row)
+
+    total_present = int(present_days.sum())
+    total_absent = int(absent_days.sum())
+    return {
+        "employees": count,
+        "present": total_present,
+        "absent": total_absent,
+        "attendance_rate": rate(total_present, total_absent),
+        "daily_present": present.sum(axis=0).tolist(),
+        "daily_absent": absent.sum(axis=0).tolist(),
+        "departments": department_rows,
+        "employee_rows": rows
+    }
+
+@router.get("/attendance-matrix", response_class=ORJSONResponse, dependencies=[Depends(versioned("employees", "attendance", daily=True))])
+async def get_attendance_matrix(
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Month to report (YYYY-MM)"),
+    department: str | None = Query(default=None),
+    matrix: bool = Query(default=True, description="Include the day-by-day matrices")
+):
+    """Per-employee and per-department attendance for one month, computed from the bitmap store"""
+    repository = get_repository()
+
+    try:
+        # Optional dependency, only needed by reports
+        import numpy as np
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Attendance reports need NumPy, install it with `pip install numpy`")
+
+    started = time.perf_counter()
+    year, month_number = int(month[:4]), int(month[5:])
+    days = calendar.monthrange(year, month_number)[1]
+    today = date.today()
+    if (year, month_number) == (today.year, today.month):
+        through = today.day
+    elif (year, month_number) > (today.year, today.month):
+        through = 0
+    else:
+        through = days
+
+    documents = await repository.month_bitmaps(month, department)
+    if documents is None:
+        raise HTTPException(status_code=404, detail="Attendance bitmaps are disabled, set ATTENDANCE_BITMAPS=true")
+    fetched = time.perf_counter()
+
+    report = summarise_month(np, documents, days, through, matrix)
+    return ORJSONResponse({
+        "month": month,
+        "days": days,
+        "through_day": through,
+        **report,
+        "meta": {
+            "fetch_ms": round((fetched - started) * 1000, 2),
+            "computation_ms": round((time.perf_counter() - fetched) * 1000, 2)
+        }
+    })
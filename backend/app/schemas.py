@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
 from datetime import date as DateType
-from typing import Optional
+from typing import Literal, Optional
 import re
 
 class EmployeeCreate(BaseModel):
@@ -111,3 +111,22 @@ class AttendanceUpdate(BaseModel):
         return v
 
 
+
+class AttendanceBulkCreate(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "records": [
+                    {"employee_id": "EMP001", "date": "2026-02-05", "status": "Present"},
+                    {"employee_id": "EMP002", "date": "2026-02-05", "status": "Absent"}
+                ]
+            }
+        }
+    )
+    
+    records: list[AttendanceCreate] = Field(..., min_length=1, max_length=10000, description="Attendance records to mark")
+
+class JobCreate(BaseModel):
+    model_config = ConfigDict(json_schema_extra={"example": {"type": "rebuild_rollups"}})
+
+    type: Literal["rebuild_rollups", "ensure_indexes"] = Field(..., description="Maintenance job to queue")
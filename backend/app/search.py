@@ -0,0 +1,238 @@
+"""
+In-process employee search index behind GET /employees/search.
+
+The index holds every employee and matches a query against their name, email,
+employee ID and phone: queries of three or more characters as substrings,
+through a trigram index, and shorter ones as word prefixes. Every sort order
+is kept presorted, so a page of results costs about as much as its length
+rather than the directory's size.
+
+It is built from the repository on the first search. add_employee, the import
+and delete_employee apply their changes to it directly. Writes made by other
+server processes are noticed through the employees data version (see
+app/versions.py) and picked up by a rebuild in the background, searches keep
+being answered from the current index meanwhile. Their ETag is built from the
+version of the index that answered, so results always match it.
+"""
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+import asyncio
+import heapq
+from itertools import islice
+import re
+
+from app import versions
+from app.repository import EMPLOYEE_FIELDS, get_repository
+
+SORT_FIELDS = ("full_name", "employee_id", "email", "department")
+
+WORD = re.compile(r"[a-z0-9]+")
+
+def search_text(document: dict) -> str:
+    """Lowercase text a query is matched against, fields separated so no match spans two"""
+    fields = (document.get("full_name"), document.get("email"), document.get("employee_id"), document.get("phone"))
+    return "\n".join(str(value).lower() for value in fields if value)
+
+def sort_key(document: dict, field: str) -> tuple:
+    name = document.get("full_name", "").lower()
+    if field == "full_name":
+        return (name, document["employee_id"])
+    if field == "department":
+        return (document.get("department", ""), name, document["employee_id"])
+    if field == "email":
+        return (document.get("email", "").lower(), document["employee_id"])
+    return (document["employee_id"],)
+
+class EmployeeIndex:
+    """Employees by position, with trigram and prefix postings and presorted orders over the positions"""
+
+    def __init__(self, version: int | None = None):
+        # Data version of the employees this index reflects
+        self.version = version
+        self._documents = []       # position -> document, None once removed
+        self._texts = []           # position -> search text, "" once removed
+        self._positions = {}       # employee_id -> position
+        # Trigram and one or two character word prefix -> positions, removed ones included
+        self._grams = defaultdict(lambda: array("i"))
+        self._prefixes = defaultdict(lambda: array("i"))
+        self._departments = {}     # department -> set of positions
+        self._keys = {field: [] for field in SORT_FIELDS}     # position -> sort key
+        self._orders = {field: [] for field in SORT_FIELDS}   # positions sorted by key
+
+    def __len__(self):
+        return len(self._positions)
+
+    def load(self, documents):
+        """Add many employees without keeping the orders up to date, call sort() after the last one"""
+        for document in documents:
+            self._append(document, sort=False)
+
+    def sort(self):
+        for field, keys in self._keys.items():
+            self._orders[field] = sorted(
+                (position for position in range(len(keys)) if self._documents[position] is not None),
+                key=keys.__getitem__
+            )
+
+    def add(self, document: dict):
+        document = {key: value for key, value in document.items() if key not in EMPLOYEE_FIELDS}
+        if document["employee_id"] in self._positions:
+            self.remove(document["employee_id"])
+        self._append(document, sort=True)
+
+    def _append(self, document: dict, sort: bool):
+        position = len(self._documents)
+        text = search_text(document)
+        self._documents.append(document)
+        self._texts.append(text)
+        self._positions[document["employee_id"]] = position
+        grams = self._grams
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            grams[gram].append(position)
+        prefixes = self._prefixes
+        for prefix in {word[:n] for word in WORD.findall(text) for n in (1, 2)}:
+            prefixes[prefix].append(position)
+        self._departments.setdefault(document.get("department"), set()).add(position)
+        for field in SORT_FIELDS:
+            keys = self._keys[field]
+            keys.append(sort_key(document, field))
+            if sort:
+                insort(self._orders[field], position, key=keys.__getitem__)
+
+    def remove(self, employee_id: str):
+        position = self._positions.pop(employee_id, None)
+        if position is None:
+            return
+        document = self._documents[position]
+        # Postings keep the position, the empty text no longer matches anything
+        self._departments[document.get("department")].discard(position)
+        for field in SORT_FIELDS:
+            keys = self._keys[field]
+            order = self._orders[field]
+            del order[bisect_left(order, keys[position], key=keys.__getitem__)]
+        self._documents[position] = None
+        self._texts[position] = ""
+
+    def needs_compaction(self) -> bool:
+        return len(self._documents) > 2 * len(self._positions) + 1000
+
+    def compacted(self) -> "EmployeeIndex":
+        """Copy without the positions of removed employees"""
+        index = EmployeeIndex(self.version)
+        index.load(document for document in self._documents if document is not None)
+        index.sort()
+        return index
+
+    def _matches(self, query: str, members: set | None) -> set:
+        """Positions matching `query`, among `members` unless it is None"""
+        texts = self._texts
+        if len(query) < 3:
+            postings = self._prefixes.get(query, ())
+            check = None
+        # The rarest trigram bounds the candidates, each one is then checked in full
+        elif any(query[i:i + 3] not in self._grams for i in range(len(query) - 2)):
+            return set()
+        else:
+            postings = min((self._grams[query[i:i + 3]] for i in range(len(query) - 2)), key=len)
+            check = query
+        if members is not None:
+            postings = [position for position in postings if position in members]
+        if check is None:
+            return {position for position in postings if texts[position]}
+        return {position for position in postings if check in texts[position]}
+
+    def search(self, query: str = "", department: str | None = None, sort: str = "full_name",
+               descending: bool = False, skip: int = 0, limit: int = 50) -> tuple:
+        """(number of matches, page of matching documents) in `sort` order"""
+        query = query.strip().lower()
+        members = None if department is None else self._departments.get(department, set())
+        candidates = self._matches(query, members) if query else members
+        total = len(self._positions) if candidates is None else len(candidates)
+
+        wanted = skip + limit
+        order = reversed(self._orders[sort]) if descending else iter(self._orders[sort])
+        if candidates is None:
+            return total, [self._documents[position] for position in islice(order, skip, wanted)]
+        # Walk the presorted order while that is cheaper than sorting the matches, a
+        # heap step costs about as much as four to ten walking steps
+        page = []
+        for position in islice(order, 4 * total):
+            if position in candidates:
+                page.append(position)
+                if len(page) == wanted:
+                    break
+        if len(page) < min(wanted, total):
+            keys = self._keys[sort]
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            page = pick(wanted, candidates, key=keys.__getitem__)
+        return total, [self._documents[position] for position in page[skip:]]
+
+_index = None
+_build_lock = asyncio.Lock()
+_rebuild = None
+
+async def build_index(version: int) -> EmployeeIndex:
+    """Read every employee from the repository into a new index"""
+    index = EmployeeIndex(version)
+    batch = []
+    async for document in get_repository().list_employees(after=""):
+        batch.append(document)
+        if len(batch) == 1000:
+            index.load(batch)
+            batch = []
+            # Give other requests a turn while a large directory loads
+            await asyncio.sleep(0)
+    index.load(batch)
+    index.sort()
+    return index
+
+async def rebuild_index(version: int):
+    """Replace the index with one built from the repository, unless this process's own writes moved it past `version` meanwhile"""
+    global _index
+    try:
+        index = await build_index(version)
+    except Exception as e:
+        print(f"✗ Search index rebuild failed: {e}")
+        return
+    if _index.version < index.version:
+        _index = index
+
+async def employee_index() -> EmployeeIndex:
+    """Return the search index, built on first use, rebuilding it in the background after writes by other processes"""
+    global _index, _rebuild
+    version = (await versions.current_versions())["employees"][0]
+    if _index is None:
+        async with _build_lock:
+            if _index is None:
+                _index = await build_index(version)
+    elif _index.version < version and (_rebuild is None or _rebuild.done()):
+        _rebuild = asyncio.create_task(rebuild_index(version))
+    return _index
+
+def employees_added(documents: list) -> EmployeeIndex | None:
+    """Add employees this process just stored, returning the index they went into"""
+    if _index is not None:
+        for document in documents:
+            _index.add(document)
+    return _index
+
+def employee_removed(employee_id: str) -> EmployeeIndex | None:
+    """Drop an employee this process just deleted, returning the index it is gone from"""
+    global _index
+    if _index is not None:
+        _index.remove(employee_id)
+        if _index.needs_compaction():
+            _index = _index.compacted()
+    return _index
+
+def employees_synced(version: int | None, *changed: EmployeeIndex | None):
+    """Record the data version bumped after this process's own write, so it causes no rebuild
+
+    `changed` are the indexes the write was applied to. A rebuild may have replaced
+    them since, from a read that predates the write.
+    """
+    # Only when no other process wrote in between, its changes are not in the index
+    if (_index is not None and version is not None and _index.version == version - 1
+            and all(index is _index for index in changed)):
+        _index.version = version
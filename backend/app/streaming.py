@@ -0,0 +1,36 @@
+import json
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents fetched from Mongo and written to the socket per chunk
+STREAM_BATCH_SIZE = 500
+
+def wants_ndjson(request: Request) -> bool:
+    """Check whether the client opted in to newline-delimited JSON"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def ndjson_response(cursor, batch_size: int = STREAM_BATCH_SIZE, transform=None) -> StreamingResponse:
+    """Stream documents from an async PyMongo cursor as NDJSON without loading the result set.
+
+    `transform`, when given, is applied to every document before it is serialized.
+    """
+    cursor.batch_size(batch_size)
+
+    async def generate():
+        chunk = []
+        try:
+            async for document in cursor:
+                if transform is not None:
+                    document = transform(document)
+                chunk.append(json.dumps(document, default=str))
+                if len(chunk) >= batch_size:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
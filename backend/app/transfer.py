@@ -0,0 +1,199 @@
+"""
+Streaming CSV and NDJSON import and export.
+
+Uploads are read from the request body chunk by chunk, validated a batch at a time
+with a reused pydantic TypeAdapter and written with one unordered insert_many per
+batch, so memory stays bounded by the batch size however large the file is.
+Exports stream straight from a MongoDB cursor.
+"""
+import codecs
+import csv
+import io
+import json
+import time
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from app.streaming import NDJSON_MEDIA_TYPE, STREAM_BATCH_SIZE, ndjson_response
+
+CSV_MEDIA_TYPE = "text/csv"
+
+# Rows validated and inserted per round trip
+IMPORT_BATCH_SIZE = 1000
+
+# Longest accepted record, guards memory against a file without line breaks
+MAX_RECORD_LENGTH = 1024 * 1024
+
+# Row errors listed in the import report, the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+def upload_format(request: Request) -> str:
+    """Pick the parser from the Content-Type of an upload"""
+    content_type = request.headers.get("content-type", "")
+    if CSV_MEDIA_TYPE in content_type:
+        return "csv"
+    if NDJSON_MEDIA_TYPE in content_type or "application/jsonl" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        status_code=415,
+        detail=f"Upload the file as {CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}"
+    )
+
+class ImportReport:
+    """Outcome of an import, with a capped list of rejected rows"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.processed = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": detail})
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "message": f"Imported {self.created} of {self.processed} rows",
+            "processed": self.processed,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_second": round(self.processed / elapsed, 1) if elapsed > 0 else None
+        }
+
+async def read_lines(request: Request):
+    """Yield the lines of the request body as it arrives"""
+    # utf-8-sig drops the byte order mark spreadsheet programs put in front of CSV files
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        if len(pending) > MAX_RECORD_LENGTH:
+            raise HTTPException(status_code=400, detail="Upload contains a line longer than 1 MB")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def read_records(request: Request, upload: str, report: ImportReport):
+    """Yield (row number, dict) for every record, reporting the ones that cannot be parsed"""
+    if upload == "ndjson":
+        row = 0
+        async for line in read_lines(request):
+            if not line.strip():
+                continue
+            row += 1
+            report.processed += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                report.add_error(row, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                report.add_error(row, "Each line must be a JSON object")
+                continue
+            yield row, record
+        return
+
+    header = None
+    row = 0
+    pending = []
+    quotes = 0
+    async for line in read_lines(request):
+        # A quoted field may span lines: a record is complete once its quotes are balanced
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            if sum(len(part) for part in pending) > MAX_RECORD_LENGTH:
+                raise HTTPException(status_code=400, detail="Upload contains an unterminated quoted field")
+            continue
+        text = "\n".join(pending)
+        pending = []
+        quotes = 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        report.processed += 1
+        if len(values) != len(header):
+            report.add_error(row, f"Expected {len(header)} columns, found {len(values)}")
+            continue
+        yield row, dict(zip(header, values))
+    if pending:
+        row += 1
+        report.processed += 1
+        report.add_error(row, "Unterminated quoted field")
+
+async def read_batches(records, size: int = IMPORT_BATCH_SIZE):
+    """Group an async iterator of records into lists of up to `size`"""
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def validate_batch(adapter: TypeAdapter, batch: list, report: ImportReport) -> list:
+    """Validate (row, dict) pairs in one call, returning (row, model) for the valid ones"""
+    try:
+        models = adapter.validate_python([record for _, record in batch])
+    except ValidationError as e:
+        rejected = {}
+        for error in e.errors():
+            index, *field = error["loc"]
+            location = ".".join(str(part) for part in field)
+            rejected.setdefault(index, f"{location}: {error['msg']}" if location else error["msg"])
+        for index, detail in sorted(rejected.items()):
+            report.add_error(batch[index][0], detail)
+        batch = [item for i, item in enumerate(batch) if i not in rejected]
+        if not batch:
+            return []
+        # Rows are validated independently, so the remaining ones now pass
+        models = adapter.validate_python([record for _, record in batch])
+    return [(row, model) for (row, _), model in zip(batch, models)]
+
+def export_response(cursor, export_format: str, fields: list, filename: str, transform=None) -> StreamingResponse:
+    """Stream a cursor as a CSV or NDJSON download"""
+    if export_format == "ndjson":
+        response = ndjson_response(cursor, transform=transform)
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}.ndjson"'
+        return response
+
+    cursor.batch_size(STREAM_BATCH_SIZE)
+
+    async def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        rows = 0
+        try:
+            async for document in cursor:
+                writer.writerow(transform(document) if transform is not None else document)
+                rows += 1
+                if rows % STREAM_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=CSV_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+    )
@@ -0,0 +1,155 @@
+"""
+Data versions for conditional GETs.
+
+Every write route bumps a per-collection sequence number stored in the counters
+collection. Read routes declare which collections they depend on with
+`Depends(versioned(...))`; the dependency builds an ETag from those versions and
+answers a matching If-None-Match with 304 before the route touches MongoDB.
+
+Each process keeps the versions in memory and re-reads them at most every
+DATA_VERSION_TTL seconds, so a write made by another server process is noticed
+within that time, and a write made by this one immediately. With the in-memory
+storage backend the versions only live in this process.
+"""
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import asyncio
+import os
+import time
+from fastapi import HTTPException, Request
+from app.database import COUNTER_COLLECTION, get_database
+from app.breaker import is_connection_error, mongo_breaker
+from app.repository import uses_mongo
+from app.streaming import wants_ndjson
+
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "2"))
+
+TRACKED_COLLECTIONS = ("employees", "attendance")
+
+# name -> (sequence, last modified), and when they were last read from MongoDB
+_versions = {}
+_loaded_at = None
+_refresh_lock = asyncio.Lock()
+
+def _counter_id(name: str) -> str:
+    return f"data_version:{name}"
+
+def _remember(name: str, sequence: int, updated_at):
+    # A refresh racing a local bump must not move the version backwards
+    if sequence >= _versions.get(name, (0, None))[0]:
+        _versions[name] = (sequence, updated_at)
+
+async def bump(name: str) -> int | None:
+    """Record that a write route changed `name`, returning the new sequence number"""
+    if not uses_mongo():
+        sequence = _versions.get(name, (0, None))[0] + 1
+        _remember(name, sequence, datetime.now(timezone.utc))
+        return sequence
+    db = get_database()
+    if db is None:
+        return None
+    from pymongo import ReturnDocument
+    counter = await db[COUNTER_COLLECTION].find_one_and_update(
+        {"_id": _counter_id(name)},
+        {"$inc": {"seq": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _remember(name, counter["seq"], counter["updated_at"])
+    return counter["seq"]
+
+async def current_versions() -> dict:
+    """Return name -> (sequence, last modified) for every tracked collection"""
+    global _loaded_at
+    # Versions known to this process, also used while MongoDB is unreachable
+    if not uses_mongo() or mongo_breaker.state != "closed":
+        return {name: _versions.get(name, (0, None)) for name in TRACKED_COLLECTIONS}
+    if _loaded_at is None or time.monotonic() - _loaded_at >= DATA_VERSION_TTL:
+        async with _refresh_lock:
+            # Another request may have refreshed while this one waited
+            if _loaded_at is None or time.monotonic() - _loaded_at >= DATA_VERSION_TTL:
+                counters = get_database()[COUNTER_COLLECTION]
+                try:
+                    async for counter in counters.find({"_id": {"$in": [_counter_id(n) for n in TRACKED_COLLECTIONS]}}):
+                        _remember(counter["_id"].split(":", 1)[1], counter["seq"], counter.get("updated_at"))
+                except Exception as e:
+                    if not is_connection_error(e):
+                        raise
+                    mongo_breaker.record_failure(e)
+                # Also after a failure, so requests queued on the lock use the versions already known
+                _loaded_at = time.monotonic()
+    return {name: _versions.get(name, (0, None)) for name in TRACKED_COLLECTIONS}
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    def opaque(tag):
+        return tag.strip().removeprefix("W/")
+    candidates = [tag for tag in if_none_match.split(",") if tag.strip()]
+    return any(tag.strip() == "*" or opaque(tag) == opaque(etag) for tag in candidates)
+
+def versioned(*names: str, daily: bool = False):
+    """Dependency making a GET route conditional on the versions of `names`.
+
+    `daily` routes also change when the date does, such as "today" on the dashboard.
+    """
+    async def check_versions(request: Request):
+        if uses_mongo() and get_database() is None:
+            # The route answers 503
+            return
+        check_conditional(request, await current_versions(), names, daily)
+    return check_versions
+
+def check_conditional(request: Request, versions: dict, names: tuple, daily: bool = False):
+    """Answer 304 when the request's validators match `versions` of `names`, else queue them for the response.
+
+    For routes whose data is as of versions of their own rather than the current ones.
+    """
+    parts = [f"{name}.{versions[name][0]}" for name in names]
+    if daily:
+        parts.append(date.today().isoformat())
+    parts.append("ndjson" if wants_ndjson(request) else "json")
+    etag = f'W/"{"-".join(parts)}"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    modified = [versions[name][1] for name in names if versions[name][1] is not None]
+    last_modified = max(modified).replace(tzinfo=timezone.utc, microsecond=0) if modified else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+    elif last_modified is not None and not daily and request.headers.get("if-modified-since"):
+        try:
+            if last_modified <= parsedate_to_datetime(request.headers["if-modified-since"]):
+                raise HTTPException(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    # Applied to the 200 response by ValidatorHeadersMiddleware, streamed ones included
+    request.state.validators = headers
+
+class ValidatorHeadersMiddleware:
+    """Pure ASGI middleware adding the validators a versioned route computed to its 200 response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_validators(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                validators = scope.get("state", {}).get("validators")
+                if validators:
+                    present = {name.lower() for name, _ in message.get("headers", [])}
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in validators.items() if name.lower().encode("latin-1") not in present
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
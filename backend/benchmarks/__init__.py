@@ -0,0 +1,13 @@
+"""
+Performance benchmarks for the HRMS Lite backend, run from the backend directory:
+
+    python -m benchmarks.datagen             load synthetic employees and attendance
+    python -m benchmarks.suite               drive every route, write a JSON report
+    python -m benchmarks.compare A.json B.json
+    python -m benchmarks.employee_dashboard  per-employee queries vs. one aggregation
+    python -m benchmarks.concurrency         many concurrent clients against a running server
+    python -m benchmarks.cold_start          import-to-first-response time of api/index.py
+    python -m benchmarks.serialization       response encoding and compression cost per payload
+
+Extra dependencies are listed in benchmarks/requirements.txt.
+"""
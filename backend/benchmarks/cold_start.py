@@ -0,0 +1,65 @@
+"""
+Cold start benchmark for the Vercel entry point (api/index.py).
+
+Each run starts a fresh interpreter, imports api/index.py and serves one request
+in-process, the same work a serverless cold start does before its first response.
+
+Usage (from the backend directory):
+    python -m benchmarks.cold_start --runs 10 --path /employees/departments
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from api.index import app
+imported = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as http:
+        response = await http.get({path!r})
+    return response.status_code
+
+status = asyncio.run(first_request())
+responded = time.perf_counter()
+print(json.dumps({{
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - imported) * 1000,
+    "total_ms": (responded - started) * 1000
+}}))
+"""
+
+
+def run_once(path: str) -> dict:
+    code = PROBE.format(root=REPO_ROOT, path=path)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/", help="Route for the first request")
+    args = parser.parse_args()
+
+    samples = [run_once(args.path) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts, first request GET {args.path} -> {samples[-1]['status']}")
+    for key in ("import_ms", "first_response_ms", "total_ms"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:<18} median {statistics.median(values):>8.1f}   min {min(values):>8.1f}   max {max(values):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare two benchmark suite reports endpoint by endpoint.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+
+Exits with status 1 when any endpoint's p95 latency regressed by more than --threshold
+percent, or its round trips per request went up, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+
+def change(before: float, after: float) -> float:
+    """Percentage change from before to after"""
+    if before == 0:
+        return 0.0 if after == 0 else float("inf")
+    return (after - before) / before * 100
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 10.0) -> list:
+    """Print a comparison table and return the names of endpoints that regressed"""
+    print(f"\nbaseline {baseline['meta'].get('commit', '?')} -> current {current['meta'].get('commit', '?')}")
+    print(f"{'endpoint':<26} | {'p50 ms':>17} | {'p95 ms':>17} | {'p95 change':>10} | {'round trips':>13}")
+    print("-" * 96)
+
+    regressions = []
+    for name, after in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<26} | {'new':>17} |")
+            continue
+        p95_change = change(before["p95_ms"], after["p95_ms"])
+        trips_before = before["db_round_trips_per_request"]
+        trips_after = after["db_round_trips_per_request"]
+        flag = ""
+        if p95_change > threshold or trips_after > trips_before:
+            regressions.append(name)
+            flag = "  <-- regression"
+        print(f"{name:<26} | {before['p50_ms']:>7.2f} -> {after['p50_ms']:>6.2f} | "
+              f"{before['p95_ms']:>7.2f} -> {after['p95_ms']:>6.2f} | {p95_change:>+9.1f}% | "
+              f"{trips_before:>5.1f} -> {trips_after:>5.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 increase in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_reports(baseline, current, args.threshold)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
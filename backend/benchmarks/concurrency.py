@@ -0,0 +1,93 @@
+"""
+Concurrency load test: many clients mixing cheap requests with slow dashboard queries.
+
+Start the server from each build you want to compare (for example the last sync
+commit on port 8001 and the current async code on port 8000), then run:
+    python -m benchmarks.concurrency --url http://127.0.0.1:8001 --url http://127.0.0.1:8000 --clients 500
+
+Start each server with ADMISSION_ENABLED=false: every client connects from the
+same address, so per-client rate limits would otherwise answer most requests
+with 429, which are counted as errors.
+
+Every client loops over the endpoint mix for the given duration. The report shows
+throughput and p50/p95/p99 latency per endpoint, so starvation of cheap requests
+behind slow ones is visible directly.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.monitoring import percentile
+
+# (path, weight) - one slow aggregation for every few cheap reads
+ENDPOINT_MIX = [
+    ("/", 4),
+    ("/employees/departments", 4),
+    ("/employees/?limit=50", 2),
+    ("/dashboard/stats", 1),
+    ("/dashboard/employees", 1),
+]
+
+
+async def client_loop(http: httpx.AsyncClient, schedule: list, deadline: float, latencies: dict, errors: dict):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = schedule[i % len(schedule)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await http.get(path)
+            if response.status_code >= 500 or response.status_code == 429:
+                errors[path] += 1
+                continue
+        except httpx.HTTPError:
+            errors[path] += 1
+            continue
+        latencies[path].append((time.perf_counter() - started) * 1000)
+
+
+async def run(url: str, clients: int, duration: float) -> dict:
+    schedule = [path for path, weight in ENDPOINT_MIX for _ in range(weight)]
+    latencies = {path: [] for path, _ in ENDPOINT_MIX}
+    errors = {path: 0 for path, _ in ENDPOINT_MIX}
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            # Offset each client so they do not all hit the same endpoint in lockstep
+            client_loop(http, schedule[i % len(schedule):] + schedule[:i % len(schedule)], deadline, latencies, errors)
+            for i in range(clients)
+        ])
+
+    return {"latencies": latencies, "errors": errors, "duration": duration}
+
+
+def report(url: str, result: dict):
+    total = sum(len(values) for values in result["latencies"].values())
+    print(f"\n{url}  -  {total / result['duration']:.1f} req/s overall")
+    print(f"{'endpoint':<26} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+    print("-" * 78)
+    for path, values in result["latencies"].items():
+        print(
+            f"{path:<26} | {len(values) / result['duration']:>8.1f} | {statistics.median(values) if values else 0:>8.1f} | "
+            f"{percentile(values, 95):>8.1f} | {percentile(values, 99):>8.1f} | {result['errors'][path]:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", help="Server to test, repeat to compare builds")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per target")
+    args = parser.parse_args()
+
+    for url in args.url or ["http://127.0.0.1:8000"]:
+        report(url, asyncio.run(run(url, args.clients, args.duration)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic HRMS data: employees spread over the predefined departments and daily
+weekday attendance going back a configurable number of days.
+
+Everything is generated lazily and written in batches, so large datasets
+(for example 10k employees x 3 years, about 7.8M attendance records) load
+without holding them in memory.
+
+Usage (from the backend directory, with a local mongod running):
+    python -m benchmarks.datagen --employees 10000 --days 1095
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from pymongo import MongoClient
+
+from app.database import INDEXES
+from app.dates import to_stored
+from app.bitmaps import BITMAP_COLLECTION, bitmap_pipeline
+from app.rollups import ROLLUP_COLLECTION, scope_pipelines
+from app.routes.employees import PREDEFINED_DEPARTMENTS, employee_document
+
+BENCH_DB = "hrms_lite_bench"
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Alex", "Amara", "Ananya", "Arjun", "Carlos", "Chen", "Daniel", "Divya",
+    "Elena", "Fatima", "Grace", "Hana", "Ishaan", "James", "Kavya", "Liam", "Maria", "Meera",
+    "Mohammed", "Nina", "Olivia", "Priya", "Rahul", "Rohan", "Sara", "Sofia", "Tanvi", "Vikram",
+    "Wei", "Yusuf", "Zara", "Noah", "Emma", "Lucas", "Aisha", "Kenji", "Leila", "Omar"
+]
+LAST_NAMES = [
+    "Sharma", "Patel", "Singh", "Kumar", "Gupta", "Iyer", "Reddy", "Nair", "Shukla", "Verma",
+    "Smith", "Johnson", "Garcia", "Martinez", "Brown", "Lee", "Wang", "Kim", "Nguyen", "Khan",
+    "Ali", "Silva", "Rossi", "Muller", "Tanaka", "Cohen", "Okafor", "Hassan", "Novak", "Costa"
+]
+
+# Larger departments are more likely, as in a typical company
+DEPARTMENT_WEIGHTS = {
+    "Engineering": 8, "Sales": 5, "Customer Support": 5, "Operations": 4, "Marketing": 3,
+    "Product Management": 2, "Research & Development": 2, "IT": 2, "Finance": 2,
+    "Human Resources": 1, "Administration": 1, "Legal": 1
+}
+
+
+def batched(iterable, size: int):
+    """Yield lists of up to `size` items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def generate_employees(count: int, seed: int = 0):
+    """Yield employee documents with unique IDs, emails and phone numbers"""
+    rng = random.Random(seed)
+    weights = [DEPARTMENT_WEIGHTS.get(name, 1) for name in PREDEFINED_DEPARTMENTS]
+    per_prefix = {}
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        # Same shape as generate_unique_employee_id: name initials + 4 digits
+        prefix = (first[:2] + last[:2]).upper()
+        per_prefix[prefix] = per_prefix.get(prefix, 0) + 1
+        yield employee_document({
+            "employee_id": f"{prefix}{per_prefix[prefix]:04d}",
+            "full_name": f"{first} {last}",
+            "email": f"{first}.{last}.{i}@company.com",
+            "phone": f"{7000000000 + i}",
+            "department": rng.choices(PREDEFINED_DEPARTMENTS, weights=weights)[0]
+        })
+
+
+def generate_attendance(employee_ids: list, days: int, seed: int = 0, end: date | None = None):
+    """Yield one attendance record per employee per weekday over the last `days` days"""
+    rng = random.Random(seed + 1)
+    end = end or date.today()
+    # Each employee has their own attendance habit
+    presence = {employee_id: rng.uniform(0.8, 0.99) for employee_id in employee_ids}
+    for offset in range(days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        stored_day = to_stored(day)
+        for employee_id in employee_ids:
+            yield {
+                "employee_id": employee_id,
+                "date": stored_day,
+                "status": "Present" if rng.random() < presence[employee_id] else "Absent"
+            }
+
+
+def build_rollups(db):
+    """Recompute the attendance rollups the dashboards read and the bitmaps reports read"""
+    db[ROLLUP_COLLECTION].drop()
+    for pipeline in scope_pipelines():
+        db.attendance.aggregate(pipeline + [{"$merge": {"into": ROLLUP_COLLECTION}}])
+    db[BITMAP_COLLECTION].drop()
+    db.attendance.aggregate(bitmap_pipeline() + [{"$merge": {"into": BITMAP_COLLECTION}}])
+
+
+def load_dataset(db, employees: int, days: int, seed: int = 0, batch_size: int = 10000) -> dict:
+    """Replace the employees and attendance in `db` with a synthetic dataset"""
+    started = time.perf_counter()
+    db.employees.drop()
+    db.attendance.drop()
+
+    employee_ids = []
+    for batch in batched(generate_employees(employees, seed), batch_size):
+        db.employees.insert_many(batch, ordered=False)
+        employee_ids.extend(doc["employee_id"] for doc in batch)
+
+    attendance_count = 0
+    for batch in batched(generate_attendance(employee_ids, days, seed), batch_size):
+        db.attendance.insert_many(batch, ordered=False)
+        attendance_count += len(batch)
+
+    # Building indexes after the load is much faster than maintaining them per insert
+    for collection_name, keys, options in INDEXES:
+        db[collection_name].create_index(keys, **options)
+    build_rollups(db)
+
+    return {
+        "employees": len(employee_ids),
+        "attendance": attendance_count,
+        "load_seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCH_MONGODB_URL", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--database", default=BENCH_DB)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365, help="Days of attendance history")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with MongoClient(args.url) as client:
+        summary = load_dataset(client[args.database], args.employees, args.days, args.seed)
+    print(f"✓ Loaded {summary['employees']} employees and {summary['attendance']} attendance records "
+          f"into {args.database} in {summary['load_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark for /dashboard/employees: per-employee queries vs. a single aggregation.
+
+Seeds a scratch database with synthetic employees and attendance, then measures
+database round trips and latency of both strategies as the employee count grows.
+
+Usage (from the backend directory, with a local mongod running):
+    python -m benchmarks.employee_dashboard --sizes 100 500 1000 2000 --days 30
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from app.dates import date_equals, date_range
+from app.mongo_repository import build_employee_summary_pipeline
+from benchmarks.datagen import BENCH_DB, load_dataset
+from benchmarks.monitoring import CommandCounter
+
+
+def per_employee_queries(db):
+    """The previous implementation: three queries per employee"""
+    today = datetime.now().date()
+    seven_days_ago = today - timedelta(days=7)
+    summaries = []
+    for emp in db.employees.find({}, {"_id": 0}):
+        emp_id = emp["employee_id"]
+        all_attendance = list(db.attendance.find({"employee_id": emp_id}, {"_id": 0}))
+        present_count = len([r for r in all_attendance if r.get("status") == "Present"])
+        today_rec = db.attendance.find_one({"employee_id": emp_id, **date_equals(today)}, {"_id": 0})
+        recent = list(db.attendance.find(
+            {"employee_id": emp_id, **date_range(seven_days_ago)},
+            {"_id": 0}
+        ).sort("date", -1).limit(5))
+        summaries.append((emp_id, len(all_attendance), present_count, today_rec, recent))
+    return summaries
+
+
+def single_aggregation(db):
+    """The current implementation: one aggregation over employees, rollups and attendance"""
+    today = datetime.now().date()
+    seven_days_ago = today - timedelta(days=7)
+    return list(db.employees.aggregate(build_employee_summary_pipeline(today.isoformat(), seven_days_ago)))
+
+
+def measure(db, counter, fn, repeat: int):
+    """Return (round trips per call, best latency in ms)"""
+    best = float("inf")
+    trips = 0
+    for _ in range(repeat):
+        counter.count = 0
+        start = time.perf_counter()
+        fn(db)
+        best = min(best, time.perf_counter() - start)
+        trips = counter.count
+    return trips, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("BENCH_MONGODB_URL", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--days", type=int, default=30, help="Days of attendance per employee")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = MongoClient(args.url, event_listeners=[counter])
+    db = client[BENCH_DB]
+
+    print(f"{'employees':>10} | {'old trips':>10} | {'old ms':>10} | {'new trips':>10} | {'new ms':>10} | {'speedup':>8}")
+    print("-" * 72)
+    for size in args.sizes:
+        load_dataset(db, size, args.days)
+        old_trips, old_ms = measure(db, counter, per_employee_queries, args.repeat)
+        new_trips, new_ms = measure(db, counter, single_aggregation, args.repeat)
+        print(f"{size:>10} | {old_trips:>10} | {old_ms:>10.1f} | {new_trips:>10} | {new_ms:>10.1f} | {old_ms / new_ms:>7.1f}x")
+
+    client.drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Helpers shared by the benchmarks: round-trip counting and latency percentiles."""
+from pymongo.monitoring import CommandListener
+
+
+class CommandCounter(CommandListener):
+    """Count every command sent to the server (one command = one round trip)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile, 0 for an empty sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
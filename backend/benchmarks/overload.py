@@ -0,0 +1,135 @@
+"""
+Overload test: attendance writes while a few clients saturate the dashboard.
+
+Start the server, ideally against a scratch database since every write marks a
+new attendance record, then run:
+    python -m benchmarks.overload --url http://127.0.0.1:8000 --readers 200 --duration 30
+
+The test runs twice, first with the writers alone, then with --readers clients
+looping on /dashboard/employees as fast as they can. Writers send POST /attendance/
+at a fixed pace and readers share --reader-addresses client addresses, given to the
+server as X-Forwarded-For (honoured from localhost, see start_server.py). With
+admission control on, write p99 should stay close to the first run while the
+readers get 429/503 answers; restart the server with ADMISSION_ENABLED=false to
+compare.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.monitoring import percentile
+
+DASHBOARD_PATH = "/dashboard/employees"
+
+
+class Phase:
+    def __init__(self):
+        self.write_latencies = []
+        self.write_statuses = Counter()
+        self.read_latencies = []
+        self.read_statuses = Counter()
+
+
+def attendance_record(employee_ids: list, k: int) -> dict:
+    """k-th record of the run, a distinct (employee, day) pair going back from yesterday"""
+    day = date.today() - timedelta(days=1 + k // len(employee_ids))
+    return {"employee_id": employee_ids[k % len(employee_ids)], "date": day.isoformat(), "status": "Present"}
+
+
+async def writer(http: httpx.AsyncClient, address: str, records, rate: float, deadline: float, phase: Phase):
+    # Paced rather than closed-loop, so slow answers do not lower the offered load
+    interval = 1 / rate
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        next_at += interval
+        started = time.perf_counter()
+        try:
+            response = await http.post("/attendance/", json=next(records), headers={"X-Forwarded-For": address})
+        except httpx.HTTPError:
+            phase.write_statuses["error"] += 1
+            continue
+        phase.write_statuses[response.status_code] += 1
+        # A 409 is a record marked by an earlier run, still a full trip through the write path
+        if response.status_code < 500 and response.status_code != 429:
+            phase.write_latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def reader(http: httpx.AsyncClient, address: str, deadline: float, phase: Phase):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await http.get(DASHBOARD_PATH, headers={"X-Forwarded-For": address})
+        except httpx.HTTPError:
+            phase.read_statuses["error"] += 1
+            continue
+        phase.read_statuses[response.status_code] += 1
+        if response.status_code == 200:
+            phase.read_latencies.append((time.perf_counter() - started) * 1000)
+        elif response.status_code in (429, 503):
+            # Honour Retry-After like a well-behaved client, capped so the pressure stays on
+            await asyncio.sleep(min(float(response.headers.get("retry-after", "1")), 1.0))
+
+
+async def run_phase(http: httpx.AsyncClient, args, employee_ids: list, offset: int, readers: int) -> Phase:
+    phase = Phase()
+    counter = iter(range(offset, offset + 10**9))
+    records = (attendance_record(employee_ids, k) for k in counter)
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *[writer(http, f"10.1.{i // 250}.{i % 250 + 1}", records, args.write_rate, deadline, phase) for i in range(args.writers)],
+        *[reader(http, f"10.2.0.{i % args.reader_addresses + 1}", deadline, phase) for i in range(readers)]
+    )
+    return phase
+
+
+def latency_row(label: str, values: list, statuses: Counter, duration: float) -> str:
+    codes = ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items(), key=str))
+    return (
+        f"{label:<28} | {len(values) / duration:>7.1f} | {statistics.median(values) if values else 0:>7.1f} | "
+        f"{percentile(values, 95):>7.1f} | {percentile(values, 99):>7.1f} | {codes}"
+    )
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.writers + args.readers, max_keepalive_connections=args.writers + args.readers)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as http:
+        employees = (await http.get("/employees/", params={"limit": 1000})).json()
+        employee_ids = [employee["employee_id"] for employee in employees]
+        if not employee_ids:
+            raise SystemExit("The server has no employees to mark attendance for")
+
+        # Records continue across phases so every write is new; --offset skips those of earlier runs
+        baseline = await run_phase(http, args, employee_ids, args.offset, 0)
+        written = sum(baseline.write_statuses.values())
+        overloaded = await run_phase(http, args, employee_ids, args.offset + written, args.readers)
+
+    print(f"\n{args.url}  -  {args.writers} writers at {args.write_rate:g} req/s, "
+          f"{args.readers} dashboard readers from {args.reader_addresses} addresses")
+    print(f"{'run':<28} | {'ok/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | statuses")
+    print("-" * 96)
+    print(latency_row("POST /attendance/ alone", baseline.write_latencies, baseline.write_statuses, args.duration))
+    print(latency_row("POST /attendance/ overload", overloaded.write_latencies, overloaded.write_statuses, args.duration))
+    print(latency_row(f"GET {DASHBOARD_PATH}", overloaded.read_latencies, overloaded.read_statuses, args.duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--writers", type=int, default=20, help="Clients marking attendance, one address each")
+    parser.add_argument("--write-rate", type=float, default=2, help="Requests per second per writer")
+    parser.add_argument("--readers", type=int, default=200, help="Clients looping on the dashboard")
+    parser.add_argument("--reader-addresses", type=int, default=5, help="Addresses the readers share")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per run")
+    parser.add_argument("--offset", type=int, default=0, help="Records to skip, to run again against the same data")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
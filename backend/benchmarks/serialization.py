@@ -0,0 +1,118 @@
+"""
+Serialization microbenchmark for the large list responses.
+
+Builds payloads shaped like GET /employees/, GET /attendance/{employee_id} and
+GET /dashboard/employees, then measures CPU time and bytes per response for
+FastAPI's default path (jsonable_encoder + json) against orjson, and the size and
+CPU cost of gzip and brotli on top. No database is needed.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization --employees 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+import zlib
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli_module
+from benchmarks.datagen import generate_attendance, generate_employees
+
+
+def payloads(employees: int, days: int) -> dict:
+    staff = [
+        {key: value for key, value in doc.items() if key != "email_lower"}
+        for doc in generate_employees(employees)
+    ]
+    history = [
+        {**record, "date": record["date"].date().isoformat()}
+        for record in generate_attendance([staff[0]["employee_id"]], days)
+    ]
+    today = date.today()
+    dashboard = {
+        "total_employees": len(staff),
+        "skip": 0,
+        "limit": None,
+        "employees": [
+            {
+                **employee,
+                "total_records": 250,
+                "present_count": 230,
+                "absent_count": 20,
+                "attendance_rate": 92.0,
+                "today_status": "Present",
+                "recent_attendance": [
+                    {"employee_id": employee["employee_id"], "date": (today - timedelta(days=d)).isoformat(),
+                     "status": "Present"}
+                    for d in range(5)
+                ]
+            }
+            for employee in staff
+        ]
+    }
+    return {
+        "list_employees": staff,
+        "get_attendance": {"records": history, "total_present_days": len(history), "next_after": None},
+        "dashboard_employees": dashboard
+    }
+
+
+def cpu_ms(fn, repeat: int):
+    """Best CPU time of `repeat` calls in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - started)
+    return best * 1000, result
+
+
+def measure(content, repeat: int) -> dict:
+    before_ms, before = cpu_ms(lambda: JSONResponse(jsonable_encoder(content)).body, repeat)
+    after_ms, after = cpu_ms(lambda: ORJSONResponse(content).body, repeat)
+    gzip_ms, gzipped = cpu_ms(lambda: zlib.compress(after, GZIP_LEVEL, 31), repeat)
+    row = {
+        "default_ms": round(before_ms, 2),
+        "orjson_ms": round(after_ms, 2),
+        "speedup": round(before_ms / after_ms, 1) if after_ms else None,
+        "bytes": len(after),
+        "default_bytes": len(before),
+        "gzip_bytes": len(gzipped),
+        "gzip_ms": round(gzip_ms, 2)
+    }
+    brotli = brotli_module()
+    if brotli is not None:
+        brotli_ms, compressed = cpu_ms(lambda: brotli.compress(after, quality=BROTLI_QUALITY), repeat)
+        row.update({"br_bytes": len(compressed), "br_ms": round(brotli_ms, 2)})
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=1095, help="Attendance history of the single-employee payload")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {name: measure(content, args.repeat) for name, content in payloads(args.employees, args.days).items()}
+
+    print(f"{'response':<20} | {'default ms':>10} | {'orjson ms':>9} | {'speedup':>7} | {'bytes':>10} | "
+          f"{'gzip bytes':>10} | {'gzip ms':>7} | {'br bytes':>10} | {'br ms':>7}")
+    print("-" * 114)
+    for name, row in results.items():
+        print(f"{name:<20} | {row['default_ms']:>10.2f} | {row['orjson_ms']:>9.2f} | {row['speedup']:>6.1f}x | "
+              f"{row['bytes']:>10} | {row['gzip_bytes']:>10} | {row['gzip_ms']:>7.2f} | "
+              f"{row.get('br_bytes', '-'):>10} | {row.get('br_ms', '-'):>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
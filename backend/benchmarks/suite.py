@@ -0,0 +1,325 @@
+"""
+End-to-end benchmark suite: drives every route through the FastAPI app in-process
+against a MongoDB loaded with synthetic data, and writes a machine-readable report.
+
+Usage (from the backend directory, with a local mongod running):
+    python -m benchmarks.suite --employees 10000 --days 1095 --iterations 50
+    python -m benchmarks.suite --skip-load --output results/after.json --baseline results/before.json
+    python -m benchmarks.suite --backend memory --employees 10000 --days 365
+
+With `--backend memory` the same dataset is loaded into the in-memory storage
+backend instead, no mongod needed.
+
+For every endpoint the report has p50/p95/p99/mean latency, throughput and the
+average number of MongoDB round trips per request. The dashboard stats cache and
+admission control are disabled so every request measures the real computation;
+a run in which any request is still answered 429 fails without a report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+from pymongo import MongoClient
+
+from app.bitmaps import BITMAP_COLLECTION
+from app.rollups import ROLLUP_COLLECTION
+from benchmarks.datagen import BENCH_DB, build_rollups, generate_attendance, generate_employees, load_dataset
+from benchmarks.monitoring import CommandCounter, percentile
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Employees created by the write scenarios, removed again after the run
+BENCH_PREFIX = "BNCH"
+
+
+class Context:
+    """Sample data the scenarios draw request parameters from"""
+
+    def __init__(self, employee_ids: list, seed: int):
+        self.employee_ids = employee_ids
+        self.rng = random.Random(seed)
+        self.today = date.today().isoformat()
+        self.month_ago = (date.today() - timedelta(days=30)).isoformat()
+        self.quarter_ago = (date.today() - timedelta(days=91)).isoformat()
+
+    def existing_id(self) -> str:
+        return self.rng.choice(self.employee_ids)
+
+    @staticmethod
+    def new_id(i: int) -> str:
+        return f"{BENCH_PREFIX}{i:06d}"
+
+
+def new_employee(ctx: Context, i: int) -> dict:
+    return {
+        "employee_id": ctx.new_id(i),
+        "full_name": f"Bench Employee {i}",
+        "email": f"bench.{i}@benchmark.example",
+        "phone": f"{6000000000 + i}",
+        "department": "Engineering"
+    }
+
+
+def bulk_records(ctx: Context, i: int) -> dict:
+    # 100 past days for the employee created in iteration i, distinct from today's record
+    start = date.today() - timedelta(days=1)
+    return {"records": [
+        {"employee_id": ctx.new_id(i), "date": (start - timedelta(days=d)).isoformat(), "status": "Present"}
+        for d in range(100)
+    ]}
+
+
+# (name, method, path(ctx, i), body(ctx, i) or None, extra headers, iteration cap)
+# Order matters: write scenarios build on the employees created before them.
+SCENARIOS = [
+    ("root", "GET", lambda ctx, i: "/", None, {}, None),
+    ("departments", "GET", lambda ctx, i: "/employees/departments", None, {}, None),
+    ("generate_id", "POST", lambda ctx, i: "/employees/generate-id",
+     lambda ctx, i: {"full_name": "Priya Sharma"}, {}, None),
+    ("generate_ids", "POST", lambda ctx, i: "/employees/generate-ids",
+     lambda ctx, i: {"full_names": [f"Priya Sharma {n}" for n in range(100)]}, {}, None),
+    ("list_employees", "GET", lambda ctx, i: "/employees/", None, {}, 10),
+    ("list_employees_page", "GET", lambda ctx, i: f"/employees/?limit=100&after={ctx.existing_id()}", None, {}, None),
+    ("list_employees_ndjson", "GET", lambda ctx, i: "/employees/", None, {"Accept": "application/x-ndjson"}, 10),
+    ("add_employee", "POST", lambda ctx, i: "/employees/", new_employee, {}, None),
+    ("mark_attendance", "POST", lambda ctx, i: "/attendance/",
+     lambda ctx, i: {"employee_id": ctx.new_id(i), "date": ctx.today, "status": "Present"}, {}, None),
+    ("update_attendance", "PUT", lambda ctx, i: f"/attendance/{ctx.new_id(i)}/{ctx.today}",
+     lambda ctx, i: {"status": "Absent"}, {}, None),
+    ("mark_attendance_bulk", "POST", lambda ctx, i: "/attendance/bulk", bulk_records, {}, None),
+    ("get_attendance", "GET", lambda ctx, i: f"/attendance/{ctx.existing_id()}", None, {}, None),
+    ("get_attendance_page", "GET", lambda ctx, i: f"/attendance/{ctx.existing_id()}?limit=30", None, {}, None),
+    ("get_attendance_quarter", "GET",
+     lambda ctx, i: f"/attendance/{ctx.existing_id()}?from={ctx.quarter_ago}&to={ctx.today}", None, {}, None),
+    ("attendance_range_page", "GET",
+     lambda ctx, i: f"/attendance/?from={ctx.month_ago}&to={ctx.today}&limit=1000", None, {}, None),
+    ("dashboard_stats", "GET", lambda ctx, i: "/dashboard/stats", None, {}, None),
+    ("dashboard_employees", "GET", lambda ctx, i: "/dashboard/employees", None, {}, 10),
+    ("dashboard_employees_page", "GET", lambda ctx, i: "/dashboard/employees?limit=50", None, {}, None),
+    ("attendance_matrix", "GET", lambda ctx, i: f"/reports/attendance-matrix?month={ctx.today[:7]}", None, {}, None),
+    ("dashboard_test", "GET", lambda ctx, i: "/dashboard/test", None, {}, None),
+    ("delete_employee", "DELETE", lambda ctx, i: f"/employees/{ctx.new_id(i)}", None, {}, None),
+]
+
+
+async def run_scenario(http, counter: CommandCounter, ctx: Context, scenario, iterations: int, concurrency: int) -> dict:
+    name, method, path, body, headers, cap = scenario
+    count = min(iterations, cap) if cap else iterations
+    latencies = []
+    errors = 0
+    rate_limited = 0
+    next_index = iter(range(count))
+
+    async def worker():
+        nonlocal errors, rate_limited
+        for i in next_index:
+            started = time.perf_counter()
+            response = await http.request(
+                method, path(ctx, i), json=body(ctx, i) if body else None, headers=headers
+            )
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+            if response.status_code == 429:
+                rate_limited += 1
+
+    counter.count = 0
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "method": method,
+        "path": path(ctx, 0),
+        "requests": count,
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "db_round_trips_per_request": round(counter.count / count, 2) if count else 0.0
+    }
+
+
+async def run_suite(app, counter: CommandCounter, ctx: Context, iterations: int, concurrency: int, only: list) -> dict:
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as http:
+        for scenario in SCENARIOS:
+            if only and scenario[0] not in only:
+                continue
+            results[scenario[0]] = await run_scenario(http, counter, ctx, scenario, iterations, concurrency)
+            row = results[scenario[0]]
+            print(f"{scenario[0]:<26} p50 {row['p50_ms']:>9.2f} ms  p95 {row['p95_ms']:>9.2f} ms  "
+                  f"p99 {row['p99_ms']:>9.2f} ms  {row['throughput_rps']:>8.1f} req/s  "
+                  f"{row['db_round_trips_per_request']:>6.1f} trips  {row['errors']} errors")
+    return results
+
+
+def check_not_rate_limited(results: dict):
+    """Refuse a report whose latencies partly measure 429 answers from admission control"""
+    limited = {name: row["rate_limited"] for name, row in results.items() if row["rate_limited"]}
+    if limited:
+        raise SystemExit(f"✗ Requests were rate limited, the results are not comparable: {limited}")
+
+
+def import_app():
+    """Import the app with the dashboard cache and admission control off, so every request does the real work"""
+    os.environ["DASHBOARD_CACHE_TTL"] = "0"
+    os.environ["ADMISSION_ENABLED"] = "false"
+    from app import admission
+    from app.cache import dashboard_cache
+    from app.main import app
+
+    # Also when an earlier import already read the environment
+    dashboard_cache.ttl = 0
+    admission.ADMISSION_ENABLED = False
+    return app
+
+
+def collection_sizes(db, names: list) -> dict:
+    """Data plus index bytes of each collection, to compare the attendance representations"""
+    sizes = {}
+    for name in names:
+        stats = db.command("collStats", name)
+        sizes[name] = stats.get("size", 0) + stats.get("totalIndexSize", 0)
+    return sizes
+
+
+def load_memory(employees: int, days: int, seed: int) -> tuple:
+    """Load the synthetic dataset into a fresh in-memory repository used by the app"""
+    from app.memory_repository import MemoryRepository
+    from app.repository import set_repository
+
+    started = time.perf_counter()
+    employee_documents = list(generate_employees(employees, seed))
+    employee_ids = [doc["employee_id"] for doc in employee_documents]
+    attendance = list(generate_attendance(employee_ids, days, seed))
+    repository = MemoryRepository()
+    repository.load(employee_documents, attendance)
+    set_repository(repository)
+    dataset = {
+        "backend": "memory",
+        "employees": len(employee_ids),
+        "attendance": len(attendance),
+        "load_seconds": round(time.perf_counter() - started, 2)
+    }
+    return dataset, employee_ids[:5000]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def write_report(args, dataset: dict, results: dict):
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "dataset": dataset,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency
+        },
+        "results": results
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report written to {output}")
+
+    if args.baseline:
+        from benchmarks.compare import compare_reports
+        with open(args.baseline) as f:
+            compare_reports(json.load(f), report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["mongo", "memory"], default="mongo", help="Storage backend to measure")
+    parser.add_argument("--url", default=os.getenv("BENCH_MONGODB_URL", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--database", default=BENCH_DB)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365, help="Days of attendance history")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-load", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight per endpoint")
+    parser.add_argument("--only", nargs="*", default=[], help="Scenario names to run")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    if args.backend == "memory":
+        app = import_app()
+        print(f"Loading {args.employees} employees with {args.days} days of attendance into memory...")
+        dataset, employee_ids = load_memory(args.employees, args.days, args.seed)
+        print(f"✓ Loaded in {dataset['load_seconds']}s")
+        ctx = Context(employee_ids, args.seed)
+        results = asyncio.run(run_suite(app, CommandCounter(), ctx, args.iterations, args.concurrency, args.only))
+        check_not_rate_limited(results)
+        write_report(args, dataset, results)
+        return
+
+    sync_client = MongoClient(args.url)
+    db = sync_client[args.database]
+    if args.skip_load:
+        dataset = {"employees": db.employees.estimated_document_count(),
+                   "attendance": db.attendance.estimated_document_count()}
+    else:
+        print(f"Loading {args.employees} employees with {args.days} days of attendance...")
+        dataset = load_dataset(db, args.employees, args.days, args.seed)
+        print(f"✓ Loaded in {dataset['load_seconds']}s")
+    dataset["storage_bytes"] = collection_sizes(db, ["attendance", BITMAP_COLLECTION, ROLLUP_COLLECTION])
+    employee_ids = [doc["employee_id"] for doc in db.employees.find({}, {"_id": 0, "employee_id": 1}).limit(5000)]
+    if not employee_ids:
+        employee_ids = [doc["employee_id"] for doc in generate_employees(1, args.seed)]
+
+    # Configure the app before importing it, then attach the round-trip counter
+    os.environ["MONGODB_URL"] = args.url
+    os.environ["MONGODB_DATABASE"] = args.database
+    from app import database
+    app = import_app()
+
+    # datagen already imported the app modules, so their import-time settings need setting directly
+    database.MONGODB_URL = args.url
+    database.DATABASE_NAME = args.database
+
+    counter = CommandCounter()
+    database.EVENT_LISTENERS.append(counter)
+
+    ctx = Context(employee_ids, args.seed)
+    try:
+        results = asyncio.run(run_suite(app, counter, ctx, args.iterations, args.concurrency, args.only))
+    finally:
+        # Remove what the write scenarios created and bring the rollups back in line
+        created = {"$regex": f"^{BENCH_PREFIX}"}
+        db.employees.delete_many({"employee_id": created})
+        db.attendance.delete_many({"employee_id": created})
+        build_rollups(db)
+        sync_client.close()
+
+    check_not_rate_limited(results)
+    write_report(args, {"backend": "mongo", **dataset}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,77 @@
-import uvicorn
+"""
+Production entry point for a single machine.
+
+Runs the API in several uvicorn worker processes, one per CPU core by default,
+with uvloop and httptools when they are installed. Each worker creates its own
+MongoDB client on first use, sized by the MONGODB_*_POOL_SIZE settings.
+
+Usage (from the backend directory):
+    python start_server.py
+    python start_server.py --workers 4 --port 8080 --max-connections 200
+
+On shutdown (Ctrl+C or SIGTERM) every worker finishes its in-flight requests,
+for up to --graceful-timeout seconds, before it stops.
+"""
+import argparse
+import importlib.util
+import os
 import sys
+import uvicorn
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Worker processes (default: WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--max-connections", type=int, default=int(os.getenv("MONGODB_MAX_CONNECTIONS", "0")),
+                        help="MongoDB connections shared by all workers (default: PyMongo's 100 per worker)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="Seconds to finish in-flight requests on shutdown")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+
+    # Workers import the app by name, from this directory wherever the server is started
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+    from app import database, events, repository
+
+    workers = max(1, args.workers)
+    if workers > 1 and not repository.uses_mongo():
+        print("⚠ The in-memory storage is per process, running a single worker")
+        workers = 1
+    if workers > 1 and events.DASHBOARD_EVENTS == "local":
+        print("⚠ Live dashboards only see writes made by their own worker, set DASHBOARD_EVENTS=change_stream")
+
+    # Read by every worker's client, see database.POOL_SETTINGS
+    if args.max_connections and not os.getenv("MONGODB_MAX_POOL_SIZE"):
+        os.environ["MONGODB_MAX_POOL_SIZE"] = str(max(1, args.max_connections // workers))
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    loop = "uvloop" if installed("uvloop") else "asyncio"
+    http = "httptools" if installed("httptools") else "h11"
+    pool = database.pool_options().get("maxPoolSize", "default")
+    print(f"Starting HRMS Backend Server on {args.host}:{args.port} "
+          f"({workers} worker(s), {loop} loop, {http} parser, MongoDB pool {pool} per worker)")
 
-if __name__ == "__main__":
-    print("Starting HRMS Backend Server...")
-    sys.path.insert(0, r"c:\FluProject\hrms-lite\backend")
-    
     uvicorn.run(
         "app.main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=False,
-        log_level="info"
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        # Client addresses from a reverse proxy's X-Forwarded-For
+        proxy_headers=True,
+        log_level=args.log_level
     )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+# Tests run against the in-memory storage backend, never a configured MongoDB
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["DEMO_DATA"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_state(monkeypatch):
+    """Start each test without the repository, versions, caches and search index of earlier ones"""
+    from app import directory, search, versions
+    from app.cache import dashboard_cache
+    from app.repository import set_repository
+
+    dashboard_cache.clear()
+    directory.employee_cache.clear()
+    monkeypatch.setattr(directory, "_cached_version", None)
+    monkeypatch.setattr(search, "_index", None)
+    monkeypatch.setattr(versions, "_versions", {})
+    monkeypatch.setattr(versions, "_loaded_at", None)
+    yield
+    set_repository(None)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Run the MongoDB repository, rollups and jobs against a fresh mongomock database, returned unwrapped"""
+    mongomock = pytest.importorskip("mongomock")
+    from mongo_adapter import AsyncClient
+    from app import bitmaps, database
+    from app.breaker import mongo_breaker
+    from app.mongo_repository import MongoRepository
+    from app.repository import GuardedRepository, set_repository
+
+    sync_db = mongomock.MongoClient()[database.DATABASE_NAME]
+    client = AsyncClient(sync_db.client)
+    db = client[database.DATABASE_NAME]
+    monkeypatch.setattr(database, "MONGODB_URL", "mongodb://mongomock")
+    monkeypatch.setattr(database, "client", client)
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "employee_collection", db["employees"])
+    monkeypatch.setattr(database, "attendance_collection", db["attendance"])
+    # mongomock has no $bit
+    monkeypatch.setattr(bitmaps, "BITMAPS_ENABLED", False)
+    for collection, keys, options in database.INDEXES:
+        # mongomock has no partial indexes, documents written by the application always hold email_lower
+        sync_db[collection].create_index(keys, **{k: v for k, v in options.items() if k != "partialFilterExpression"})
+    set_repository(GuardedRepository(MongoRepository(), mongo_breaker))
+    return sync_db
@@ -0,0 +1,98 @@
+"""
+Async face over a mongomock database, standing in for pymongo's AsyncMongoClient.
+
+Only what the application calls is covered. mongomock has no $merge or $bit, so
+rebuilds and attendance bitmaps cannot run against it.
+"""
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._iterator = None
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        self._iterator = iter(self._cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def next(self):
+        if self._iterator is None:
+            self._iterator = iter(self._cursor)
+        return next(self._iterator)
+
+    async def to_list(self, length=None):
+        documents = list(self._cursor)
+        return documents if length is None else documents[:length]
+
+    async def close(self):
+        pass
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def name(self):
+        return self._collection.name
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, **kwargs):
+        kwargs.pop("allowDiskUse", None)
+        return AsyncCursor(iter(list(self._collection.aggregate(pipeline))))
+
+
+class AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self._database[name])
+
+    def __getattr__(self, name):
+        return AsyncCollection(self._database[name])
+
+
+class AsyncAdmin:
+    async def command(self, *args, **kwargs):
+        return {"ok": 1}
+
+
+class AsyncClient:
+    admin = AsyncAdmin()
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self._client[name])
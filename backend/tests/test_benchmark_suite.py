@@ -0,0 +1,13 @@
+import asyncio
+
+from benchmarks.monitoring import CommandCounter
+from benchmarks.suite import Context, check_not_rate_limited, import_app, load_memory, run_suite
+
+
+def test_suite_is_not_rate_limited():
+    app = import_app()
+    _, employee_ids = load_memory(200, 30, 0)
+    results = asyncio.run(run_suite(app, CommandCounter(), Context(employee_ids, 0), 50, 1, []))
+
+    assert {name: row["rate_limited"] for name, row in results.items() if row["rate_limited"]} == {}
+    check_not_rate_limited(results)
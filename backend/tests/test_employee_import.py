@@ -0,0 +1,35 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.memory_repository import MemoryRepository
+from app.repository import set_repository
+
+
+def test_import_rejects_departments_add_employee_rejects():
+    set_repository(MemoryRepository())
+    rows = [
+        {"employee_id": "IMP001", "full_name": "Asha Rao", "email": "asha@example.com",
+         "phone": "9000000001", "department": "Engineering"},
+        # Allowed by the EmployeeCreate schema but not by POST /employees/
+        {"employee_id": "IMP002", "full_name": "Ravi Das", "email": "ravi@example.com",
+         "phone": "9000000002", "department": "HR"},
+    ]
+    with TestClient(app) as client:
+        assert client.post("/employees/", json=rows[1]).status_code == 400
+
+        response = client.post(
+            "/employees/import",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        report = response.json()
+        assert response.status_code == 200
+        assert (report["created"], report["failed"]) == (1, 1)
+        assert report["errors"][0]["row"] == 2
+        assert "Invalid department" in report["errors"][0]["error"]
+
+        employee_ids = [employee["employee_id"] for employee in client.get("/employees/").json()]
+        assert employee_ids == ["IMP001"]
+    set_repository(None)
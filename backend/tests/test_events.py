@@ -0,0 +1,89 @@
+import asyncio
+from datetime import date
+
+import orjson
+
+from app import events
+from app.memory_repository import MemoryRepository
+from app.repository import set_repository
+from app.routes.dashboard import stream_snapshot
+
+EMPLOYEE = {"employee_id": "EVT001", "full_name": "Asha Rao", "email": "asha@example.com",
+            "email_lower": "asha@example.com", "phone": "9000000001", "department": "Engineering"}
+
+
+def parse(frame: bytes) -> tuple:
+    """(event, data) of one Server-Sent Events frame"""
+    event, data = frame.decode().strip().split("\n")
+    return event.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))
+
+
+def use_fresh_broadcaster(monkeypatch) -> MemoryRepository:
+    monkeypatch.setattr(events, "DASHBOARD_EVENTS", "local")
+    monkeypatch.setattr(events, "COALESCE_SECONDS", 0.01)
+    monkeypatch.setattr(events, "broadcaster", events.Broadcaster())
+    repository = MemoryRepository()
+    repository.load(employees=[EMPLOYEE])
+    set_repository(repository)
+    return repository
+
+
+def test_deltas_follow_the_snapshot_in_sequence(monkeypatch):
+    repository = use_fresh_broadcaster(monkeypatch)
+
+    async def scenario():
+        stream = events.event_stream(stream_snapshot)
+        event, snapshot = parse(await anext(stream))
+        assert (event, snapshot["total_attendance_records"]) == ("snapshot", 0)
+
+        for day in (2, 3):
+            await repository.mark_attendance(
+                [{"employee_id": "EVT001", "date": date(2026, 3, day), "status": "Present"}],
+                {"EVT001": "Engineering"}
+            )
+            event, delta = parse(await anext(stream))
+            assert event == "delta"
+            assert delta["seq"] == snapshot["meta"]["seq"] + day - 1
+            assert delta["total"] == {"present": 1}
+            assert delta["days"] == {f"2026-03-0{day}": {"present": 1}}
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_waits_for_a_write_in_flight_and_skips_its_delta(monkeypatch):
+    repository = use_fresh_broadcaster(monkeypatch)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_write():
+            # A write whose database round trip is still under way when the snapshot starts
+            async with events.change():
+                await release.wait()
+                repository.load(attendance=[{"employee_id": "EVT001", "date": date(2026, 3, 2), "status": "Present"}])
+
+        writer = asyncio.create_task(slow_write())
+        await asyncio.sleep(0)
+        stream = events.event_stream(stream_snapshot)
+        first = asyncio.create_task(anext(stream))
+        await asyncio.sleep(0.05)
+        assert not first.done()
+
+        release.set()
+        await writer
+        event, snapshot = parse(await first)
+        assert (event, snapshot["total_attendance_records"]) == ("snapshot", 1)
+        # Let the frame of the write counted in the snapshot go out on its own
+        await asyncio.sleep(0.05)
+
+        await repository.mark_attendance(
+            [{"employee_id": "EVT001", "date": date(2026, 3, 3), "status": "Absent"}], {"EVT001": "Engineering"}
+        )
+        event, delta = parse(await anext(stream))
+        assert event == "delta"
+        assert delta["seq"] == snapshot["meta"]["seq"] + 1
+        assert delta["total"] == {"absent": 1}
+        await stream.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import jobs
+
+
+def test_claim_takes_each_job_once_until_its_lease_runs_out(mongo):
+    async def scenario():
+        job_id = await jobs.enqueue("rebuild_rollups", {})
+
+        job = await jobs.claim_job()
+        assert (job["_id"], job["status"], job["attempts"]) == (job_id, "running", 1)
+        lease_until = job["lease_until"].replace(tzinfo=timezone.utc)
+        assert lease_until > datetime.now(timezone.utc) + timedelta(seconds=jobs.JOB_LEASE_SECONDS - 5)
+        # Leased to this worker, nobody else may take it
+        assert await jobs.claim_job() is None
+
+        # The worker died: once the lease runs out another one picks the job up again
+        mongo.jobs.update_one({"_id": job_id}, {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        job = await jobs.claim_job()
+        assert (job["_id"], job["attempts"]) == (job_id, 2)
+
+        await jobs.finish_job(job_id, "succeeded", result={})
+        finished = mongo.jobs.find_one({"_id": job_id})
+        assert finished["status"] == "succeeded"
+        assert "lease_until" not in finished
+        assert await jobs.claim_job() is None
+
+    asyncio.run(scenario())
+
+
+def test_job_given_up_after_max_attempts(mongo):
+    async def scenario():
+        job_id = await jobs.enqueue("rebuild_rollups", {})
+        mongo.jobs.update_one({"_id": job_id}, {"$set": {"attempts": jobs.MAX_ATTEMPTS}})
+        await jobs.run_job(await jobs.claim_job())
+        job = mongo.jobs.find_one({"_id": job_id})
+        assert job["status"] == "failed"
+        assert "Abandoned" in job["error"]
+
+    asyncio.run(scenario())
+
+
+def test_lease_renewed_while_handler_runs(mongo, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.2)
+    leases = []
+
+    @jobs.job_handler("test_slow")
+    async def slow(params, progress, attempt):
+        for _ in range(4):
+            await asyncio.sleep(0.1)
+            leases.append(mongo.jobs.find_one({"type": "test_slow"})["lease_until"])
+        return {}
+
+    async def scenario():
+        job_id = await jobs.enqueue("test_slow", {})
+        assert await jobs.work_queue() == 1
+        assert mongo.jobs.find_one({"_id": job_id})["status"] == "succeeded"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        del jobs.HANDLERS["test_slow"]
+    # Renewed by the background task although the handler reported no progress
+    assert leases[-1] > leases[0]
+
+
+def test_enqueue_once_keeps_a_single_unfinished_job(mongo):
+    async def scenario():
+        first = await jobs.enqueue("rebuild_rollups", {}, once=True)
+        assert await jobs.enqueue("rebuild_rollups", {}, once=True) == first
+
+        await jobs.claim_job()
+        await jobs.finish_job(first, "succeeded", result={})
+        assert await jobs.enqueue("rebuild_rollups", {}, once=True) != first
+
+    asyncio.run(scenario())
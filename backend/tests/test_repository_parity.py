@@ -0,0 +1,97 @@
+import asyncio
+from datetime import date
+
+from app import jobs
+from app.dates import day_string
+from app.memory_repository import MemoryRepository
+from app.repository import DuplicateEmployeeError, get_repository, set_repository
+
+
+def employee(employee_id, name, email, phone, department):
+    return {"employee_id": employee_id, "full_name": name, "email": email, "email_lower": email.lower(),
+            "phone": phone, "department": department}
+
+
+def records(cursor_documents) -> list:
+    """Records in the API's form, whichever type the backend stores dates as"""
+    return [{**document, "date": str(day_string(document["date"]))} for document in cursor_documents]
+
+
+async def observe() -> dict:
+    """Run the same reads and writes on the current repository, returning everything they answered"""
+    repository = get_repository()
+    seen = {}
+
+    await repository.add_employee(employee("PAR0001", "Asha Rao", "asha@example.com", "9000000001", "Engineering"))
+    await repository.add_employee(employee("PAR0005", "Ravi Das", "ravi@example.com", "9000000002", "Sales"))
+    # mongomock does not say which unique index rejected a document, so the
+    # messages naming the field are not compared, only what was rejected
+    rejected = []
+    for document in (
+        employee("PAR0009", "Asha Two", "ASHA@example.com", "9000000009", "Sales"),
+        employee("PAR0009", "Ravi Two", "other@example.com", "9000000002", "Sales"),
+        employee("PAR0001", "Same ID", "new@example.com", "9000000010", "Sales"),
+    ):
+        try:
+            await repository.add_employee(document)
+            rejected.append(False)
+        except DuplicateEmployeeError:
+            rejected.append(True)
+    seen["rejected"] = rejected
+    errors = await repository.add_employees([
+        employee("PAR0002", "Meera Iyer", "meera@example.com", "9000000003", "Engineering"),
+        employee("PAR0003", "Meera Copy", "Meera@Example.com", "9000000004", "Engineering"),
+    ])
+    seen["batch_rejected"] = [error is not None for error in errors]
+
+    seen["ids"] = await repository.allocate_employee_ids("PAR", 2)
+    seen["employees"] = await repository.list_employees(after="").to_list()
+    seen["page"] = await repository.list_employees(after="PAR0001", limit=1).to_list()
+    seen["profiles"] = await repository.employee_profiles(["PAR0001", "PAR0005", "MISSING"])
+    seen["counts"] = await repository.employee_counts()
+
+    departments = {"PAR0001": "Engineering", "PAR0002": "Engineering", "PAR0005": "Sales"}
+    seen["marked"] = await repository.mark_attendance([
+        {"employee_id": "PAR0001", "date": date(2026, 3, 2), "status": "Present"},
+        {"employee_id": "PAR0002", "date": date(2026, 3, 2), "status": "Absent"},
+        {"employee_id": "PAR0005", "date": date(2026, 3, 3), "status": "Present"},
+        {"employee_id": "PAR0001", "date": date(2026, 3, 4), "status": "Absent"},
+        {"employee_id": "PAR0001", "date": date(2026, 3, 2), "status": "Absent"},
+    ], departments)
+    seen["marked_again"] = await repository.mark_attendance(
+        [{"employee_id": "PAR0005", "date": date(2026, 3, 3), "status": "Absent"}], departments
+    )
+    seen["updated"] = await repository.update_attendance("PAR0001", date(2026, 3, 4), "Present", "Engineering")
+    seen["updated_missing"] = await repository.update_attendance("PAR0001", date(2026, 3, 9), "Present", "Engineering")
+
+    start, end = date(2026, 3, 1), date(2026, 3, 31)
+    seen["range"] = records(await repository.attendance_range(start, end).to_list())
+    seen["range_present"] = records(await repository.attendance_range(start, end, "Present").to_list())
+    seen["range_page"] = records(await repository.attendance_range(
+        start, end, after=(date(2026, 3, 2), "PAR0001"), limit=2).to_list())
+    seen["employee"] = records(await repository.employee_attendance("PAR0001", start=start, end=end).to_list())
+    seen["employee_day"] = records(await repository.employee_attendance("PAR0001", day=date(2026, 3, 2)).to_list())
+    seen["employee_page"] = records(await repository.employee_attendance(
+        "PAR0001", start=start, end=end, after=date(2026, 3, 2), limit=1).to_list())
+    seen["present"] = await repository.count_present("PAR0001", start=start, end=end)
+    seen["export"] = records(await repository.export_attendance(start, end).to_list())
+    seen["totals"] = await repository.attendance_totals("2026-03-02")
+    seen["recent"] = records(await repository.recent_attendance(date(2026, 3, 3), 10))
+
+    seen["removed"] = await repository.remove_employee("PAR0001")
+    if await repository.remove_employee_attendance("PAR0001", "Engineering"):
+        await jobs.work_queue()
+    seen["removed_missing"] = await repository.remove_employee("PAR0001")
+    seen["after_removal"] = records(await repository.export_attendance().to_list())
+    seen["totals_after_removal"] = await repository.attendance_totals("2026-03-02")
+    return seen
+
+
+def test_memory_and_mongo_repositories_answer_alike(mongo):
+    from_mongo = asyncio.run(observe())
+    set_repository(MemoryRepository())
+    from_memory = asyncio.run(observe())
+
+    assert from_memory.keys() == from_mongo.keys()
+    for key in from_mongo:
+        assert from_memory[key] == from_mongo[key], key
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import date
+
+from app import jobs, rollups
+from app.dates import day_string
+from app.repository import get_repository
+
+EMPLOYEES = [
+    {"employee_id": "ROL001", "full_name": "Asha Rao", "email": "asha@example.com",
+     "email_lower": "asha@example.com", "phone": "9000000001", "department": "Engineering"},
+    {"employee_id": "ROL002", "full_name": "Ravi Das", "email": "ravi@example.com",
+     "email_lower": "ravi@example.com", "phone": "9000000002", "department": "Sales"},
+]
+DEPARTMENTS = {employee["employee_id"]: employee["department"] for employee in EMPLOYEES}
+
+
+def record(employee_id, day, status):
+    return {"employee_id": employee_id, "date": day, "status": status}
+
+
+def rollup_mismatches(db) -> list:
+    """verify_rollups computed in Python, mongomock cannot run its aggregations"""
+    departments = {employee["employee_id"]: employee["department"] for employee in db.employees.find()}
+    deltas = {}
+    for document in db.attendance.find():
+        rollups.add_delta(deltas, document["employee_id"], departments.get(document["employee_id"]),
+                          day_string(document["date"]), document["status"], 1)
+    expected = {rollup_id: (entry["inc"].get("present", 0), entry["inc"].get("absent", 0))
+                for rollup_id, entry in deltas.items()}
+    actual = {document["_id"]: (document.get("present", 0), document.get("absent", 0))
+              for document in db[rollups.ROLLUP_COLLECTION].find()}
+    return [
+        (rollup_id, expected.get(rollup_id, (0, 0)), actual.get(rollup_id, (0, 0)))
+        for rollup_id in expected.keys() | actual.keys()
+        if expected.get(rollup_id, (0, 0)) != actual.get(rollup_id, (0, 0))
+    ]
+
+
+def test_deltas_match_raw_attendance_after_mark_update_and_delete(mongo):
+    async def scenario():
+        repository = get_repository()
+        for employee in EMPLOYEES:
+            await repository.add_employee(dict(employee))
+
+        errors = await repository.mark_attendance([
+            record("ROL001", date(2026, 3, 2), "Present"),
+            record("ROL001", date(2026, 3, 3), "Absent"),
+            record("ROL002", date(2026, 3, 2), "Present"),
+            # Already marked earlier in the same batch, not counted twice
+            record("ROL002", date(2026, 3, 2), "Absent"),
+        ], DEPARTMENTS)
+        assert errors == [None, None, None, "duplicate"]
+        assert rollup_mismatches(mongo) == []
+
+        assert await repository.update_attendance("ROL001", date(2026, 3, 3), "Present", "Engineering") == "Absent"
+        assert rollup_mismatches(mongo) == []
+        totals = await repository.attendance_totals("2026-03-02")
+        assert totals == {"total": {"present": 3, "absent": 0}, "day": {"present": 2, "absent": 0}}
+
+        await repository.remove_employee("ROL001")
+        job_id = await repository.remove_employee_attendance("ROL001", "Engineering")
+        assert await jobs.work_queue() == 1
+        job = await jobs.get_job_collection().find_one({"_id": job_id})
+        assert (job["status"], job["result"]["deleted_attendance"]) == ("succeeded", 2)
+        assert rollup_mismatches(mongo) == []
+        totals = await repository.attendance_totals("2026-03-02")
+        assert totals["total"] == {"present": 1, "absent": 0}
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+from app.cache import dashboard_cache
+from app.main import app
+from app.memory_repository import MemoryRepository
+from app.repository import set_repository
+
+EMPLOYEE = {"employee_id": "VER001", "full_name": "Asha Rao", "email": "asha@example.com",
+            "phone": "9000000001", "department": "Engineering"}
+
+
+def test_write_changes_etag():
+    set_repository(MemoryRepository())
+    with TestClient(app) as client:
+        first = client.get("/employees/")
+        etag = first.headers["etag"]
+        assert client.get("/employees/", headers={"If-None-Match": etag}).status_code == 304
+
+        assert client.post("/employees/", json=EMPLOYEE).status_code == 200
+
+        after = client.get("/employees/", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        assert after.headers["etag"] != etag
+        assert [employee["employee_id"] for employee in after.json()] == ["VER001"]
+        assert client.get("/employees/", headers={"If-None-Match": after.headers["etag"]}).status_code == 304
+
+
+def test_cached_stats_follow_the_etag(monkeypatch):
+    # The benchmark suite turns the cache off for the whole process
+    monkeypatch.setattr(dashboard_cache, "ttl", 60)
+    set_repository(MemoryRepository())
+    with TestClient(app) as client:
+        assert client.post("/employees/", json=EMPLOYEE).status_code == 200
+        stats = client.get("/dashboard/stats")
+        assert client.get("/dashboard/stats").json()["meta"]["cache_hit"]
+
+        marked = client.post("/attendance/", json={"employee_id": "VER001", "date": "2026-03-02", "status": "Present"})
+        assert marked.status_code == 200
+
+        after = client.get("/dashboard/stats", headers={"If-None-Match": stats.headers["etag"]})
+        assert after.status_code == 200
+        assert after.headers["etag"] != stats.headers["etag"]
+        assert not after.json()["meta"]["cache_hit"]
+        assert after.json()["total_attendance_records"] == stats.json()["total_attendance_records"] + 1
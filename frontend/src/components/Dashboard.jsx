@@ -1,7 +1,68 @@
 import React, { useState, useEffect } from 'react';
-import { getDashboardStats, getEmployeeDashboard } from '../services/api';
+import { getDashboardStats, getEmployeeDashboard, openDashboardStream } from '../services/api';
 import DashboardCharts from './DashboardCharts';
 
+const rate = (present, total) => (total > 0 ? Math.round((present / total) * 10000) / 100 : 0);
+
+// Apply a `delta` event from /dashboard/stream to the stats
+function applyStatsDelta(stats, delta) {
+  const total = delta.total || {};
+  const today = (delta.days || {})[stats.today.date] || {};
+  const totalPresent = stats.total_present + (total.present || 0);
+  const totalAbsent = stats.total_absent + (total.absent || 0);
+  const todayPresent = stats.today.present + (today.present || 0);
+  const todayAbsent = stats.today.absent + (today.absent || 0);
+
+  const departments = { ...(delta.departments || {}) };
+  const departmentStats = stats.department_stats
+    .map((dept) => {
+      const count = dept.count + (departments[dept.department] || 0);
+      delete departments[dept.department];
+      return { ...dept, count };
+    })
+    .concat(Object.entries(departments).map(([department, count]) => ({ department, count })))
+    .filter((dept) => dept.count > 0)
+    .sort((a, b) => b.count - a.count);
+
+  return {
+    ...stats,
+    total_employees: stats.total_employees + (delta.total_employees || 0),
+    total_present: totalPresent,
+    total_absent: totalAbsent,
+    total_attendance_records: totalPresent + totalAbsent,
+    attendance_rate: rate(totalPresent, totalPresent + totalAbsent),
+    today: {
+      ...stats.today,
+      present: todayPresent,
+      absent: todayAbsent,
+      total: todayPresent + todayAbsent,
+      attendance_rate: rate(todayPresent, todayPresent + todayAbsent)
+    },
+    department_stats: departmentStats
+  };
+}
+
+// Apply the per-employee counts of a `delta` event to the employee summaries
+function applyEmployeeDelta(employeeData, delta) {
+  if (!delta.employees) return employeeData;
+  return {
+    ...employeeData,
+    employees: employeeData.employees.map((employee) => {
+      const change = delta.employees[employee.employee_id];
+      if (!change) return employee;
+      const present = employee.present_count + (change.present || 0);
+      const absent = employee.absent_count + (change.absent || 0);
+      return {
+        ...employee,
+        present_count: present,
+        absent_count: absent,
+        total_records: present + absent,
+        attendance_rate: rate(present, present + absent)
+      };
+    })
+  };
+}
+
 function Dashboard() {
   const [stats, setStats] = useState(null);
   const [employeeData, setEmployeeData] = useState(null);
@@ -12,6 +73,26 @@ function Dashboard() {
 
   useEffect(() => {
     fetchAllData();
+
+    // Live updates instead of polling; without them the page shows the data as loaded
+    if (typeof EventSource === 'undefined') return undefined;
+    const stream = openDashboardStream();
+    let snapshots = 0;
+    stream.addEventListener('snapshot', (event) => {
+      setStats(JSON.parse(event.data));
+      // A later snapshot (reconnect, or updates were missed) refreshes the employee summaries too
+      if (snapshots++ > 0) {
+        getEmployeeDashboard()
+          .then((response) => setEmployeeData(response.data))
+          .catch((err) => console.error('Error refreshing employee dashboard:', err));
+      }
+    });
+    stream.addEventListener('delta', (event) => {
+      const delta = JSON.parse(event.data);
+      setStats((current) => (current ? applyStatsDelta(current, delta) : current));
+      setEmployeeData((current) => (current ? applyEmployeeDelta(current, delta) : current));
+    });
+    return () => stream.close();
   }, []);
 
   const fetchAllData = async () => {
@@ -22,7 +103,8 @@ function Dashboard() {
         getDashboardStats(),
         getEmployeeDashboard()
       ]);
-      setStats(statsResponse.data);
+      // The stream's snapshot may already be here, and is at least as recent
+      setStats((current) => current || statsResponse.data);
       setEmployeeData(employeeResponse.data);
     } catch (err) {
       setError('Failed to load dashboard data');
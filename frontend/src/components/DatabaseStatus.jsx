@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getEmployees } from '../services/api';
+import { getStatus } from '../services/api';
 
 function DatabaseStatus() {
   const [isDemoMode, setIsDemoMode] = useState(false);
@@ -7,12 +7,9 @@ function DatabaseStatus() {
   useEffect(() => {
     const checkDatabaseStatus = async () => {
       try {
-        const response = await getEmployees();
-        // Check if the response contains demo data
-        if (response.data && response.data.length > 0) {
-          const hasDemo = response.data.some(emp => emp.employee_id === 'DEMO0001');
-          setIsDemoMode(hasDemo);
-        }
+        const response = await getStatus();
+        // Without MongoDB the backend keeps everything in memory
+        setIsDemoMode(response.data.storage === 'memory');
       } catch (err) {
         console.error('Error checking database status:', err);
       }
@@ -33,8 +30,8 @@ function DatabaseStatus() {
       textAlign: 'center',
       fontSize: '14px'
     }}>
-      <strong>⚠ Demo Mode:</strong> Database not connected. Showing sample data only. 
-      Data cannot be saved or modified.
+      <strong>⚠ Demo Mode:</strong> Database not connected. Data is kept in server memory
+      and is lost when the server restarts.
     </div>
   );
 }
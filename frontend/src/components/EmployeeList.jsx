@@ -1,20 +1,39 @@
-import React, { useState, useEffect } from 'react';
-import { getEmployees, deleteEmployee } from '../services/api';
+import React, { useState, useEffect, useRef } from 'react';
+import { searchEmployees, getDepartments, deleteEmployee } from '../services/api';
+
+// Employees fetched per page, and how long typing pauses before searching
+const PAGE_SIZE = 50;
+const SEARCH_DELAY_MS = 250;
 
 function EmployeeList({ refreshTrigger }) {
   const [employees, setEmployees] = useState([]);
-  const [filteredEmployees, setFilteredEmployees] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [directorySize, setDirectorySize] = useState(0);
+  const [departments, setDepartments] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
+  const [department, setDepartment] = useState('');
+  // Only the answer to the latest search is shown
+  const latestRequest = useRef(0);
 
-  const fetchEmployees = async () => {
-    setLoading(true);
+  const fetchEmployees = async (skip = 0) => {
+    const request = ++latestRequest.current;
     setError('');
     try {
-      const response = await getEmployees();
-      setEmployees(response.data);
-      setFilteredEmployees(response.data);
+      const params = { q: searchTerm.trim(), skip, limit: PAGE_SIZE };
+      if (department) {
+        params.department = department;
+      }
+      const response = await searchEmployees(params);
+      if (request !== latestRequest.current) {
+        return;
+      }
+      setEmployees(skip ? (current) => [...current, ...response.data.employees] : response.data.employees);
+      setTotal(response.data.total);
+      if (!params.q && !department) {
+        setDirectorySize(response.data.total);
+      }
     } catch (err) {
       setError('Failed to fetch employees');
       console.error('Error fetching employees:', err);
@@ -24,23 +43,15 @@ function EmployeeList({ refreshTrigger }) {
   };
 
   useEffect(() => {
-    fetchEmployees();
-  }, [refreshTrigger]);
+    getDepartments()
+      .then((response) => setDepartments(response.data.departments))
+      .catch((err) => console.error('Error fetching departments:', err));
+  }, []);
 
   useEffect(() => {
-    if (searchTerm === '') {
-      setFilteredEmployees(employees);
-    } else {
-      const filtered = employees.filter(emp =>
-        emp.full_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        emp.employee_id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        emp.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        emp.department.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (emp.phone && emp.phone.includes(searchTerm))
-      );
-      setFilteredEmployees(filtered);
-    }
-  }, [searchTerm, employees]);
+    const timer = setTimeout(() => fetchEmployees(), searchTerm ? SEARCH_DELAY_MS : 0);
+    return () => clearTimeout(timer);
+  }, [searchTerm, department, refreshTrigger]);
 
   const handleSearch = (e) => {
     setSearchTerm(e.target.value);
@@ -48,6 +59,7 @@ function EmployeeList({ refreshTrigger }) {
 
   const clearSearch = () => {
     setSearchTerm('');
+    setDepartment('');
   };
 
   const handleDelete = async (employeeId) => {
@@ -73,23 +85,33 @@ function EmployeeList({ refreshTrigger }) {
     return <div className="error-message">{error}</div>;
   }
 
-  if (employees.length === 0) {
+  if (directorySize === 0 && !searchTerm && !department) {
     return <div className="no-data">No employees found. Add your first employee above!</div>;
   }
 
   return (
     <div className="table-container">
       <div className="list-header">
-        <h3>Employee List ({filteredEmployees.length} of {employees.length})</h3>
+        <h3>Employee List ({total} of {directorySize})</h3>
         <div className="search-container">
           <input
             type="text"
-            placeholder="Search by name, ID, email, department, or phone..."
+            placeholder="Search by name, ID, email, or phone..."
             value={searchTerm}
             onChange={handleSearch}
             className="search-input"
           />
-          {searchTerm && (
+          <select
+            value={department}
+            onChange={(e) => setDepartment(e.target.value)}
+            className="search-input"
+          >
+            <option value="">All departments</option>
+            {departments.map((name) => (
+              <option key={name} value={name}>{name}</option>
+            ))}
+          </select>
+          {(searchTerm || department) && (
             <button className="btn-clear-search" onClick={clearSearch}>
               Clear
             </button>
@@ -108,14 +130,14 @@ function EmployeeList({ refreshTrigger }) {
           </tr>
         </thead>
         <tbody>
-          {filteredEmployees.length === 0 ? (
+          {employees.length === 0 ? (
             <tr>
               <td colSpan="6" style={{ textAlign: 'center', padding: '20px' }}>
-                No employees found matching "{searchTerm}"
+                No employees found matching "{searchTerm || department}"
               </td>
             </tr>
           ) : (
-            filteredEmployees.map((emp) => (
+            employees.map((emp) => (
             <tr key={emp.employee_id}>
               <td>{emp.employee_id}</td>
               <td>{emp.full_name}</td>
@@ -135,6 +157,13 @@ function EmployeeList({ refreshTrigger }) {
           )}
         </tbody>
       </table>
+      {employees.length < total && (
+        <div style={{ textAlign: 'center', marginTop: '1rem' }}>
+          <button onClick={() => fetchEmployees(employees.length)}>
+            Show more ({total - employees.length} left)
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -3,21 +3,45 @@ import axios from 'axios';
 // Use environment variable for API URL, fallback to localhost for development
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://127.0.0.1:8000';
 
+// Random ID of this browser, so the backend's rate limits tell apart users sharing an address
+const clientId = () => {
+  try {
+    let id = localStorage.getItem('hrmsClientId');
+    if (!id) {
+      id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+      localStorage.setItem('hrmsClientId', id);
+    }
+    return id;
+  } catch {
+    return undefined;
+  }
+};
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
+    'X-Client-Id': clientId(),
   },
 });
 
+// Backend status, including where it stores data
+export const getStatus = () => api.get('/');
+
 // Employee APIs
 export const getDepartments = () => api.get('/employees/departments');
 
 export const generateEmployeeId = (fullName) => 
   api.post('/employees/generate-id', { full_name: fullName });
 
+export const generateEmployeeIds = (fullNames) =>
+  api.post('/employees/generate-ids', { full_names: fullNames });
+
 export const getEmployees = () => api.get('/employees');
 
+// One sorted page of matching employees and the number of matches
+export const searchEmployees = (params = {}) => api.get('/employees/search', { params });
+
 export const addEmployee = (data) => api.post('/employees', data);
 
 export const deleteEmployee = (employeeId) => api.delete(`/employees/${employeeId}`);
@@ -25,6 +49,8 @@ export const deleteEmployee = (employeeId) => api.delete(`/employees/${employeeI
 // Attendance APIs
 export const markAttendance = (data) => api.post('/attendance', data);
 
+export const markAttendanceBulk = (records) => api.post('/attendance/bulk', { records });
+
 export const updateAttendance = (employeeId, date, data) => 
   api.put(`/attendance/${employeeId}/${date}`, data);
 
@@ -36,9 +62,15 @@ export const getAttendance = (employeeId, date = null) => {
   return api.get(`/attendance/${employeeId}`, { params });
 };
 
+export const getAttendanceRange = (from, to, params = {}) =>
+  api.get('/attendance/', { params: { from, to, ...params } });
+
 // Dashboard APIs
 export const getDashboardStats = () => api.get('/dashboard/stats');
 
 export const getEmployeeDashboard = () => api.get('/dashboard/employees');
 
+// Server-Sent Events: a `snapshot` of the stats, then `delta` events as data changes
+export const openDashboardStream = () => new EventSource(`${API_BASE_URL}/dashboard/stream`);
+
 export default api;